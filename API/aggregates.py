@@ -0,0 +1,139 @@
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.sqlite import insert
+from . import models
+
+# Agrégat matérialisé marque × année (nombre, somme des prix et des kilométrages) :
+# mis à jour dans la même transaction que chaque création/modification/suppression de véhicule,
+# avec une révision incrémentée à chaque changement pour les ETag
+YEAR_BRAND = "year_brand"
+# Révision du catalogue, incrémentée à chaque écriture d'un véhicule, y compris sur des champs hors agrégat
+# (carburant, transmission...) : sert à l'index des véhicules similaires (voir similarity.py).
+# Chaque révision est journalisée avec l'identifiant du véhicule écrit (Vehicule_Change), y compris par le chargeur
+# en masse (une révision par véhicule inséré ou modifié, tant que le chargement tient dans la rétention du journal)
+VEHICULES = "vehicules"
+# Nombre de révisions conservées dans le journal : un worker plus en retard relit toute la table
+CHANGE_LOG_RETENTION = 10000
+STATS = models.VehiculeStats.__table__
+VERSIONS = models.AggregateVersion.__table__
+
+# Recalcul complet (SQL brut, partagé avec le chargeur en masse qui utilise sqlite3)
+REBUILD_YEAR_BRAND_SQL = (
+    "DELETE FROM Vehicule_Stats",
+    """
+    INSERT INTO Vehicule_Stats (Marque_ID, Annee, Count, Sum_Prix, Sum_Kilometrage)
+    SELECT Marque_ID, Annee, COUNT(*), COALESCE(SUM(Prix), 0), COALESCE(SUM(Kilometrage), 0)
+    FROM Vehicule
+    WHERE Marque_ID IS NOT NULL AND Annee IS NOT NULL
+    GROUP BY Marque_ID, Annee
+    """,
+)
+BUMP_VERSION_SQL = """
+    INSERT INTO Aggregate_Version (Name, Version) VALUES (:name, 1)
+    ON CONFLICT (Name) DO UPDATE SET Version = Version + 1
+"""
+
+SET_VERSION_SQL = """
+    INSERT INTO Aggregate_Version (Name, Version) VALUES (:name, :version)
+    ON CONFLICT (Name) DO UPDATE SET Version = excluded.Version
+"""
+LOG_CHANGE_SQL = """
+    INSERT INTO Vehicule_Change (Version, Vehicule_ID)
+    SELECT Version, :vehicule_id FROM Aggregate_Version WHERE Name = :name
+"""
+PRUNE_CHANGES_SQL = """
+    DELETE FROM Vehicule_Change
+    WHERE Version <= (SELECT Version FROM Aggregate_Version WHERE Name = :name) - :retention
+"""
+SELECT_CHANGES_SQL = text(
+    "SELECT Version, Vehicule_ID FROM Vehicule_Change WHERE Version > :since AND Version <= :version"
+)
+
+# Lecture : regroupement par nom de marque comme l'ancienne requête sur Vehicule
+SELECT_YEAR_BRAND_SQL = """
+    SELECT m.Nom AS Marque, s.Annee AS Annee, SUM(s.Count) AS Count,
+           SUM(s.Sum_Prix) / SUM(s.Count) AS Prix_Moyen,
+           SUM(s.Sum_Kilometrage) / SUM(s.Count) AS Kilometrage_Moyen
+    FROM Vehicule_Stats s
+    JOIN Marque m ON s.Marque_ID = m.ID_Marque
+    GROUP BY m.Nom, s.Annee
+    ORDER BY s.Annee, m.Nom
+"""
+
+
+# Contribution d'un véhicule à l'agrégat, ou None s'il n'y entre pas
+def vehicule_snapshot(vehicule):
+    if vehicule is None or vehicule.marque_id is None or vehicule.annee is None:
+        return None
+    return (vehicule.marque_id, vehicule.annee, vehicule.prix or 0.0, vehicule.kilometrage or 0.0)
+
+
+def _delta_statement(snapshot, sign):
+    marque_id, annee, prix, kilometrage = snapshot
+    statement = insert(STATS).values(
+        Marque_ID=marque_id, Annee=annee, Count=sign, Sum_Prix=sign * prix, Sum_Kilometrage=sign * kilometrage,
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[STATS.c.Marque_ID, STATS.c.Annee],
+        set_={
+            "Count": STATS.c.Count + statement.excluded.Count,
+            "Sum_Prix": STATS.c.Sum_Prix + statement.excluded.Sum_Prix,
+            "Sum_Kilometrage": STATS.c.Sum_Kilometrage + statement.excluded.Sum_Kilometrage,
+        },
+    )
+
+
+# Instructions à exécuter avant le commit pour passer de l'état old à new (None : véhicule absent)
+def change_statements(old, new):
+    if old == new:
+        return []
+    statements = []
+    if old is not None:
+        statements.append(_delta_statement(old, -1))
+        statements.append(delete(STATS).where(STATS.c.Marque_ID == old[0], STATS.c.Annee == old[1], STATS.c.Count <= 0))
+    if new is not None:
+        statements.append(_delta_statement(new, 1))
+    statements.append(text(BUMP_VERSION_SQL).bindparams(name=YEAR_BRAND))
+    return statements
+
+
+# Instructions d'une écriture de véhicule : agrégat marque × année, révision du catalogue et journal
+# (l'identifiant doit être connu : après un flush pour une création)
+def vehicule_write_statements(vehicule_id, old, new):
+    return change_statements(old, new) + [
+        text(BUMP_VERSION_SQL).bindparams(name=VEHICULES),
+        text(LOG_CHANGE_SQL).bindparams(name=VEHICULES, vehicule_id=vehicule_id),
+        text(PRUNE_CHANGES_SQL).bindparams(name=VEHICULES, retention=CHANGE_LOG_RETENTION),
+    ]
+
+
+def get_version(conn, name=YEAR_BRAND):
+    version = conn.execute(text("SELECT Version FROM Aggregate_Version WHERE Name = :name"), {"name": name}).scalar()
+    return version or 0
+
+
+# Véhicules écrits entre les révisions since (exclue) et version du catalogue,
+# ou None si le journal ne couvre pas tout l'intervalle (chargement en masse, révisions purgées)
+def changed_vehicules(conn, since, version):
+    if version < since:
+        return None
+    rows = conn.execute(SELECT_CHANGES_SQL, {"since": since, "version": version}).all()
+    if len(rows) != version - since:
+        return None
+    return {row[1] for row in rows}
+
+
+def read_year_brand(conn):
+    return [dict(row) for row in conn.execute(text(SELECT_YEAR_BRAND_SQL)).mappings()]
+
+
+def rebuild_year_brand(conn):
+    for sql in REBUILD_YEAR_BRAND_SQL:
+        conn.execute(text(sql))
+    conn.execute(text(BUMP_VERSION_SQL), {"name": YEAR_BRAND})
+
+
+# Premier démarrage sur une base existante : calculer l'agrégat une fois
+def ensure_built(engine):
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM Aggregate_Version WHERE Name = :name"), {"name": YEAR_BRAND}).first() is None:
+            rebuild_year_brand(conn)
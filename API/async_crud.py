@@ -0,0 +1,143 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from . import crud, models, schemas, aggregates, auth
+
+# Variantes asynchrones des fonctions de crud.py (même nom, même comportement) pour AsyncSession
+
+# Fonction pour obtenir la liste des véhicules
+async def get_vehicules(db: AsyncSession, skip: int = 0, limit: int = 10, **filters):
+    result = await db.execute(crud.vehicules_statement(skip=skip, limit=limit, **filters))
+    return result.scalars().all()
+
+# Fonction pour obtenir un véhicule par ID
+async def get_vehicule(db: AsyncSession, vehicule_id: int):
+    result = await db.execute(select(models.Vehicule).filter(models.Vehicule.id == vehicule_id))
+    return result.scalars().first()
+
+# Fonction pour créer un nouveau véhicule
+async def create_vehicule(db: AsyncSession, vehicule: schemas.VehiculeCreate):
+    db_vehicule = models.Vehicule(**vehicule.dict())
+    db.add(db_vehicule)
+    await db.flush()
+    for statement in aggregates.vehicule_write_statements(db_vehicule.id, None, aggregates.vehicule_snapshot(db_vehicule)):
+        await db.execute(statement)
+    await db.commit()
+    await db.refresh(db_vehicule)
+    return db_vehicule
+
+# Fonction pour mettre à jour un véhicule
+async def update_vehicule(db: AsyncSession, vehicule_id: int, vehicule_update: schemas.VehiculeUpdate):
+    db_vehicule = await get_vehicule(db, vehicule_id)
+    if not db_vehicule:
+        raise HTTPException(status_code=404, detail="Véhicule non trouvé")
+    old = aggregates.vehicule_snapshot(db_vehicule)
+    update_data = vehicule_update.dict(exclude_unset=True)
+    for key, value in update_data.items():
+        setattr(db_vehicule, key, value)
+    for statement in aggregates.vehicule_write_statements(vehicule_id, old, aggregates.vehicule_snapshot(db_vehicule)):
+        await db.execute(statement)
+    await db.commit()
+    await db.refresh(db_vehicule)
+    return db_vehicule
+
+# Fonction pour supprimer un véhicule
+async def delete_vehicule(db: AsyncSession, vehicule_id: int):
+    try:
+        # Rechercher le véhicule à supprimer
+        db_vehicule = await get_vehicule(db, vehicule_id)
+
+        if not db_vehicule:
+            raise HTTPException(status_code=404, detail="Véhicule non trouvé")
+
+        # Supprimer le véhicule (et sa contribution aux agrégats, dans la même transaction)
+        for statement in aggregates.vehicule_write_statements(vehicule_id, aggregates.vehicule_snapshot(db_vehicule), None):
+            await db.execute(statement)
+        await db.delete(db_vehicule)
+        await db.commit()
+
+        # Retourner un simple message de confirmation
+        return {"message": f"Véhicule avec ID {vehicule_id} supprimé avec succès"}
+
+    except Exception as e:
+        await db.rollback()  # Annuler la transaction en cas d'erreur
+        raise HTTPException(status_code=500, detail=f"Erreur serveur lors de la suppression du véhicule: {str(e)}")
+
+# Fonction pour créer un nouvel utilisateur
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    db_user = models.User(
+        username=user.username,
+        email=user.email,
+        hashed_password=user.password  # Utilisez hashed_password
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+# Fonction pour enregistrer un utilisateur dont le mot de passe est déjà haché
+async def create_user_with_hash(db: AsyncSession, username: str, email: str, hashed_password: str):
+    db_user = models.User(username=username, email=email, hashed_password=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+# Fonction pour obtenir un utilisateur par nom d'utilisateur
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(models.User).filter(models.User.username == username))
+    return result.scalars().first()
+
+# Fonction pour obtenir un utilisateur par e-mail
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
+# Fonction pour obtenir un utilisateur par ID
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    result = await db.execute(select(models.User).filter(models.User.id == user_id))
+    return result.scalars().first()
+
+# Fonction pour obtenir tous les utilisateurs
+async def get_all_users(db: AsyncSession, skip: int = 0, limit: int = 10):
+    result = await db.execute(select(models.User).offset(skip).limit(limit))
+    return result.scalars().all()
+
+# Fonction pour mettre à jour les informations d'un utilisateur
+async def update_user(db: AsyncSession, user_id: int, user_update: schemas.UserUpdate, hashed_password: str = None):
+    db_user = await get_user_by_id(db, user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    update_data = user_update.dict(exclude_unset=True)
+    password = update_data.pop("password", None)
+    if password and hashed_password is None:
+        # Le hachage bcrypt est coûteux en CPU : hors de la boucle d'événements
+        hashed_password = await run_in_threadpool(auth.hash_password, password)
+    if hashed_password:
+        db_user.hashed_password = hashed_password
+    for key, value in update_data.items():
+        setattr(db_user, key, value)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+# Remplacer le hachage du mot de passe (re-hachage avec le coût bcrypt configuré)
+async def update_password_hash(db: AsyncSession, user_id: int, hashed_password: str):
+    await db.execute(update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password))
+    await db.commit()
+
+# Fonction pour supprimer un utilisateur
+async def delete_user(db: AsyncSession, user_id: int):
+    db_user = await get_user_by_id(db, user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    await db.delete(db_user)
+    await db.commit()
+    return {"message": f"Utilisateur avec ID {user_id} supprimé avec succès"}
+
+# Appeler la variante asynchrone (AsyncSession) ou synchrone (Session, dans le pool de threads) d'une fonction CRUD
+async def call(name: str, db, **kwargs):
+    if isinstance(db, AsyncSession):
+        return await globals()[name](db, **kwargs)
+    return await run_in_threadpool(getattr(crud, name), db, **kwargs)
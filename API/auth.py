@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from starlette.concurrency import run_in_threadpool
+
+# Facteur de coût bcrypt des nouveaux hachages ; les mots de passe hachés avec un autre coût
+# sont re-hachés à la connexion suivante
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def verify_password(password, hashed_password):
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+    except ValueError:  # Valeur stockée qui n'est pas un hachage bcrypt
+        return False
+
+
+# Coût lu dans le préfixe du hachage ($2b$12$...), None s'il est illisible
+def hash_rounds(hashed_password):
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed_password, rounds=BCRYPT_ROUNDS):
+    return hash_rounds(hashed_password) != rounds
+
+
+# Pool de processus dédié à bcrypt : les hachages d'une vague de connexions ne consomment ni la boucle
+# d'événements ni le pool de threads partagé avec les endpoints synchrones.
+# Le nombre de calculs en attente est borné (max_pending) : au-delà, les requêtes attendent leur tour sans bloquer.
+# workers=0 revient au pool de threads de Starlette
+class PasswordHasher:
+    def __init__(self, workers=1, max_pending=64, rounds=BCRYPT_ROUNDS):
+        self.workers = int(workers)
+        self.max_pending = int(max_pending)
+        self.rounds = int(rounds)
+        self._executor = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    # Processus démarrés au premier hachage ; "spawn" évite de dupliquer un worker déjà multi-thread
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._semaphore = asyncio.Semaphore(self.max_pending)
+            return self._executor
+
+    async def _run(self, function, *args):
+        if self.workers <= 0:
+            return await run_in_threadpool(function, *args)
+        executor = self._get_executor()
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+    async def hash(self, password):
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password, hashed_password):
+        return await self._run(verify_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password):
+        return needs_rehash(hashed_password, self.rounds)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Cache des tokens déjà vérifiés, indexé sur le SHA-256 du token : évite le décodage JWT et la lecture
+# de l'utilisateur en base à chaque appel protégé. Une entrée expire à l'`exp` du token ou après ttl secondes ;
+# ttl borne le délai de prise en compte d'une modification faite par un autre worker
+class TokenCache:
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    # Utilisateur associé au token, ou None s'il est absent ou expiré
+    def get(self, token):
+        if self.maxsize <= 0:
+            return None
+        key = self.key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    # exp : horodatage Unix d'expiration du token
+    def put(self, token, user, exp):
+        if self.maxsize <= 0:
+            return
+        expires = min(float(exp), time.time() + self.ttl)
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (user, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    # Retirer les tokens d'un utilisateur modifié ou supprimé
+    def invalidate_user(self, user_id):
+        with self._lock:
+            keys = [key for key, (user, _) in self._entries.items() if user.id == user_id]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from starlette.concurrency import run_in_threadpool
+
+# Bornes (en nombre de lignes) de l'histogramme des tailles de lot
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+# Ordonnanceur de micro-lots : regroupe les requêtes unitaires concurrentes
+# pendant au plus `max_wait_ms` millisecondes ou `max_batch_size` lignes,
+# puis exécute une seule prédiction vectorisée pour tout le lot.
+class MicroBatcher:
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+        # Statistiques exposées pour régler la fenêtre sous charge
+        self.batches = 0
+        self.rows = 0
+        self.batch_size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.batch_size_histogram["+Inf"] = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.inference_time_total = 0.0
+
+    # Démarrer la tâche de fond dans la boucle d'événements courante
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    # Soumettre une ligne et attendre son résultat
+    async def submit(self, item):
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    # Collecter un lot : attendre la première ligne, puis compléter jusqu'à la fin de la fenêtre
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        # Récupérer sans attendre ce qui est déjà en file
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            self._record_batch(batch, started)
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = await run_in_threadpool(self._predict_isolated, items)
+            except Exception as e:
+                results = [e] * len(items)
+            self.inference_time_total += time.perf_counter() - started
+
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    # En cas d'échec du lot, rejouer ligne par ligne pour ne pénaliser que les lignes fautives
+    def _predict_isolated(self, items):
+        try:
+            return self.predict_fn(items)
+        except Exception as e:
+            if len(items) == 1:
+                return [e]
+            logging.warning(f"Échec du micro-lot de {len(items)} lignes, repli ligne par ligne: {e}")
+            results = []
+            for item in items:
+                try:
+                    results.extend(self.predict_fn([item]))
+                except Exception as item_error:
+                    results.append(item_error)
+            return results
+
+    def _record_batch(self, batch, started):
+        size = len(batch)
+        self.batches += 1
+        self.rows += size
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self.batch_size_histogram[bucket] += 1
+                break
+        else:
+            self.batch_size_histogram["+Inf"] += 1
+        for _, _, enqueued in batch:
+            waited = started - enqueued
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    # Instantané des statistiques de l'ordonnanceur
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "batch_size_histogram": {str(bucket): count for bucket, count in self.batch_size_histogram.items()},
+            "mean_wait_ms": self.wait_time_total / self.rows * 1000.0 if self.rows else 0.0,
+            "max_wait_observed_ms": self.wait_time_max * 1000.0,
+            "mean_inference_ms": self.inference_time_total / self.batches * 1000.0 if self.batches else 0.0,
+        }
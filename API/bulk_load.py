@@ -0,0 +1,228 @@
+import argparse
+import os
+import sqlite3
+import time
+import pandas as pd
+from .aggregates import (
+    BUMP_VERSION_SQL, CHANGE_LOG_RETENTION, PRUNE_CHANGES_SQL, REBUILD_YEAR_BRAND_SQL, SET_VERSION_SQL, VEHICULES,
+    YEAR_BRAND,
+)
+
+# Chargement en masse du CSV nettoyé dans la base SQLite :
+# identifiants de référence résolus par dictionnaires, insertions par executemany
+# dans une transaction par paquet, et mise à jour (upsert) des véhicules déjà présents
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_CSV = os.path.join(ROOT_DIR, "data", "cleaned", "voitures_aramisauto_nettoye.csv")
+DEFAULT_DATABASE = os.path.join(ROOT_DIR, "voitures_aramisauto.db")
+CHUNK_ROWS = 50000
+# PRAGMA de la connexion de chargement : cache large pour la maintenance des index, commits sans fsync complet
+LOAD_PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -262144, "temp_store": "MEMORY"}
+NON_SPECIFIE = "Non spécifié"
+CSV_COLUMNS = ["Marque", "Année", "Kilométrage", "Etat", "Prix", "Type de Carburant", "Transmission"]
+
+# Tables de référence : (table, colonne ID, colonne libellé)
+REFERENCE_TABLES = {
+    "marque": ("Marque", "ID_Marque", "Nom"),
+    "carburant": ("Carburant", "ID_Carburant", "Type"),
+    "transmission": ("Transmission", "ID_Transmission", "Type"),
+}
+
+# Clé naturelle d'un véhicule : tout sauf le prix, qui est la valeur mise à jour
+SELECT_EXISTING = """
+    SELECT Modele, CAST(Annee AS INTEGER), CAST(Kilometrage AS REAL), Etat, Marque_ID, Carburant_ID, Transmission_ID,
+           ID_Vehicule, Prix
+    FROM Vehicule
+"""
+INSERT_VEHICULE = """
+    INSERT INTO Vehicule (Modele, Annee, Kilometrage, Etat, Marque_ID, Carburant_ID, Transmission_ID, Prix)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPDATE_PRIX = "UPDATE Vehicule SET Prix = ? WHERE ID_Vehicule = ?"
+# Véhicules insérés par le paquet : ID supérieurs au maximum relevé avant l'insertion (transaction BEGIN IMMEDIATE,
+# aucun autre écrivain entre les deux), attribués dans l'ordre d'exécution de executemany
+SELECT_INSERTED = "SELECT ID_Vehicule FROM Vehicule WHERE ID_Vehicule > ? ORDER BY ID_Vehicule"
+INSERT_CHANGE = "INSERT INTO Vehicule_Change (Version, Vehicule_ID) VALUES (?, ?)"
+
+
+# Le nom de marque est le premier mot de la colonne Marque
+def marque_nom(label):
+    return label.split(" ", 1)[0]
+
+# Identifiants nullables sous forme d'entiers Python (None pour les valeurs absentes)
+def nullable_ids(series):
+    return [None if value != value else int(value) for value in series.tolist()]
+
+
+class BulkLoader:
+    def __init__(self, conn):
+        self.conn = conn
+        self.references = {name: self._load_reference(*table) for name, table in REFERENCE_TABLES.items()}
+        self.existing = self._load_existing()
+        # Journal des écritures (tables créées par l'API ou create_tables.sql) : une révision par véhicule écrit
+        self.log_changes = has_tables(conn, "Aggregate_Version", "Vehicule_Change")
+        self.logged = 0
+        self.stats = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+
+    def _load_reference(self, table, id_column, label_column):
+        rows = self.conn.execute(f"SELECT {id_column}, {label_column} FROM {table} ORDER BY {id_column}").fetchall()
+        mapping = {}
+        for row_id, label in rows:
+            mapping.setdefault(label, row_id)
+        return mapping
+
+    # Index en mémoire des véhicules déjà en base : clé naturelle -> (ID_Vehicule, Prix)
+    def _load_existing(self):
+        return {row[:7]: row[7:] for row in self.conn.execute(SELECT_EXISTING)}
+
+    # Résoudre les libellés distincts du paquet (création des inconnus), puis projeter sur toutes les lignes
+    def _resolve(self, name, labels, transform=None):
+        table, id_column, label_column = REFERENCE_TABLES[name]
+        mapping = self.references[name]
+        ids = {}
+        for label in labels.unique():
+            key = transform(label) if transform else label
+            if key not in mapping:
+                cursor = self.conn.execute(f"INSERT INTO {table} ({label_column}) VALUES (?)", (key,))
+                mapping[key] = cursor.lastrowid
+            ids[label] = mapping[key]
+        return labels.map(ids)
+
+    # Charger un paquet de lignes du CSV dans une seule transaction
+    def load_chunk(self, df):
+        self.stats["rows"] += len(df)
+        complete = df.dropna(subset=CSV_COLUMNS)
+        self.stats["skipped"] += len(df) - len(complete)
+        if complete.empty:
+            return
+
+        with self.conn:
+            # Verrou d'écriture pris dès le début : les ID relus après l'insertion sont ceux de ce paquet
+            self.conn.execute("BEGIN IMMEDIATE")
+            marque_ids = self._resolve("marque", complete["Marque"].astype(str), marque_nom)
+            carburant_ids = self._resolve("carburant", complete["Type de Carburant"])
+            transmission_ids = self._resolve("transmission", complete["Transmission"])
+            # Comme le script d'origine : "Non spécifié" reste en table de référence mais n'est pas lié au véhicule
+            carburant_ids = carburant_ids.where(complete["Type de Carburant"] != NON_SPECIFIE)
+            transmission_ids = transmission_ids.where(complete["Transmission"] != NON_SPECIFIE)
+
+            # Modele reçoit la colonne Marque, comme dans le script d'origine ; doublons du fichier : la dernière ligne l'emporte
+            keys = zip(
+                complete["Marque"].tolist(), complete["Année"].astype(int).tolist(),
+                complete["Kilométrage"].astype(float).tolist(), complete["Etat"].tolist(),
+                marque_ids.astype(int).tolist(), nullable_ids(carburant_ids), nullable_ids(transmission_ids),
+            )
+            rows = dict(zip(keys, complete["Prix"].astype(float).tolist()))
+
+            inserts, updates = [], {}
+            for key, prix in rows.items():
+                existing = self.existing.get(key)
+                if existing is None:
+                    inserts.append(key + (prix,))
+                elif existing[1] != prix:
+                    updates[key] = (existing[0], prix)
+
+            last_id = self.conn.execute("SELECT COALESCE(MAX(ID_Vehicule), 0) FROM Vehicule").fetchone()[0]
+            self.conn.executemany(INSERT_VEHICULE, inserts)
+            self.conn.executemany(UPDATE_PRIX, [(prix, vehicule_id) for vehicule_id, prix in updates.values()])
+            # Les nouveaux véhicules deviennent des cibles d'upsert pour les paquets suivants
+            inserted = {}
+            if inserts:
+                ids = [row[0] for row in self.conn.execute(SELECT_INSERTED, (last_id,))]
+                if len(ids) != len(inserts):
+                    raise RuntimeError(f"{len(ids)} véhicules relus pour {len(inserts)} insérés")
+                inserted = {values[:7]: (vehicule_id, values[7]) for vehicule_id, values in zip(ids, inserts)}
+                self.existing.update(inserted)
+            if self.log_changes:
+                self._log_changes([values[0] for values in inserted.values()] + [values[0] for values in updates.values()])
+
+        self.existing.update(updates)
+        self.stats["inserted"] += len(inserts)
+        self.stats["updated"] += len(updates)
+        self.stats["unchanged"] += len(rows) - len(inserts) - len(updates)
+
+    # Une révision du catalogue par véhicule écrit, dans la transaction du paquet. Au-delà de la rétention du journal,
+    # les index en mémoire relisent de toute façon la table : la journalisation s'arrête et la révision est seulement
+    # incrémentée à la fin du chargement
+    def _log_changes(self, vehicule_ids):
+        if not vehicule_ids:
+            return
+        self.logged += len(vehicule_ids)
+        if self.logged > CHANGE_LOG_RETENTION:
+            self.log_changes = False
+            return
+        row = self.conn.execute("SELECT Version FROM Aggregate_Version WHERE Name = ?", (VEHICULES,)).fetchone()
+        version = row[0] if row else 0
+        changes = [(version + offset, vehicule_id) for offset, vehicule_id in enumerate(vehicule_ids, 1)]
+        self.conn.executemany(INSERT_CHANGE, changes)
+        self.conn.execute(SET_VERSION_SQL, {"name": VEHICULES, "version": version + len(vehicule_ids)})
+        self.conn.execute(PRUNE_CHANGES_SQL, {"name": VEHICULES, "retention": CHANGE_LOG_RETENTION})
+
+
+def has_tables(conn, *names):
+    rows = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' * len(names))})", names,
+    ).fetchone()
+    return rows[0] == len(names)
+
+
+# Index secondaires de Vehicule (hors clé primaire) : (nom, instruction CREATE INDEX)
+def vehicule_indexes(conn):
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Vehicule' AND sql IS NOT NULL"
+    ).fetchall()
+
+
+# Le chargement contourne le CRUD : recalculer l'agrégat marque × année en une requête et incrémenter sa révision
+# (s'il n'existe pas encore, l'API le construit à son démarrage). La révision du catalogue est tenue par le journal ;
+# sans journal, elle est seulement incrémentée (relecture complète des index en mémoire)
+def rebuild_aggregates(conn, log_changes):
+    if not has_tables(conn, "Aggregate_Version"):
+        return
+    with conn:
+        for sql in REBUILD_YEAR_BRAND_SQL:
+            conn.execute(sql)
+        conn.execute(BUMP_VERSION_SQL, {"name": YEAR_BRAND})
+        if not log_changes:
+            conn.execute(BUMP_VERSION_SQL, {"name": VEHICULES})
+
+
+# Lire le CSV par paquets (mémoire bornée par la taille du paquet) et les charger un à un.
+# Sur une table vide, les index sont supprimés pendant le chargement et reconstruits en une passe à la fin
+def load_csv(csv_path=DEFAULT_CSV, database_path=DEFAULT_DATABASE, chunk_rows=CHUNK_ROWS, defer_indexes=None):
+    conn = sqlite3.connect(database_path)
+    for name, value in LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    deferred = []
+    try:
+        loader = BulkLoader(conn)
+        if defer_indexes if defer_indexes is not None else not loader.existing:
+            deferred = vehicule_indexes(conn)
+            with conn:
+                for name, _ in deferred:
+                    conn.execute(f'DROP INDEX "{name}"')
+        for chunk in pd.read_csv(csv_path, usecols=CSV_COLUMNS, chunksize=chunk_rows):
+            loader.load_chunk(chunk)
+        rebuild_aggregates(conn, loader.log_changes)
+        return loader.stats
+    finally:
+        with conn:
+            for _, sql in deferred:
+                conn.execute(sql)
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Charger le CSV des véhicules dans la base SQLite (upsert).")
+    parser.add_argument("csv", nargs="?", default=DEFAULT_CSV)
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    stats = load_csv(args.csv, args.database, args.chunk_rows)
+    print(f"{stats['rows']} lignes lues en {time.perf_counter() - start:.2f} s : {stats['inserted']} insérées, "
+          f"{stats['updated']} mises à jour, {stats['unchanged']} inchangées, {stats['skipped']} ignorées")
+
+
+if __name__ == "__main__":
+    main()
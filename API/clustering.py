@@ -0,0 +1,157 @@
+import threading
+import numpy as np
+from sqlalchemy import bindparam, text
+from . import aggregates
+
+# Clustering Kilométrage/Prix calculé sur la table Vehicule (remplace le CSV produit hors ligne).
+# La révision du catalogue (aggregates.VEHICULES) signale les changements, prix et kilométrage compris :
+# une écriture faite par ce worker est appliquée en relisant la seule ligne concernée (refresh), celles d'un
+# autre worker en relisant les véhicules listés par le journal Vehicule_Change. Les véhicules ajoutés ou modifiés
+# sont intégrés par partial_fit, et un ajustement complet n'a lieu que lorsque la part de lignes changées depuis
+# le dernier dépasse refit_fraction
+SELECT_POINTS_SQL = """
+    SELECT ID_Vehicule, Kilometrage, Prix FROM Vehicule
+    WHERE Kilometrage IS NOT NULL AND Prix IS NOT NULL
+"""
+SELECT_CHANGED_POINTS_SQL = text(SELECT_POINTS_SQL + " AND ID_Vehicule IN :ids").bindparams(
+    bindparam("ids", expanding=True)
+)
+
+
+# Points étiquetés (même format que l'ancien CSV), sous-échantillonnés de façon déterministe si max_points est fourni
+def labeled_records(X, labels, max_points=None):
+    if max_points is not None and max_points < len(X):
+        selected = np.sort(np.random.default_rng(0).choice(len(X), max_points, replace=False))
+        X, labels = X[selected], labels[selected]
+    return [
+        {"Kilométrage": kilometrage, "Prix": prix, "Cluster": int(label)}
+        for (kilometrage, prix), label in zip(X.tolist(), labels)
+    ]
+
+
+class ClusteringService:
+    def __init__(self, n_clusters=3, batch_size=1024, refit_fraction=0.2, random_state=42):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.refit_fraction = refit_fraction
+        self.random_state = random_state
+        self.points = {}
+        self.scaler = None
+        self.model = None
+        self.version = None
+        self.changes_since_fit = 0
+        self.full_fits = 0
+        self.partial_fits = 0
+        self.full_syncs = 0
+        self.refreshes = 0
+        # Points et étiquettes de la révision courante, calculés à la première lecture
+        self._labeled = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.version is not None
+
+    # Vérifier la révision (une lecture par clé primaire) et n'interroger Vehicule que pour les lignes changées ;
+    # renvoie la révision appliquée
+    def sync(self, conn):
+        version = aggregates.get_version(conn, aggregates.VEHICULES)
+        with self._lock:
+            if version == self.version:
+                return self.version
+            changed = None if self.version is None else aggregates.changed_vehicules(conn, self.version, version)
+            if changed is None:
+                rows = conn.execute(text(SELECT_POINTS_SQL)).all()
+                current = {row[0]: (float(row[1]), float(row[2])) for row in rows}
+                changes = dict.fromkeys(self.points.keys() - current.keys())
+                changes.update(current)
+                self.full_syncs += 1
+            else:
+                changes = self._read_changes(conn, changed)
+            self._apply(changes)
+            self.version = version
+            return self.version
+
+    # Après une écriture de ce worker : si elle est la seule depuis la dernière synchronisation,
+    # relire uniquement ce véhicule ; sinon la prochaine synchronisation lira le journal
+    def refresh(self, conn, vehicule_id):
+        version = aggregates.get_version(conn, aggregates.VEHICULES)
+        with self._lock:
+            if self.version is None or version != self.version + 1:
+                return False
+            self._apply(self._read_changes(conn, {vehicule_id}))
+            self.version = version
+            self.refreshes += 1
+            return True
+
+    # Nouveaux points des véhicules relus (None : supprimé ou sans kilométrage ni prix)
+    @staticmethod
+    def _read_changes(conn, vehicule_ids):
+        changes = dict.fromkeys(vehicule_ids)
+        if vehicule_ids:
+            rows = conn.execute(SELECT_CHANGED_POINTS_SQL, {"ids": sorted(vehicule_ids)}).all()
+            changes.update((row[0], (float(row[1]), float(row[2]))) for row in rows)
+        return changes
+
+    def _apply(self, changes):
+        changed = []
+        for vehicule_id, point in changes.items():
+            previous = self.points.get(vehicule_id)
+            if point is None:
+                if previous is not None:
+                    del self.points[vehicule_id]
+                    self.changes_since_fit += 1
+            elif point != previous:
+                self.points[vehicule_id] = point
+                changed.append(point)
+                self.changes_since_fit += 1
+        self._labeled = None
+        if not self.points:
+            self.model = None
+        elif self.model is None or self.changes_since_fit > self.refit_fraction * len(self.points):
+            self._fit()
+        elif changed:
+            X = self.scaler.transform(np.array(changed))
+            for start in range(0, len(X), self.batch_size):
+                self.model.partial_fit(X[start:start + self.batch_size])
+                self.partial_fits += 1
+
+    def _fit(self):
+        # Import différé : scikit-learn n'est chargé qu'au premier appel de /data/clustering
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.preprocessing import StandardScaler
+
+        X = np.array(list(self.points.values()))
+        self.scaler = StandardScaler().fit(X)
+        n_clusters = min(self.n_clusters, len(X))
+        self.model = MiniBatchKMeans(
+            n_clusters=n_clusters, batch_size=self.batch_size, n_init=3, random_state=self.random_state,
+        ).fit(self.scaler.transform(X))
+        self.changes_since_fit = 0
+        self.full_fits += 1
+
+    # Révision appliquée, points et étiquettes lus ensemble sous le verrou (tableaux non modifiés ensuite)
+    def snapshot(self):
+        with self._lock:
+            if self._labeled is None:
+                X = np.array(list(self.points.values())).reshape(-1, 2)
+                labels = self.model.predict(self.scaler.transform(X)) if self.model is not None else np.empty(0, dtype=int)
+                self._labeled = (X, labels)
+            return (self.version, *self._labeled)
+
+    def records(self, max_points=None):
+        _, X, labels = self.snapshot()
+        return labeled_records(X, labels, max_points)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "points": len(self.points),
+                "version": self.version,
+                "full_fits": self.full_fits,
+                "partial_fits": self.partial_fits,
+                "changes_since_fit": self.changes_since_fit,
+                "full_syncs": self.full_syncs,
+                "refreshes": self.refreshes,
+                "centers": None if self.model is None else self.scaler.inverse_transform(self.model.cluster_centers_).tolist(),
+            }
@@ -0,0 +1,280 @@
+import json
+import os
+import sys
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from API.features import FEATURE_FIELDS, EncodedPipeline, FeatureEncoder, check_schema
+
+# Les arbres scikit-learn comparent les entrées converties en float32
+TREE_DTYPE = np.float32
+
+# Nombre maximal de lignes évaluées à la fois (borne la mémoire des grands lots)
+PREDICT_CHUNK_ROWS = 1024
+
+# Tableaux persistés (un fichier .npy chacun dans le format dossier)
+ARRAY_NAMES = ("means", "scales", "feature", "threshold", "left", "right", "value", "roots", "is_leaf")
+
+
+# Seuils arrondis vers le bas en float32 : pour x float32, x <= seuil64 équivaut à x <= seuil32
+def _float32_thresholds(threshold):
+    threshold = np.asarray(threshold)
+    if threshold.dtype == np.float32:
+        return threshold
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+# Représentation compilée d'un pipeline (StandardScaler + OneHotEncoder + RandomForestRegressor) :
+# tous les nœuds de tous les arbres sont stockés dans des tableaux contigus et
+# l'OneHotEncoder est remplacé par une table catégorie -> colonne précalculée.
+class CompiledForest:
+    def __init__(self, numeric_columns, means, scales, categorical_columns, category_columns,
+                 n_features, feature, threshold, left, right, value, roots, max_depth, is_leaf=None):
+        self.numeric_columns = list(numeric_columns)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.categorical_columns = list(categorical_columns)
+        # Pour chaque colonne catégorielle : {catégorie: indice de colonne dans la matrice encodée}
+        self.category_columns = [dict(mapping) for mapping in category_columns]
+        self.n_features = int(n_features)
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = _float32_thresholds(threshold)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.is_leaf = np.asarray(is_leaf, dtype=bool) if is_leaf is not None else self.left == np.arange(len(self.left))
+        self.encoder = FeatureEncoder(
+            self.numeric_columns, self.means, self.scales, self.categorical_columns, self.category_columns, self.n_features,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    # Encoder un DataFrame (colonnes d'entraînement) en matrice dense float32
+    def transform(self, X):
+        return self.encoder.encode_frame(X, TREE_DTYPE)
+
+    # Indices des feuilles atteintes, de forme (n_arbres, n_lignes)
+    def apply(self, encoded):
+        n_rows = encoded.shape[0]
+        flat = encoded.ravel()
+        leaves = np.empty(self.n_trees * n_rows, dtype=np.int32)
+        # Une entrée par paire (arbre, ligne) ; seules celles qui n'ont pas atteint une feuille avancent
+        nodes = np.repeat(self.roots, n_rows)
+        offsets = np.tile(np.arange(n_rows, dtype=np.int32) * self.n_features, self.n_trees)
+        positions = np.arange(self.n_trees * n_rows, dtype=np.int32)
+        while nodes.size:
+            go_left = flat[offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            done = self.is_leaf[nodes]
+            if done.any():
+                leaves[positions[done]] = nodes[done]
+                pending = ~done
+                nodes, offsets, positions = nodes[pending], offsets[pending], positions[pending]
+        return leaves.reshape(self.n_trees, n_rows)
+
+    # Prédictions de chaque arbre, de forme (n_arbres, n_lignes)
+    def predict_trees(self, X):
+        return self.value[self.apply(self.transform(X))]
+
+    # Idem sur une matrice déjà encodée : une seule indexation des tableaux de nœuds pour tous les arbres
+    def predict_trees_encoded(self, encoded):
+        return self.value[self.apply(np.ascontiguousarray(encoded, dtype=TREE_DTYPE))]
+
+    # Contributions par champ du schéma (méthode des chemins de décision) : à chaque division traversée, l'écart
+    # entre la valeur du nœud enfant et celle du nœud courant est attribué au champ de la colonne testée.
+    # Toutes les paires (arbre, ligne) avancent ensemble d'un niveau à chaque itération, comme dans apply.
+    # Renvoie (biais, contributions de forme (n_lignes, len(FEATURE_FIELDS))) : biais + somme = prédiction
+    def contributions_encoded(self, encoded):
+        encoded = np.ascontiguousarray(encoded, dtype=TREE_DTYPE)
+        n_fields = len(FEATURE_FIELDS)
+        contributions = [self._contributions_chunk(encoded[start:start + PREDICT_CHUNK_ROWS], n_fields)
+                         for start in range(0, encoded.shape[0], PREDICT_CHUNK_ROWS)]
+        bias = np.full(encoded.shape[0], self.value[self.roots].mean())
+        return bias, np.concatenate(contributions) if contributions else np.empty((0, n_fields))
+
+    def _contributions_chunk(self, encoded, n_fields):
+        n_rows = encoded.shape[0]
+        flat = encoded.ravel()
+        totals = np.zeros(n_rows * n_fields)
+        nodes = np.repeat(self.roots, n_rows)
+        rows = np.tile(np.arange(n_rows, dtype=np.intp), self.n_trees)
+        while nodes.size:
+            feature = self.feature[nodes]
+            go_left = flat[rows * self.n_features + feature] <= self.threshold[nodes]
+            children = np.where(go_left, self.left[nodes], self.right[nodes])
+            # Les feuilles pointent sur elles-mêmes : écart nul, puis la paire est retirée
+            totals += np.bincount(rows * n_fields + self.encoder.column_fields[feature],
+                                  weights=self.value[children] - self.value[nodes], minlength=n_rows * n_fields)
+            pending = ~self.is_leaf[children]
+            nodes, rows = children[pending], rows[pending]
+        return totals.reshape(n_rows, n_fields) / self.n_trees
+
+    # Moyenne des arbres sur une matrice déjà encodée
+    def _predict_chunk(self, encoded):
+        # Accumulation arbre par arbre, dans le même ordre que scikit-learn
+        return np.add.reduce(self.value[self.apply(encoded)], axis=0) / self.n_trees
+
+    def predict_encoded(self, encoded):
+        encoded = np.ascontiguousarray(encoded, dtype=TREE_DTYPE)
+        if encoded.shape[0] <= PREDICT_CHUNK_ROWS:
+            return self._predict_chunk(encoded)
+        return np.concatenate([self._predict_chunk(encoded[start:start + PREDICT_CHUNK_ROWS])
+                               for start in range(0, encoded.shape[0], PREDICT_CHUNK_ROWS)])
+
+    # Même interface que Pipeline.predict
+    def predict(self, X):
+        if len(X) == 0:
+            return np.empty(0, dtype=np.float64)
+        if len(X) > PREDICT_CHUNK_ROWS:
+            return np.concatenate([self.predict(X.iloc[start:start + PREDICT_CHUNK_ROWS])
+                                   for start in range(0, len(X), PREDICT_CHUNK_ROWS)])
+        return self._predict_chunk(self.transform(X))
+
+    # Requêtes encodées directement (voir API.features), sans DataFrame
+    def predict_requests(self, requests):
+        if not requests:
+            return np.empty(0, dtype=np.float64)
+        return np.concatenate([
+            self._predict_chunk(self.encoder.encode(requests[start:start + PREDICT_CHUNK_ROWS], TREE_DTYPE))
+            for start in range(0, len(requests), PREDICT_CHUNK_ROWS)
+        ])
+
+    def _metadata(self):
+        return {
+            "numeric_columns": self.numeric_columns,
+            "categorical_columns": self.categorical_columns,
+            "category_columns": [list(mapping.items()) for mapping in self.category_columns],
+            "n_features": self.n_features,
+            "max_depth": self.max_depth,
+        }
+
+    # Sauvegarde : fichier .npz unique, ou dossier de fichiers .npy non compressés
+    # (projetables en mémoire et partagés entre processus)
+    def save(self, path):
+        path = str(path)
+        arrays = {name: getattr(self, name) for name in ARRAY_NAMES}
+        if path.endswith(".npz"):
+            np.savez(path, metadata=np.array(json.dumps(self._metadata())), **arrays)
+            return
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        with open(os.path.join(path, "metadata.json"), "w", encoding="utf-8") as f:
+            json.dump(self._metadata(), f, ensure_ascii=False)
+
+    # Chargement ; `mmap_mode="r"` projette les tableaux d'un dossier en lecture seule
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        path = str(path)
+        if os.path.isdir(path):
+            with open(os.path.join(path, "metadata.json"), encoding="utf-8") as f:
+                metadata = json.load(f)
+            arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAY_NAMES}
+        else:
+            archive = np.load(path, allow_pickle=False)
+            metadata = json.loads(str(archive["metadata"]))
+            arrays = {name: archive[name] for name in archive.files if name != "metadata"}
+        return cls(
+            numeric_columns=metadata["numeric_columns"],
+            categorical_columns=metadata["categorical_columns"],
+            category_columns=[{category: column for category, column in items} for items in metadata["category_columns"]],
+            n_features=metadata["n_features"],
+            max_depth=metadata["max_depth"],
+            **arrays,
+        )
+
+
+# Chemin rapide pour la prédiction de prix : l'évaluateur compilé pour les petits lots
+# (latence dominée par le coût fixe de Pipeline.predict), le pipeline scikit-learn au-delà
+class FastPathForest:
+    def __init__(self, pipeline, compiled=None, max_rows=32):
+        self.pipeline = pipeline
+        self.encoded = EncodedPipeline(pipeline)
+        self.encoder = self.encoded.encoder
+        self.compiled = compiled if compiled is not None else compile_forest_pipeline(pipeline)
+        self.max_rows = max_rows
+
+    def predict(self, X):
+        if len(X) <= self.max_rows:
+            return self.compiled.predict(X)
+        return self.pipeline.predict(X)
+
+    def predict_requests(self, requests):
+        if len(requests) <= self.max_rows:
+            return self.compiled.predict_requests(requests)
+        return self.encoded.predict_requests(requests)
+
+    def contributions_encoded(self, encoded):
+        return self.compiled.contributions_encoded(encoded)
+
+    # Prédictions par arbre : forêt compilée pour les petits lots, une passe scikit-learn par arbre au-delà
+    def predict_trees_encoded(self, encoded):
+        if encoded.shape[0] <= self.max_rows:
+            return self.compiled.predict_trees_encoded(encoded)
+        return self.encoded.predict_trees_encoded(encoded)
+
+    def predict_encoded(self, encoded):
+        if encoded.shape[0] <= self.max_rows:
+            return self.compiled.predict_encoded(encoded)
+        return self.encoded.predict_encoded(encoded)
+
+
+# Concaténer les nœuds de tous les arbres ; les feuilles pointent sur elles-mêmes
+def _compile_trees(forest):
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        values.append(tree.value[:, 0, 0])
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+    return (np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+            np.concatenate(rights), np.concatenate(values), np.array(roots), max_depth)
+
+
+# Compiler un pipeline entraîné par models/random_forest_improved.py
+def compile_forest_pipeline(pipeline):
+    preprocessor = pipeline.named_steps.get("preprocessor")
+    forest = pipeline.named_steps.get("regressor")
+    if not isinstance(forest, RandomForestRegressor):
+        raise ValueError("Le pipeline doit contenir un RandomForestRegressor à l'étape 'regressor'")
+    if forest.n_outputs_ != 1:
+        raise ValueError("Seules les forêts à une seule sortie sont supportées")
+
+    check_schema(pipeline)
+    encoder = FeatureEncoder.from_preprocessor(preprocessor)
+    if encoder.n_features != forest.n_features_in_:
+        raise ValueError("Le nombre de colonnes encodées ne correspond pas à la forêt")
+    feature, threshold, left, right, value, roots, max_depth = _compile_trees(forest)
+    return CompiledForest(
+        encoder.numeric_columns, encoder.means, encoder.scales, encoder.categorical_columns, encoder.category_columns,
+        encoder.n_features, feature, threshold, left, right, value, roots, max_depth,
+    )
+
+
+# Étape de compilation : python -m API.compiled_forest models/random_forest_improved.pkl models/random_forest_compiled.npz
+if __name__ == "__main__":
+    import joblib
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "./models/random_forest_improved.pkl"
+    target = sys.argv[2] if len(sys.argv) > 2 else "./models/random_forest_compiled.npz"
+    compiled = compile_forest_pipeline(joblib.load(source))
+    compiled.save(target)
+    print(f"{compiled.n_trees} arbres, {compiled.n_nodes} nœuds, profondeur max {compiled.max_depth} -> {target}")
@@ -1,16 +1,71 @@
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException
-from . import models, schemas
-import bcrypt
+from . import models, schemas, pagination, aggregates, auth
+
+# Colonnes utilisables comme clé de tri (chacune couverte par un index composite avec ID_Vehicule)
+VEHICULE_SORT_COLUMNS = {
+    "id": models.Vehicule.id,
+    "prix": models.Vehicule.prix,
+    "annee": models.Vehicule.annee,
+    "kilometrage": models.Vehicule.kilometrage,
+}
+
+# Requête de liste des véhicules : filtres côté serveur et pagination par curseur (keyset) sur ID_Vehicule
+def vehicules_statement(skip: int = 0, limit: int = 10, cursor: str = None, sort: str = "id",
+                        marque: str = None, carburant: str = None, transmission: str = None,
+                        annee_min: int = None, annee_max: int = None, prix_min: float = None, prix_max: float = None,
+                        kilometrage_min: float = None, kilometrage_max: float = None):
+    Vehicule = models.Vehicule
+    query = select(Vehicule).options(joinedload(Vehicule.carburant), joinedload(Vehicule.transmission), joinedload(Vehicule.marque))
+
+    # Les noms sont résolus en identifiants par sous-requête sur les petites tables de référence
+    if marque is not None:
+        query = query.where(Vehicule.marque_id.in_(select(models.Marque.id_marque).where(func.lower(models.Marque.nom) == marque.lower())))
+    if carburant is not None:
+        query = query.where(Vehicule.carburant_id.in_(select(models.Carburant.id_carburant).where(func.lower(models.Carburant.type) == carburant.lower())))
+    if transmission is not None:
+        query = query.where(Vehicule.transmission_id.in_(select(models.Transmission.id_transmission).where(func.lower(models.Transmission.type) == transmission.lower())))
+    for column, low, high in ((Vehicule.annee, annee_min, annee_max), (Vehicule.prix, prix_min, prix_max),
+                              (Vehicule.kilometrage, kilometrage_min, kilometrage_max)):
+        if low is not None:
+            query = query.where(column >= low)
+        if high is not None:
+            query = query.where(column <= high)
+
+    key, descending = pagination.parse_sort(sort)
+    sort_column = VEHICULE_SORT_COLUMNS[key]
+    if cursor is not None:
+        # Reprendre après le dernier élément de la page précédente : même coût quelle que soit la profondeur
+        value, last_id = pagination.decode_cursor(cursor, sort)
+        if key == "id":
+            query = query.where(Vehicule.id < last_id if descending else Vehicule.id > last_id)
+        else:
+            position = tuple_(sort_column, Vehicule.id)
+            query = query.where(position < tuple_(value, last_id) if descending else position > tuple_(value, last_id))
+    elif skip:
+        query = query.offset(skip)
+
+    order = [sort_column.desc(), Vehicule.id.desc()] if descending else [sort_column.asc(), Vehicule.id.asc()]
+    if key == "id":
+        order = order[:1]
+    return query.order_by(*order).limit(limit)
 
 # Fonction pour obtenir la liste des véhicules
-def get_vehicules(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.Vehicule).options(joinedload(models.Vehicule.carburant), joinedload(models.Vehicule.transmission), joinedload(models.Vehicule.marque)).offset(skip).limit(limit).all()
+def get_vehicules(db: Session, skip: int = 0, limit: int = 10, **filters):
+    return db.scalars(vehicules_statement(skip=skip, limit=limit, **filters)).all()
+
+# Fonction pour obtenir un véhicule par ID
+def get_vehicule(db: Session, vehicule_id: int):
+    return db.query(models.Vehicule).filter(models.Vehicule.id == vehicule_id).first()
 
 # Fonction pour créer un nouveau véhicule
 def create_vehicule(db: Session, vehicule: schemas.VehiculeCreate):
     db_vehicule = models.Vehicule(**vehicule.dict())
     db.add(db_vehicule)
+    db.flush()
+    for statement in aggregates.vehicule_write_statements(db_vehicule.id, None, aggregates.vehicule_snapshot(db_vehicule)):
+        db.execute(statement)
     db.commit()
     db.refresh(db_vehicule)
     return db_vehicule
@@ -20,9 +75,12 @@ def update_vehicule(db: Session, vehicule_id: int, vehicule_update: schemas.Vehi
     db_vehicule = db.query(models.Vehicule).filter(models.Vehicule.id == vehicule_id).first()
     if not db_vehicule:
         raise HTTPException(status_code=404, detail="Véhicule non trouvé")
+    old = aggregates.vehicule_snapshot(db_vehicule)
     update_data = vehicule_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_vehicule, key, value)
+    for statement in aggregates.vehicule_write_statements(vehicule_id, old, aggregates.vehicule_snapshot(db_vehicule)):
+        db.execute(statement)
     db.commit()
     db.refresh(db_vehicule)
     return db_vehicule
@@ -36,7 +94,9 @@ def delete_vehicule(db: Session, vehicule_id: int):
         if not db_vehicule:
             raise HTTPException(status_code=404, detail="Véhicule non trouvé")
 
-        # Supprimer le véhicule
+        # Supprimer le véhicule (et sa contribution aux agrégats, dans la même transaction)
+        for statement in aggregates.vehicule_write_statements(vehicule_id, aggregates.vehicule_snapshot(db_vehicule), None):
+            db.execute(statement)
         db.delete(db_vehicule)
         db.commit()
 
@@ -59,6 +119,14 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
+# Fonction pour enregistrer un utilisateur dont le mot de passe est déjà haché
+def create_user_with_hash(db: Session, username: str, email: str, hashed_password: str):
+    db_user = models.User(username=username, email=email, hashed_password=hashed_password)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
 # Fonction pour obtenir un utilisateur par nom d'utilisateur
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
@@ -76,21 +144,28 @@ def get_all_users(db: Session, skip: int = 0, limit: int = 10):
     return db.query(models.User).offset(skip).limit(limit).all()
 
 # Fonction pour mettre à jour les informations d'un utilisateur
-def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
+# (hashed_password : hachage déjà calculé par l'appelant, sinon le mot de passe est haché ici)
+def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate, hashed_password: str = None):
     db_user = get_user_by_id(db, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     update_data = user_update.dict(exclude_unset=True)
-    if "password" in update_data and update_data["password"]:
-        hashed_password = bcrypt.hashpw(update_data["password"].encode('utf-8'), bcrypt.gensalt())
-        db_user.hashed_password = hashed_password.decode('utf-8')
-        del update_data["password"]
+    password = update_data.pop("password", None)
+    if password and hashed_password is None:
+        hashed_password = auth.hash_password(password)
+    if hashed_password:
+        db_user.hashed_password = hashed_password
     for key, value in update_data.items():
         setattr(db_user, key, value)
     db.commit()
     db.refresh(db_user)
     return db_user
 
+# Remplacer le hachage du mot de passe (re-hachage avec le coût bcrypt configuré)
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.query(models.User).filter(models.User.id == user_id).update({models.User.hashed_password: hashed_password})
+    db.commit()
+
 # Fonction pour supprimer un utilisateur
 def delete_user(db: Session, user_id: int):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -1,10 +1,69 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool
+from .metrics import METRICS_ENABLED, install_query_metrics
 
-DATABASE_URL = "sqlite:///./voitures_aramisauto.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./voitures_aramisauto.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Mode production SQLite (DATABASE_TUNING=1 par défaut) : journal WAL pour que les lectures
+# ne soient plus bloquées par les écritures, et PRAGMA appliqués à chaque nouvelle connexion du pool
+DATABASE_TUNING = os.getenv("DATABASE_TUNING", "1") == "1"
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Valeur négative : taille en Kio (64 Mio)
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+# Appliquer les PRAGMA à chaque connexion ouverte par un moteur (synchrone ou sync_engine d'un moteur asynchrone)
+def install_sqlite_pragmas(sync_engine, pragmas):
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+# Créer le moteur SQLAlchemy ; toutes les requêtes (ORM et SQL brut) passent par son pool
+def create_db_engine(url=DATABASE_URL, tuning=DATABASE_TUNING, pragmas=None):
+    if not tuning or not url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+    install_sqlite_pragmas(db_engine, pragmas or SQLITE_PRAGMAS)
+    return db_engine
+
+engine = create_db_engine()
+if METRICS_ENABLED:
+    install_query_metrics(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+# Accès asynchrone (AsyncSession + aiosqlite), activé par DATABASE_ASYNC=1
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "0") == "1"
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1))
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    if DATABASE_TUNING and ASYNC_DATABASE_URL.startswith("sqlite"):
+        install_sqlite_pragmas(async_engine.sync_engine, SQLITE_PRAGMAS)
+    if METRICS_ENABLED:
+        install_query_metrics(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
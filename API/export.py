@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from . import models
+
+# Export du catalogue : lignes lues par un curseur côté serveur et encodées par paquets,
+# sans construire d'objet ORM ni de schéma Pydantic par véhicule
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+EXPORT_CHUNK_ROWS = 1000
+
+# Colonnes exportées, avec les libellés des tables de référence
+def export_statement():
+    Vehicule = models.Vehicule
+    return (
+        select(
+            Vehicule.id.label("id"),
+            models.Marque.nom.label("marque"),
+            Vehicule.modele.label("modele"),
+            Vehicule.annee.label("annee"),
+            Vehicule.kilometrage.label("kilometrage"),
+            Vehicule.prix.label("prix"),
+            Vehicule.etat.label("etat"),
+            models.Carburant.type.label("carburant"),
+            models.Transmission.type.label("transmission"),
+        )
+        .outerjoin(models.Marque, Vehicule.marque_id == models.Marque.id_marque)
+        .outerjoin(models.Carburant, Vehicule.carburant_id == models.Carburant.id_carburant)
+        .outerjoin(models.Transmission, Vehicule.transmission_id == models.Transmission.id_transmission)
+        .order_by(Vehicule.id)
+    )
+
+# Parcourir le résultat par paquets de tuples ; la connexion reste ouverte le temps du flux
+def iter_partitions(engine, chunk_rows=EXPORT_CHUNK_ROWS):
+    statement = export_statement()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(statement)
+        yield list(result.keys())
+        for partition in result.partitions():
+            yield partition
+
+def encode_ndjson(columns, rows):
+    return "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+def encode_csv(columns, rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+# Générateur d'octets pour StreamingResponse (gzip en flux si compress=True)
+def iter_export(engine, fmt="ndjson", compress=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu : {fmt}")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    partitions = iter_partitions(engine, chunk_rows)
+    columns = next(partitions)
+
+    def chunks():
+        if fmt == "csv":
+            yield encode_csv(columns, [], header=True)
+        for rows in partitions:
+            yield encode_ndjson(columns, rows) if fmt == "ndjson" else encode_csv(columns, rows)
+
+    for data in chunks():
+        if compressor:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
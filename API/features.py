@@ -0,0 +1,255 @@
+import hashlib
+import json
+import numpy as np
+from types import SimpleNamespace
+
+# Schéma des caractéristiques, défini une seule fois pour l'entraînement et le service :
+# (champ de PredictRequest, colonne du CSV d'entraînement, type)
+FEATURE_SCHEMA = (
+    ("annee", "Année", "numeric"),
+    ("kilometrage", "Kilométrage", "numeric"),
+    ("marque", "Marque", "categorical"),
+    ("modele", "Modèle", "categorical"),
+    ("etat", "Etat", "categorical"),
+    ("carburant", "Type de Carburant", "categorical"),
+    ("transmission", "Transmission", "categorical"),
+)
+FIELD_TO_COLUMN = {field: column for field, column, _ in FEATURE_SCHEMA}
+COLUMN_TO_FIELD = {column: field for field, column, _ in FEATURE_SCHEMA}
+FEATURE_COLUMNS = tuple(column for _, column, _ in FEATURE_SCHEMA)
+NUMERIC_COLUMNS = tuple(column for _, column, kind in FEATURE_SCHEMA if kind == "numeric")
+CATEGORICAL_COLUMNS = tuple(column for _, column, kind in FEATURE_SCHEMA if kind == "categorical")
+FEATURE_FIELDS = tuple(field for field, _, _ in FEATURE_SCHEMA)
+# En dessous de ce nombre de lignes, SharedEncoder écrit les catégories une par une plutôt que par indices
+SMALL_BATCH_ROWS = 32
+# Empreinte du schéma, enregistrée dans chaque artefact entraîné
+SCHEMA_VERSION = hashlib.sha256(json.dumps(FEATURE_SCHEMA, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+
+def schema_dict():
+    return {"version": SCHEMA_VERSION, "features": [list(feature) for feature in FEATURE_SCHEMA]}
+
+
+# Colonnes du schéma, dans l'ordre, à partir d'un DataFrame d'entraînement
+def feature_frame(df):
+    return df[list(FEATURE_COLUMNS)]
+
+
+# Requêtes (objets portant les champs du schéma, comme PredictRequest) construites à partir des lignes d'un DataFrame
+def frame_requests(X):
+    return [SimpleNamespace(**{COLUMN_TO_FIELD[column]: value for column, value in row.items()})
+            for row in feature_frame(X).to_dict(orient="records")]
+
+
+# Préprocesseur des pipelines entraînés : StandardScaler sur les colonnes numériques, OneHotEncoder sur les autres
+def build_preprocessor():
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    return ColumnTransformer(transformers=[
+        ("num", StandardScaler(), list(NUMERIC_COLUMNS)),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), list(CATEGORICAL_COLUMNS)),
+    ])
+
+
+# Un artefact entraîné avec un autre schéma ne doit pas être servi
+def check_schema(model):
+    stored = getattr(model, "feature_schema", None)
+    if stored is not None and stored.get("version") != SCHEMA_VERSION:
+        raise ValueError(f"Schéma de caractéristiques {stored.get('version')} différent du schéma courant {SCHEMA_VERSION}")
+
+
+# Encodage d'un ColumnTransformer ajusté (StandardScaler + OneHotEncoder) reproduit sans pandas :
+# les requêtes sont écrites directement dans une matrice préallouée, colonnes repérées par leur nom
+class FeatureEncoder:
+    def __init__(self, numeric_columns, means, scales, categorical_columns, category_columns, n_features):
+        self.numeric_columns = list(numeric_columns)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.categorical_columns = list(categorical_columns)
+        # Pour chaque colonne catégorielle : {catégorie: indice de colonne dans la matrice encodée}
+        self.category_columns = [dict(mapping) for mapping in category_columns]
+        self.n_features = int(n_features)
+        self.numeric_fields = [COLUMN_TO_FIELD[column] for column in self.numeric_columns]
+        self.categorical_fields = [COLUMN_TO_FIELD[column] for column in self.categorical_columns]
+        # Champ du schéma (indice dans FEATURE_FIELDS) de chaque colonne encodée :
+        # les colonnes one-hot d'une variable catégorielle sont regroupées sur son champ
+        self.column_fields = np.empty(self.n_features, dtype=np.intp)
+        for position, field in enumerate(self.numeric_fields):
+            self.column_fields[position] = FEATURE_FIELDS.index(field)
+        for field, mapping in zip(self.categorical_fields, self.category_columns):
+            self.column_fields[list(mapping.values())] = FEATURE_FIELDS.index(field)
+
+    # Extraire les colonnes et paramètres du ColumnTransformer, en vérifiant qu'ils suivent le schéma
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise ValueError("Le préprocesseur doit être un ColumnTransformer")
+
+        numeric_columns, means, scales = [], [], []
+        categorical_columns, category_columns = [], []
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or name == "remainder":
+                continue
+            columns = list(columns)
+            if isinstance(transformer, StandardScaler):
+                if categorical_columns:
+                    raise ValueError("Les colonnes numériques doivent précéder les colonnes catégorielles")
+                numeric_columns.extend(columns)
+                means.extend(transformer.mean_ if transformer.with_mean else np.zeros(len(columns)))
+                scales.extend(transformer.scale_ if transformer.with_std else np.ones(len(columns)))
+                offset += len(columns)
+            elif isinstance(transformer, OneHotEncoder):
+                if transformer.drop is not None or getattr(transformer, "_infrequent_enabled", False):
+                    raise ValueError("OneHotEncoder avec drop ou catégories peu fréquentes non supporté")
+                for column, categories in zip(columns, transformer.categories_):
+                    categorical_columns.append(column)
+                    category_columns.append({category: offset + i for i, category in enumerate(categories.tolist())})
+                    offset += len(categories)
+            else:
+                raise ValueError(f"Transformateur non supporté : {type(transformer).__name__}")
+
+        if set(numeric_columns) != set(NUMERIC_COLUMNS) or set(categorical_columns) != set(CATEGORICAL_COLUMNS):
+            raise ValueError(f"Colonnes du préprocesseur différentes du schéma : {numeric_columns + categorical_columns}")
+        return cls(numeric_columns, means, scales, categorical_columns, category_columns, offset)
+
+    def _fill_categories(self, encoded, columns_values):
+        for mapping, values in zip(self.category_columns, columns_values):
+            # Les catégories inconnues restent à zéro (équivalent de handle_unknown='ignore')
+            for row, value in enumerate(values):
+                column = mapping.get(value)
+                if column is not None:
+                    encoded[row, column] = 1.0
+
+    # Encoder des requêtes (objets portant les champs du schéma, par exemple PredictRequest)
+    def encode(self, requests, dtype=np.float64):
+        encoded = np.zeros((len(requests), self.n_features), dtype=dtype)
+        if not requests:
+            return encoded
+        numeric = np.array([[getattr(request, field) for field in self.numeric_fields] for request in requests],
+                           dtype=np.float64)
+        encoded[:, :len(self.numeric_fields)] = (numeric - self.means) / self.scales
+        self._fill_categories(encoded, ([getattr(request, field) for request in requests]
+                                        for field in self.categorical_fields))
+        return encoded
+
+    # Encoder un DataFrame portant les colonnes d'entraînement
+    def encode_frame(self, X, dtype=np.float64):
+        encoded = np.zeros((len(X), self.n_features), dtype=dtype)
+        if len(X) == 0:
+            return encoded
+        numeric = np.column_stack([np.asarray(X[column], dtype=np.float64) for column in self.numeric_columns])
+        encoded[:, :len(self.numeric_columns)] = (numeric - self.means) / self.scales
+        self._fill_categories(encoded, (X[column].tolist() for column in self.categorical_columns))
+        return encoded
+
+
+# Pipeline scikit-learn servi sans son ColumnTransformer : les requêtes sont encodées par FeatureEncoder
+# puis passées à l'estimateur final (predict sur un DataFrame reste disponible)
+class EncodedPipeline:
+    def __init__(self, pipeline):
+        check_schema(pipeline)
+        self.pipeline = pipeline
+        self.encoder = FeatureEncoder.from_preprocessor(pipeline.named_steps["preprocessor"])
+        self.estimator = pipeline.steps[-1][1]
+        self.compiled = None
+
+    def predict(self, X):
+        return self.pipeline.predict(X)
+
+    # Matrice déjà encodée par self.encoder (ou projetée par SharedEncoder)
+    def predict_encoded(self, encoded):
+        return self.estimator.predict(encoded)
+
+    # Contributions par champ (voir CompiledForest.contributions_encoded), forêt compilée au premier appel
+    def contributions_encoded(self, encoded):
+        if self.compiled is None:
+            from API.compiled_forest import compile_forest_pipeline
+            self.compiled = compile_forest_pipeline(self.pipeline)
+        return self.compiled.contributions_encoded(encoded)
+
+    # Prédictions de chaque arbre d'une forêt de régression, de forme (n_arbres, n_lignes) :
+    # une passe par arbre sur tout le lot, comme RandomForestRegressor.predict
+    def predict_trees_encoded(self, encoded):
+        trees = getattr(self.estimator, "estimators_", None)
+        if trees is None or getattr(self.estimator, "n_outputs_", None) != 1 or not hasattr(trees[0], "tree_"):
+            raise ValueError("Prédictions par arbre disponibles uniquement pour une forêt de régression")
+        encoded = np.ascontiguousarray(encoded, dtype=np.float32)
+        return np.stack([tree.predict(encoded, check_input=False) for tree in trees])
+
+    def predict_requests(self, requests):
+        return self.estimator.predict(self.encoder.encode(requests))
+
+
+# Encodage commun à plusieurs FeatureEncoder ajustés sur les mêmes colonnes (préprocesseurs des deux modèles) :
+# les champs des requêtes sont lus une seule fois (valeurs numériques brutes + code de catégorie dans l'union
+# des catégories), puis la matrice de chaque modèle est remplie de façon vectorisée avec ses propres paramètres
+class SharedEncoder:
+    def __init__(self, encoders):
+        self.encoders = list(encoders)
+        self.numeric_fields = [COLUMN_TO_FIELD[column] for column in NUMERIC_COLUMNS]
+        self.categorical_fields = [COLUMN_TO_FIELD[column] for column in CATEGORICAL_COLUMNS]
+        # Codes de l'union des catégories, par colonne catégorielle
+        self.category_codes = [{} for _ in CATEGORICAL_COLUMNS]
+        for encoder in self.encoders:
+            for column, mapping in zip(encoder.categorical_columns, encoder.category_columns):
+                codes = self.category_codes[CATEGORICAL_COLUMNS.index(column)]
+                for category in sorted(mapping, key=mapping.get):
+                    codes.setdefault(category, len(codes))
+        offsets = np.cumsum([0] + [len(codes) for codes in self.category_codes])
+        self.category_codes = [{category: offset + code for category, code in codes.items()}
+                               for codes, offset in zip(self.category_codes, offsets)]
+        self.n_codes = int(offsets[-1])
+        # Par modèle : ordre de ses colonnes numériques (None s'il suit le schéma) et colonne de chaque code.
+        # Une catégorie inconnue du modèle pointe une colonne après la dernière, c'est-à-dire la première colonne
+        # numérique de la ligne suivante (réécrite ensuite) ou une case supplémentaire pour la dernière ligne ;
+        # la dernière case de la table correspond au code -1 des catégories inconnues de tous les modèles
+        self.numeric_index, self.code_columns, self.code_lists = [], [], []
+        for encoder in self.encoders:
+            if not encoder.numeric_columns:
+                raise ValueError("Au moins une colonne numérique est nécessaire")
+            order = [NUMERIC_COLUMNS.index(column) for column in encoder.numeric_columns]
+            self.numeric_index.append(None if order == list(range(len(NUMERIC_COLUMNS))) else np.array(order))
+            columns = np.full(self.n_codes + 1, encoder.n_features, dtype=np.intp)
+            for column, mapping in zip(encoder.categorical_columns, encoder.category_columns):
+                codes = self.category_codes[CATEGORICAL_COLUMNS.index(column)]
+                for category, position in mapping.items():
+                    columns[codes[category]] = position
+            self.code_columns.append(columns)
+            self.code_lists.append(columns.tolist())
+
+    # Lecture unique des requêtes : (valeurs numériques brutes, codes de catégorie par ligne)
+    def encode(self, requests):
+        numeric = np.array([[getattr(request, field) for field in self.numeric_fields] for request in requests],
+                           dtype=np.float64).reshape(len(requests), len(self.numeric_fields))
+        codes = [[mapping.get(getattr(request, field), -1)
+                  for field, mapping in zip(self.categorical_fields, self.category_codes)]
+                 for request in requests]
+        return numeric, codes
+
+    # Matrice du modèle d'indice `index`, identique à celle produite par son propre FeatureEncoder
+    def project(self, shared, index, dtype=np.float64):
+        numeric, codes = shared
+        encoder = self.encoders[index]
+        n_rows, n_features = len(numeric), encoder.n_features
+        flat = np.zeros(n_rows * n_features + 1, dtype=dtype)
+        if n_rows <= SMALL_BATCH_ROWS:
+            # Petits lots : écriture directe, moins coûteuse que les tableaux d'indices
+            columns = self.code_lists[index]
+            for offset, row_codes in zip(range(0, n_rows * n_features, n_features), codes):
+                for code in row_codes:
+                    flat[offset + columns[code]] = 1.0
+        else:
+            positions = self.code_columns[index][np.array(codes, dtype=np.intp)]
+            positions += np.arange(0, n_rows * n_features, n_features)[:, None]
+            flat[positions] = 1.0
+        encoded = flat[:-1].reshape(n_rows, n_features)
+        # Après les catégories : écrase les uns écrits par les catégories inconnues de la ligne précédente
+        order = self.numeric_index[index]
+        values = numeric if order is None else numeric[:, order]
+        encoded[:, :len(encoder.numeric_columns)] = (values - encoder.means) / encoder.scales
+        return encoded
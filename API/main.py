@@ -1,19 +1,25 @@
-from fastapi import FastAPI, HTTPException, Depends, APIRouter, status
-# from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from API.startup import StartupProfile
+from fastapi import FastAPI, HTTPException, Depends, APIRouter, Header, Query, Request, Response, status
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from API import models, schemas, crud
-from API.database import SessionLocal, engine
-import joblib
-import numpy as np
-import pandas as pd
+from API import models, schemas, crud, async_crud, prediction, pagination, export, aggregates
+from API.auth import PasswordHasher, TokenCache
+from API.features import EncodedPipeline
+from API.batching import MicroBatcher
+from API.prediction_cache import GridCache, PredictionCache
+from API.model_registry import ModelRegistry, ModelUnavailableError
+from API.shared_models import process_memory
+from API.clustering import ClusteringService, labeled_records
+from API.similarity import SimilarityIndex, vehicule_exists
+from API.response_cache import ResponseCache
+from API import metrics
+from API.database import SessionLocal, AsyncSessionLocal, DATABASE_ASYNC, engine
 import logging
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 import os
-import sqlite3
-import bcrypt
 import jwt
 from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordBearer
@@ -22,19 +28,30 @@ from fastapi.security import OAuth2PasswordBearer
 
 # Utiliser un chemin absolu basé sur le dossier actuel
 base_dir = os.path.dirname(os.path.abspath(__file__))
-# Définir les chemins vers les fichiers CSV respectifs
-year_brand_csv_path = os.path.join(base_dir, "../data/visualizations/year_brand_distribution.csv")
-clustering_csv_path = os.path.join(base_dir, "../data/visualizations/clustering_data.csv")
 
-# Lire les fichiers CSV avec leurs chemins respectifs
-year_brand_df = pd.read_csv(year_brand_csv_path)
-clustering_df = pd.read_csv(clustering_csv_path)
-
-# Configurer le logging
-logging.basicConfig(level=logging.INFO)
+# Profil de démarrage (STARTUP_PROFILE=1 pour journaliser chaque phase) ; pandas, scikit-learn et joblib
+# ne sont importés qu'au chargement des modèles, dans le thread de préchauffage
+startup_profile = StartupProfile(enabled=os.getenv("STARTUP_PROFILE", "0") == "1")
+startup_state = {"database": False}
+
+# Configurer le logging (LOG_LEVEL=DEBUG pour journaliser le détail de chaque prédiction)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+# Démarrage : préparation de la base, puis préchauffage des modèles (en arrière-plan par défaut)
+@asynccontextmanager
+async def lifespan(app):
+    with startup_profile.phase("database"):
+        await run_in_threadpool(prepare_database)
+    startup_state["database"] = True
+    if MODEL_WARMUP == "lazy":
+        startup_profile.ready()
+    else:
+        await run_in_threadpool(model_registry.warm_up, background=MODEL_WARMUP != "eager", on_complete=on_models_loaded)
+    yield
+    password_hasher.shutdown()
 
 # Initialiser l'application FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 router = APIRouter()
 
 # Ajouter le middleware CORS
@@ -47,19 +64,82 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Curseur de pagination de /vehicules/ lisible par le frontend
 )
 
-# Dépendance pour obtenir une session DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Latence par route, requêtes en cours et requêtes SQL par requête HTTP (exposées sur /metrics)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Dépendance pour obtenir une session DB (AsyncSession si DATABASE_ASYNC=1)
+if DATABASE_ASYNC:
+    async def get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+else:
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+# Registre des modèles : chargement paresseux, suivi des versions et remplacement à chaud.
+# Un remplacement est publié dans MODEL_POINTER_FILE (par défaut active_models.json dans le dossier des modèles) :
+# les autres workers le suivent au plus MODEL_POINTER_CHECK_SECONDS plus tard, avant leur prochaine prédiction
+PRICE_MODEL = "random_forest"
+DEAL_MODEL = "gradient_boosting"
+MODELS_DIR = os.getenv("MODELS_DIR", os.path.join(base_dir, "../models"))
+model_registry = ModelRegistry(
+    MODELS_DIR,
+    mmap_mode=os.getenv("MODEL_MMAP_MODE", "r"),
+    pointer_file=os.getenv("MODEL_POINTER_FILE", os.path.join(MODELS_DIR, "active_models.json")),
+    pointer_check_interval=float(os.getenv("MODEL_POINTER_CHECK_SECONDS", "1")),
+)
 
-# Charger les modèles nécessaires
-random_forest_model = joblib.load("./models/random_forest_improved.pkl")
-logistic_model = joblib.load("./models/gradient_boosting_classifier.pkl")
+# Chemin rapide compilé pour la forêt de prix (petits lots), scikit-learn au-delà
+def load_price_model(pipeline):
+    if os.getenv("PRICE_MODEL_FAST_PATH", "1") == "1":
+        from API.compiled_forest import FastPathForest
+        return FastPathForest(pipeline, max_rows=int(os.getenv("PRICE_MODEL_FAST_PATH_MAX_ROWS", "32")))
+    return EncodedPipeline(pipeline)
+
+# Forêt de prix exportée au format plat et projetée en mémoire (mode "shared")
+def load_price_model_shared(path):
+    from API.shared_models import load_shared_price_model
+    return load_shared_price_model(path, SHARED_MODELS_DIR)
+
+# Mode de service : "process" (chaque worker charge ses modèles) ou "shared" (forêt de prix exportée
+# au format plat et projetée en mémoire, les pages sont partagées par tous les workers uvicorn)
+MODEL_SERVING_MODE = os.getenv("MODEL_SERVING_MODE", "process")
+SHARED_MODELS_DIR = os.getenv("SHARED_MODELS_DIR", os.path.join(model_registry.models_dir, "shared"))
+
+if MODEL_SERVING_MODE == "shared":
+    model_registry.register(
+        PRICE_MODEL, os.getenv("PRICE_MODEL_FILE", "random_forest_improved.pkl"),
+        loader=load_price_model_shared,
+    )
+else:
+    model_registry.register(PRICE_MODEL, os.getenv("PRICE_MODEL_FILE", "random_forest_improved.pkl"), post_load=load_price_model)
+# Les requêtes sont encodées selon le schéma d'API.features puis passées directement à l'estimateur
+model_registry.register(DEAL_MODEL, os.getenv("DEAL_MODEL_FILE", "gradient_boosting_classifier.pkl"), post_load=EncodedPipeline)
+
+# Préchauffage des modèles au démarrage : "background" (par défaut), "eager" ou "lazy"
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "background")
+
+# Fin du préchauffage : durées de chargement et rapport mémoire du worker
+def on_models_loaded():
+    for name, info in model_registry.info().items():
+        if info["loaded"]:
+            startup_profile.record(f"model:{name}", info["load_seconds"])
+    logging.info(f"Mémoire du worker (mode {MODEL_SERVING_MODE}) : {process_memory()}")
+    startup_profile.ready()
+
+# Tables, index et agrégats ajoutés depuis la création de la base
+def prepare_database():
+    models.Base.metadata.create_all(bind=engine)
+    models.ensure_indexes(engine)
+    aggregates.ensure_built(engine)
 
 # Sécurité pour la clé secrète JWT
 SECRET_KEY = "SECRET_JWT_KEY"  # Changez cela pour un secret sécurisé
@@ -67,11 +147,38 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# bcrypt dans un pool de processus borné (AUTH_HASH_WORKERS=0 : pool de threads), coût BCRYPT_ROUNDS
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_pending=int(os.getenv("AUTH_HASH_MAX_PENDING", "64")),
+)
+# Tokens déjà vérifiés (AUTH_TOKEN_CACHE_SIZE=0 pour désactiver)
+token_cache = TokenCache(
+    maxsize=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_TOKEN_CACHE_TTL", "60")),
+)
+
 # Endpoint de base pour vérifier le statut de l'API
 @app.get("/")
 def root():
     return {"message": "Bienvenue sur le backend de Voitures Occasions !"}
 
+# Métriques du worker au format texte Prometheus
+@app.get("/metrics")
+def get_metrics():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+# Disponibilité du worker : base préparée et modèles chargés (sauf en MODEL_WARMUP=lazy), 503 sinon
+@app.get("/ready")
+def ready():
+    models_info = {
+        name: {"loaded": info["loaded"], "error": info.get("error")} for name, info in model_registry.info().items()
+    }
+    models_ready = MODEL_WARMUP == "lazy" or all(info["loaded"] for info in models_info.values())
+    is_ready = startup_state["database"] and models_ready
+    body = {"ready": is_ready, "models": models_info, "startup": startup_profile.report()}
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
 # Modèle pour la création d'un utilisateur
 class UserCreate(BaseModel):
     username: str
@@ -85,38 +192,40 @@ class UserLogin(BaseModel):
 
 # Endpoint pour l'inscription
 @app.post("/register", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db=Depends(get_db)):
     # Vérifier si l'utilisateur existe déjà
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await async_crud.call("get_user_by_username", db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Nom d'utilisateur déjà pris")
 
-    # Hash du mot de passe
-    hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt())
+    # Hash du mot de passe (dans le pool bcrypt, hors de la boucle d'événements)
+    hashed_password = await password_hasher.hash(user.password)
 
     # Créer un nouvel utilisateur
-    new_user = models.User(
+    return await async_crud.call(
+        "create_user_with_hash", db,
         username=user.username,
         email=user.email,
-        hashed_password=hashed_password.decode('utf-8')  # Assurez-vous d'utiliser hashed_password ici
+        hashed_password=hashed_password  # Assurez-vous d'utiliser hashed_password ici
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
 
 # Endpoint pour la connexion
 @app.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db=Depends(get_db)):
     # Chercher l'utilisateur par le nom d'utilisateur
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await async_crud.call("get_user_by_username", db, username=user.username)
     if not db_user:
         raise HTTPException(status_code=400, detail="Nom d'utilisateur ou mot de passe incorrect")
 
     # Vérifier le mot de passe
-    if not bcrypt.checkpw(user.password.encode('utf-8'), db_user.hashed_password.encode('utf-8')):
+    if not await password_hasher.verify(user.password, db_user.hashed_password):
         raise HTTPException(status_code=400, detail="Nom d'utilisateur ou mot de passe incorrect")
 
+    # Hachage fait avec un autre coût que BCRYPT_ROUNDS : le refaire tant que le mot de passe est connu
+    if password_hasher.needs_rehash(db_user.hashed_password):
+        hashed_password = await password_hasher.hash(user.password)
+        await async_crud.call("update_password_hash", db, user_id=db_user.id, hashed_password=hashed_password)
+
     # Créer un token JWT
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     payload = {
@@ -128,7 +237,11 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Middleware pour authentifier l'utilisateur à l'aide du token JWT
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# (un token déjà vérifié et non expiré est servi par token_cache, sans décodage ni lecture en base)
+async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
@@ -139,35 +252,97 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide")
 
-    db_user = crud.get_user_by_username(db, username=username)
+    db_user = await async_crud.call("get_user_by_username", db, username=username)
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Utilisateur non trouvé")
 
-    return db_user
+    # Copie détachée de la session, réutilisable par les requêtes suivantes
+    current_user = schemas.User(
+        id=db_user.id, email=db_user.email, username=db_user.username, hashed_password=db_user.hashed_password,
+    )
+    token_cache.put(token, current_user, payload.get("exp", float("inf")))
+    return current_user
+
+# Index des véhicules similaires (plus proches voisins par marque × carburant × transmission),
+# chargé au premier appel de /similar puis tenu à jour à chaque écriture
+similarity_index = SimilarityIndex()
+
+def sync_similarity_index():
+    with engine.connect() as conn:
+        similarity_index.sync(conn)
+
+def refresh_similarity_index(vehicule_id):
+    with engine.connect() as conn:
+        similarity_index.refresh(conn, vehicule_id)
+
+def refresh_clustering(vehicule_id):
+    with engine.connect() as conn:
+        clustering_service.refresh(conn, vehicule_id)
+
+# Appliquer l'écriture d'un véhicule à l'index et au clustering déjà chargés, sans attendre la prochaine synchronisation
+async def refresh_vehicule_indexes(vehicule_id):
+    if similarity_index.loaded:
+        await run_in_threadpool(refresh_similarity_index, vehicule_id)
+    if clustering_service.loaded:
+        await run_in_threadpool(refresh_clustering, vehicule_id)
 
 # Endpoints CRUD pour les véhicules
+# Liste paginée : passer le curseur de l'en-tête X-Next-Cursor pour obtenir la page suivante
+# (skip reste accepté pour la compatibilité, mais son coût croît avec la profondeur)
 @app.get("/vehicules/", response_model=list[schemas.Vehicule])
-def read_vehicules(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_vehicules(db, skip=skip, limit=limit)
+async def read_vehicules(response: Response, skip: int = 0, limit: int = Query(10, ge=1, le=1000),
+                         cursor: Optional[str] = None, sort: str = Query("id", pattern=pagination.SORT_PATTERN),
+                         marque: Optional[str] = None, carburant: Optional[str] = None, transmission: Optional[str] = None,
+                         annee_min: Optional[int] = None, annee_max: Optional[int] = None,
+                         prix_min: Optional[float] = None, prix_max: Optional[float] = None,
+                         kilometrage_min: Optional[float] = None, kilometrage_max: Optional[float] = None,
+                         db=Depends(get_db)):
+    try:
+        vehicules = await async_crud.call(
+            "get_vehicules", db, skip=skip, limit=limit, cursor=cursor, sort=sort,
+            marque=marque, carburant=carburant, transmission=transmission,
+            annee_min=annee_min, annee_max=annee_max, prix_min=prix_min, prix_max=prix_max,
+            kilometrage_min=kilometrage_min, kilometrage_max=kilometrage_max,
+        )
+    except pagination.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(vehicules) == limit:
+        response.headers["X-Next-Cursor"] = pagination.encode_cursor(sort, vehicules[-1])
+    return vehicules
+
+# Export complet du catalogue en flux (NDJSON ou CSV, gzip optionnel), mémoire constante quelle que soit la taille
+@app.get("/vehicules/export")
+def export_vehicules(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), compress: bool = False):
+    media_type, extension = export.EXPORT_FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="vehicules.{extension}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(export.iter_export(engine, format, compress), media_type=media_type, headers=headers)
 
 @app.post("/vehicules/", response_model=schemas.Vehicule, status_code=201)
-def create_vehicule(vehicule: schemas.VehiculeCreate, db: Session = Depends(get_db)):
-    return crud.create_vehicule(db=db, vehicule=vehicule)
+async def create_vehicule(vehicule: schemas.VehiculeCreate, db=Depends(get_db)):
+    db_vehicule = await async_crud.call("create_vehicule", db, vehicule=vehicule)
+    await refresh_vehicule_indexes(db_vehicule.id)
+    return db_vehicule
 
 @app.put("/vehicules/{vehicule_id}", response_model=schemas.Vehicule)
-def update_vehicule(vehicule_id: int, vehicule_update: schemas.VehiculeUpdate, db: Session = Depends(get_db)):
-    db_vehicule = crud.update_vehicule(db=db, vehicule_id=vehicule_id, vehicule_update=vehicule_update)
+async def update_vehicule(vehicule_id: int, vehicule_update: schemas.VehiculeUpdate, db=Depends(get_db)):
+    db_vehicule = await async_crud.call("update_vehicule", db, vehicule_id=vehicule_id, vehicule_update=vehicule_update)
     if db_vehicule is None:
         raise HTTPException(status_code=404, detail="Véhicule non trouvé")
+    await refresh_vehicule_indexes(vehicule_id)
     return db_vehicule
 
 @app.delete("/vehicules/{vehicule_id}", response_model=dict)
-def delete_vehicule(vehicule_id: int, db: Session = Depends(get_db)):
-    return crud.delete_vehicule(db=db, vehicule_id=vehicule_id)
+async def delete_vehicule(vehicule_id: int, db=Depends(get_db)):
+    result = await async_crud.call("delete_vehicule", db, vehicule_id=vehicule_id)
+    await refresh_vehicule_indexes(vehicule_id)
+    return result
 
 # Endpoint pour prédire le prix du véhicule
 class PredictRequest(BaseModel):
-    kilometrage: float
+    # NaN et infinis refusés à la validation (json les accepte) : la ligne est rejetée seule, pas tout le lot
+    kilometrage: float = Field(..., allow_inf_nan=False)
     annee: int
     marque: str
     carburant: str
@@ -188,100 +363,352 @@ class PredictRequest(BaseModel):
             }
         }
 
-@app.post("/predict_combined")
-def predict_combined(request: PredictRequest):
-    try:
-        # Convertir les données de la requête en DataFrame
-        input_data = pd.DataFrame([request.dict()])
-        logging.info(f"Input data: {input_data}")
+# Plages balayées par la courbe de dépréciation (bornes incluses)
+# Borne haute des plages de kilométrage (les valeurs infinies ou NaN sont refusées)
+MAX_KILOMETRAGE = 10_000_000
+
+class KilometrageRange(BaseModel):
+    start: float = Field(0, ge=0, le=MAX_KILOMETRAGE, allow_inf_nan=False)
+    stop: float = Field(200000, ge=0, le=MAX_KILOMETRAGE, allow_inf_nan=False)
+    step: float = Field(10000, gt=0, allow_inf_nan=False)
+
+class AnneeRange(BaseModel):
+    start: int
+    stop: int
+    step: int = Field(1, gt=0)
+
+# Profil du véhicule et plages de kilométrage et d'année ; sans plage, la valeur du véhicule est conservée
+class DepreciationRequest(BaseModel):
+    vehicule: PredictRequest
+    kilometrage: Optional[KilometrageRange] = None
+    annee: Optional[AnneeRange] = None
+
+    def kilometrage_range(self):
+        if self.kilometrage is None:
+            return (float(self.vehicule.kilometrage), float(self.vehicule.kilometrage), 1.0)
+        return (self.kilometrage.start, self.kilometrage.stop, self.kilometrage.step)
+
+    def annee_range(self):
+        if self.annee is None:
+            return (self.vehicule.annee, self.vehicule.annee, 1)
+        return (self.annee.start, self.annee.stop, self.annee.step)
+
+# Prédiction d'un groupe de requêtes unitaires avec les modèles courants du registre
+def predict_requests(requests, quantiles=None, explain=False):
+    return prediction.predict_rows(
+        model_registry.get(PRICE_MODEL), model_registry.get(DEAL_MODEL), requests, quantiles, explain,
+    )
 
-        # S'assurer que les colonnes correspondent aux colonnes utilisées lors de l'entraînement
-        column_order = [
-            'Kilométrage', 'Année', 'Marque', 'Type de Carburant', 
-            'Transmission', 'Modèle', 'Etat'
-        ]
+# Prédiction d'un lot brut (validation ligne par ligne) avec les modèles courants du registre
+def predict_items(items, quantiles=None, explain=False):
+    return prediction.predict_batch(
+        model_registry.get(PRICE_MODEL), model_registry.get(DEAL_MODEL), items, PredictRequest, quantiles, explain,
+    )
 
-        # Adapter les noms des colonnes à ceux du modèle
-        input_data.columns = column_order
-        logging.info(f"Input data with correct columns: {input_data}")
+# Quantiles renvoyés par défaut avec l'intervalle de prédiction (interval=true sans quantiles explicites)
+INTERVAL_QUANTILES = tuple(float(q) for q in os.getenv("PREDICT_INTERVAL_QUANTILES", "0.05,0.95").split(","))
+MAX_INTERVAL_QUANTILES = 20
+
+# Quantiles demandés (None : pas d'intervalle) ; préciser des quantiles active l'intervalle
+def interval_quantiles(interval, quantiles):
+    if not interval and not quantiles:
+        return None
+    quantiles = tuple(sorted(set(quantiles))) if quantiles else INTERVAL_QUANTILES
+    if len(quantiles) > MAX_INTERVAL_QUANTILES or any(not 0 <= q <= 1 for q in quantiles):
+        raise HTTPException(
+            status_code=400, detail=f"Quantiles invalides (au plus {MAX_INTERVAL_QUANTILES}, entre 0 et 1)",
+        )
+    return quantiles
+
+# Ordonnanceur de micro-lots pour les requêtes unitaires concurrentes
+MICRO_BATCHING_ENABLED = os.getenv("PREDICT_MICRO_BATCHING", "1") == "1"
+predict_scheduler = MicroBatcher(
+    predict_requests,
+    max_batch_size=int(os.getenv("PREDICT_MICRO_BATCH_MAX_ROWS", "64")),
+    max_wait_ms=float(os.getenv("PREDICT_MICRO_BATCH_WINDOW_MS", "2")),
+)
 
-        # Prédiction du prix avec le modèle Random Forest
-        predicted_price = random_forest_model.predict(input_data)
-        logging.info(f"Predicted price: {predicted_price}")
+# Cache LRU des prédictions, invalidé automatiquement si les artefacts de modèles changent
+prediction_cache = PredictionCache(
+    maxsize=int(os.getenv("PREDICT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PREDICT_CACHE_TTL_SECONDS", "3600")),
+    kilometrage_bucket=float(os.getenv("PREDICT_CACHE_KM_BUCKET", "0")),
+    version_fn=model_registry.versions,
+    version_check_interval=0,
+)
 
-        # Classification de la transaction (Bonne ou Mauvaise affaire) avec le modèle Logistique
-        deal_classification = logistic_model.predict(input_data)
-        label = "Bonne affaire" if deal_classification[0] == 1 else "Mauvaise affaire"
-        logging.info(f"Classification: {label}")
+@app.post("/predict_combined")
+async def predict_combined(request: PredictRequest, response: Response, interval: bool = False,
+                           quantiles: list[float] = Query(None), explain: bool = False):
+    quantiles = interval_quantiles(interval, quantiles)
+    try:
+        # Intervalle de prédiction ou explication : calcul direct sur les arbres de la forêt, hors cache et micro-lots
+        if quantiles is not None or explain:
+            return (await run_in_threadpool(predict_requests, [request], quantiles, explain))[0]
+
+        # Réponse servie directement depuis le cache si la combinaison a déjà été prédite ;
+        # version des modèles relevée avant le calcul pour ne pas mettre en cache un résultat d'un modèle remplacé
+        # (après avoir suivi un remplacement publié par un autre worker)
+        if model_registry.pointer_due:
+            await run_in_threadpool(model_registry.check_pointer)
+        version = prediction_cache.version()
+        # En-tête X-Cache (hit/miss) : le cache est propre au worker, les compteurs de /predict_combined/cache aussi
+        cached = prediction_cache.get(request)
+        if cached is not None:
+            response.headers["X-Cache"] = "hit"
+            return cached
+        response.headers["X-Cache"] = "miss"
+
+        # Journalisation du détail en DEBUG seulement : arguments formatés uniquement si le niveau est actif
+        logging.debug("Input data: %s", request)
+
+        # Prédiction du prix (Random Forest) et classification de la transaction (Gradient Boosting)
+        request = prediction_cache.normalize_request(request)
+        if MICRO_BATCHING_ENABLED:
+            result = await predict_scheduler.submit(request)
+        else:
+            result = (await run_in_threadpool(predict_requests, [request]))[0]
+        prediction_cache.put(request, result, version)
+        logging.debug("Predicted price: %s, classification: %s", result["predicted_price"], result["deal_classification"])
 
         # Retourner les deux prédictions
-        return {
-            "predicted_price": float(predicted_price[0]),
-            "deal_classification": label
-        }
+        return result
     
+    except ModelUnavailableError as e:
+        logging.error(f"Modèle indisponible: {e}")
+        raise HTTPException(status_code=503, detail="Modèle de prédiction indisponible")
     except Exception as e:
         logging.error(f"Erreur lors de la prédiction combinée: {e}")
         raise HTTPException(status_code=400, detail="Erreur lors de la prédiction combinée")
 
+# Statistiques de l'ordonnanceur de micro-lots (profondeur de file, tailles de lot, attente)
+@app.get("/predict_combined/scheduler")
+def get_predict_scheduler_stats():
+    return {"enabled": MICRO_BATCHING_ENABLED, **predict_scheduler.stats()}
+
+# Compteurs du cache de prédictions (succès, échecs, évictions, invalidations)
+@app.get("/predict_combined/cache")
+def get_prediction_cache_stats():
+    return prediction_cache.stats()
+
+# Vider les caches de prédictions (unitaires et grilles de prix)
+@app.delete("/predict_combined/cache")
+def clear_prediction_cache():
+    prediction_cache.clear()
+    grid_cache.clear()
+    return {"message": "Cache de prédictions vidé"}
+
+# Taille maximale d'une grille de prix (années × kilométrages)
+MAX_GRID_POINTS = int(os.getenv("PREDICT_GRID_MAX_POINTS", "5000"))
+
+# Cache des grilles de prix par profil de véhicule et plages, invalidé si les artefacts de modèles changent
+grid_cache = GridCache(
+    maxsize=int(os.getenv("PREDICT_GRID_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("PREDICT_CACHE_TTL_SECONDS", "3600")),
+    version_fn=model_registry.versions,
+    version_check_interval=0,
+)
+
+# Grille de prix avec le modèle de prix courant du registre
+def predict_price_grid(vehicule, kilometrages, annees):
+    return prediction.predict_price_grid(model_registry.get(PRICE_MODEL), vehicule, kilometrages, annees)
+
+# Courbe de dépréciation : prix prédits sur toute la grille kilométrage × année en un seul appel au modèle
+@app.post("/predict_combined/depreciation")
+async def predict_depreciation(request: DepreciationRequest, response: Response):
+    if model_registry.pointer_due:
+        await run_in_threadpool(model_registry.check_pointer)
+    version = grid_cache.version()
+    cached = grid_cache.get(request)
+    if cached is not None:
+        response.headers["X-Cache"] = "hit"
+        return cached
+    response.headers["X-Cache"] = "miss"
+
+    try:
+        n_points = prediction.sweep_length(*request.kilometrage_range()) * prediction.sweep_length(*request.annee_range())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Plage invalide : {e}")
+    if n_points > MAX_GRID_POINTS:
+        raise HTTPException(status_code=413, detail=f"Grille trop grande (maximum {MAX_GRID_POINTS} points)")
+
+    kilometrages = prediction.sweep_values(*request.kilometrage_range())
+    annees = prediction.sweep_values(*request.annee_range())
+    try:
+        prices = await run_in_threadpool(predict_price_grid, request.vehicule, kilometrages, annees)
+    except ModelUnavailableError as e:
+        logging.error(f"Modèle indisponible: {e}")
+        raise HTTPException(status_code=503, detail="Modèle de prédiction indisponible")
+    except Exception as e:
+        logging.error(f"Erreur lors du calcul de la courbe de dépréciation: {e}")
+        raise HTTPException(status_code=400, detail="Erreur lors du calcul de la courbe de dépréciation")
+
+    result = {
+        "kilometrage": kilometrages.tolist(),
+        "annee": annees.tolist(),
+        "predicted_prices": prices.tolist(),
+        "points": n_points,
+    }
+    grid_cache.put(request, result, version)
+    return result
+
+# Compteurs du cache des grilles de prix
+@app.get("/predict_combined/depreciation/cache")
+def get_grid_cache_stats():
+    return grid_cache.stats()
+
+# Nombre maximal de véhicules similaires renvoyés
+MAX_SIMILAR = int(os.getenv("SIMILAR_MAX_K", "50"))
+
+# Véhicules du catalogue les plus proches d'un véhicule existant (même marque, carburant et transmission)
+@app.get("/vehicules/{vehicule_id}/similar")
+def get_similar_vehicules(vehicule_id: int, k: int = Query(10, ge=1, le=MAX_SIMILAR)):
+    sync_similarity_index()
+    similar = similarity_index.similar_to(vehicule_id, k)
+    if similar is None:
+        # Véhicule absent de l'index : inexistant (404) ou sans année, kilométrage ou prix (aucun voisin)
+        with engine.connect() as conn:
+            if not vehicule_exists(conn, vehicule_id):
+                raise HTTPException(status_code=404, detail="Véhicule non trouvé")
+        return []
+    return similar
+
+# Véhicules du catalogue les plus proches d'une description (prix facultatif ; modèle et état ne sont pas utilisés)
+@app.post("/similar")
+def find_similar_vehicules(request: PredictRequest, k: int = Query(10, ge=1, le=MAX_SIMILAR),
+                           prix: Optional[float] = Query(None, ge=0)):
+    sync_similarity_index()
+    return similarity_index.similar(
+        request.marque, request.carburant, request.transmission, request.annee, request.kilometrage, prix, k,
+    )
+
+# Taille et compteurs de l'index des véhicules similaires
+@app.get("/similar/stats")
+def get_similarity_stats():
+    return similarity_index.stats()
+
+# Taille maximale d'un lot pour la prédiction batch
+MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "10000"))
+
+# Endpoint pour prédire un lot de véhicules (tableau JSON ou NDJSON)
+@app.post("/predict_combined/batch")
+async def predict_combined_batch(request: Request, interval: bool = False, quantiles: list[float] = Query(None),
+                                 explain: bool = False):
+    quantiles = interval_quantiles(interval, quantiles)
+    body = await request.body()
+    try:
+        items = prediction.parse_batch_payload(body, request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Corps de requête invalide : {e}")
+
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Lot trop volumineux (maximum {MAX_BATCH_SIZE} lignes)")
+
+    try:
+        # Un seul appel à chaque pipeline pour tout le lot, hors de la boucle d'événements
+        results = await run_in_threadpool(predict_items, items, quantiles, explain)
+    except ModelUnavailableError as e:
+        logging.error(f"Modèle indisponible: {e}")
+        raise HTTPException(status_code=503, detail="Modèle de prédiction indisponible")
+    except Exception as e:
+        logging.error(f"Erreur lors de la prédiction batch: {e}")
+        raise HTTPException(status_code=400, detail="Erreur lors de la prédiction batch")
+
+    errors = sum(1 for result in results if "error" in result)
+    return {"count": len(results), "errors": errors, "results": results}
+
+# Jeton d'administration pour les opérations sur les modèles (désactivées si non défini)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(x_admin_token: str = Header(None)):
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès administrateur requis")
+
+# Modèle pour le remplacement d'un artefact
+class ModelSwapRequest(BaseModel):
+    filename: str | None = None
+
+# Versions, empreintes et temps de chargement des modèles
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+def get_models_info():
+    return model_registry.info()
+
+# Mémoire du worker courant (RSS, PSS, pages partagées)
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+def get_memory_report():
+    return {"serving_mode": MODEL_SERVING_MODE, **process_memory()}
+
+# Remplacer à chaud un modèle par un nouvel artefact du dossier des modèles
+@app.post("/admin/models/{name}/reload", dependencies=[Depends(require_admin)])
+def reload_model(name: str, swap: ModelSwapRequest | None = None):
+    if name not in model_registry.names:
+        raise HTTPException(status_code=404, detail="Modèle inconnu")
+    try:
+        artifact = model_registry.swap(name, swap.filename if swap else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ModelUnavailableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    prediction_cache.clear()
+    grid_cache.clear()
+    # Les autres workers suivent le remplacement via le fichier pointeur
+    return {**artifact.info(), "pointer_file": model_registry.pointer_file}
+
 # Endpoint protégé pour obtenir les informations sur l'utilisateur connecté
 @app.get("/users/me/", response_model=schemas.User)
 def read_users_me(current_user: schemas.User = Depends(get_current_user)):
     return current_user
 
+# Statistiques du cache de tokens et du pool bcrypt
+@app.get("/users/auth/stats")
+def get_auth_stats():
+    return {
+        "token_cache": token_cache.stats(),
+        "bcrypt": {"rounds": password_hasher.rounds, "workers": password_hasher.workers},
+    }
+
 # Endpoints CRUD pour les utilisateurs
 @app.get("/users/", response_model=list[schemas.User])
-def read_users(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_all_users(db, skip=skip, limit=limit)
+async def read_users(skip: int = 0, limit: int = 10, db=Depends(get_db)):
+    return await async_crud.call("get_all_users", db, skip=skip, limit=limit)
 
 @app.post("/users/", response_model=schemas.User, status_code=201)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    return crud.create_user(db=db, user=user)
+async def create_user(user: schemas.UserCreate, db=Depends(get_db)):
+    return await async_crud.call("create_user", db, user=user)
 
 @app.put("/users/{user_id}", response_model=schemas.User)
-def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Depends(get_db)):
-    db_user = crud.update_user(db=db, user_id=user_id, user_update=user_update)
+async def update_user(user_id: int, user_update: schemas.UserUpdate, db=Depends(get_db)):
+    hashed_password = await password_hasher.hash(user_update.password) if user_update.password else None
+    db_user = await async_crud.call(
+        "update_user", db, user_id=user_id, user_update=user_update, hashed_password=hashed_password,
+    )
     if db_user is None:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    token_cache.invalidate_user(user_id)
     return db_user
 
 @app.delete("/users/{user_id}", response_model=dict)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user_deleted = crud.delete_user(db=db, user_id=user_id)
+async def delete_user(user_id: int, db=Depends(get_db)):
+    user_deleted = await async_crud.call("delete_user", db, user_id=user_id)
     if user_deleted is None:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    token_cache.invalidate_user(user_id)
     return {"message": "Utilisateur supprimé avec succès"}
 
 # Endpoints pour les données de visualisation
+# Réponses déjà encodées (JSON, gzip, brotli) par route et paramètres, reconstruites quand la révision de la base change
+data_cache = ResponseCache(
+    maxsize=int(os.getenv("DATA_CACHE_SIZE", "64")),
+    cache_control=os.getenv("DATA_CACHE_CONTROL", "no-cache"),
+)
+
+# Distribution année/marque servie depuis l'agrégat matérialisé Vehicule_Stats
 @router.get("/data/year-brand-distribution")
-def get_year_brand_distribution():
-    # Connexion à la base de données SQLite
-    conn = sqlite3.connect("voitures_aramisauto.db")
-    
-    # Requête SQL pour agréger les données par année et marque
-    query = """
-    SELECT m.Nom AS Marque, v.Annee, COUNT(*) AS Count
-    FROM Vehicule v
-    JOIN Marque m ON v.Marque_ID = m.ID_Marque
-    GROUP BY m.Nom, v.Annee
-    ORDER BY v.Annee, m.Nom;
-    """
-    
-    # Exécuter la requête et charger les résultats dans un DataFrame
-    year_brand_df = pd.read_sql_query(query, conn)
-    
-    # Fermer la connexion
-    conn.close()
-    
-    # Voir les données agrégées avant de les renvoyer
-    logging.info("Aperçu des données agrégées par année et marque :")
-    logging.info(year_brand_df.head())
-    
-    # Convertir le DataFrame en liste de dictionnaires pour l'API
-    response_data = year_brand_df.to_dict(orient="records")
-    
-    # Retourner les données au frontend
-    return response_data
+def get_year_brand_distribution(request: Request):
+    with engine.connect() as conn:
+        # Lire la révision avant les données : au pire, une révision est associée à des données plus récentes
+        version = aggregates.get_version(conn)
+        return data_cache.respond(request, version, lambda: aggregates.read_year_brand(conn))
 
 # @app.get("/learning-curve-random-forest", response_class=JSONResponse)
 # async def get_learning_curve():
@@ -298,9 +725,30 @@ def get_year_brand_distribution():
 #     except Exception as e:
 #         raise HTTPException(status_code=500, detail=f"Erreur serveur : {str(e)}")
 
+# Clustering Kilométrage/Prix recalculé depuis la table Vehicule et mis à jour par mini-lots
+clustering_service = ClusteringService(
+    n_clusters=int(os.getenv("CLUSTERING_N_CLUSTERS", "3")),
+    batch_size=int(os.getenv("CLUSTERING_BATCH_SIZE", "1024")),
+    refit_fraction=float(os.getenv("CLUSTERING_REFIT_FRACTION", "0.2")),
+)
+
 @router.get("/data/clustering")
-def get_clustering_data():
-    return clustering_df.to_dict(orient="records")
+def get_clustering_data(request: Request, max_points: Optional[int] = Query(None, ge=1)):
+    with engine.connect() as conn:
+        clustering_service.sync(conn)
+    # Révision et points étiquetés lus ensemble : l'ETag correspond toujours aux données servies
+    version, X, labels = clustering_service.snapshot()
+    return data_cache.respond(request, version, lambda: labeled_records(X, labels, max_points))
+
+@router.get("/data/clustering/stats")
+def get_clustering_stats():
+    return clustering_service.stats()
+
+@router.get("/data/cache")
+def get_data_cache_stats():
+    return data_cache.stats()
 
 # Inclure le router avec un préfixe pour les données
-app.include_router(router, prefix="/data")
\ No newline at end of file
+app.include_router(router, prefix="/data")
+
+startup_profile.mark("import")
@@ -0,0 +1,192 @@
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event
+
+# Métriques de performance exposées au format texte Prometheus (GET /metrics) :
+# latence et nombre de requêtes par route, requêtes en cours, requêtes SQL (nombre, durée, nombre par requête HTTP)
+# et temps d'inférence par modèle. Les valeurs sont propres au worker (un scrape par worker)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# METRICS_ENABLED=0 : ni middleware ni hooks SQL
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labelnames, labels, value) for labels, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+# Histogramme cumulatif : compteur par borne (le), somme et nombre d'observations
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # Un compteur par borne, plus +Inf, puis la somme
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, list(counts)) for labels, counts in self._values.items())
+        samples = []
+        labelnames = self.labelnames + ("le",)
+        for labels, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts[:-1]):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", labelnames, labels + (bound,), cumulative))
+            samples.append((f"{self.name}_sum", self.labelnames, labels, counts[-1]))
+            samples.append((f"{self.name}_count", self.labelnames, labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labelnames, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status"),
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP", ("method", "route"),
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge("http_requests_in_flight", "Requêtes HTTP en cours"))
+HTTP_DB_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries", "Requêtes SQL exécutées par requête HTTP", ("route",), QUERY_COUNT_BUCKETS,
+))
+DB_QUERIES = REGISTRY.register(Counter("db_queries_total", "Requêtes SQL exécutées", ("operation",)))
+DB_LATENCY = REGISTRY.register(Histogram("db_query_duration_seconds", "Durée des requêtes SQL", ("operation",)))
+MODEL_INFERENCE = REGISTRY.register(Histogram(
+    "model_inference_seconds", "Durée d'un appel predict par modèle (un appel par lot)", ("model",),
+))
+MODEL_ROWS = REGISTRY.register(Counter("model_inference_rows_total", "Lignes prédites par modèle", ("model",)))
+
+# Compteur de requêtes SQL de la requête HTTP en cours (partagé avec le pool de threads, qui copie le contexte)
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+SQL_OPERATIONS = ("select", "insert", "update", "delete")
+
+
+def sql_operation(statement):
+    operation = statement.lstrip()[:6].lower()
+    return operation if operation in SQL_OPERATIONS else "other"
+
+
+# Hooks SQLAlchemy sur un moteur synchrone (ou le sync_engine d'un moteur asynchrone)
+def install_query_metrics(sync_engine):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        operation = sql_operation(statement)
+        DB_QUERIES.inc(operation)
+        DB_LATENCY.observe(time.perf_counter() - context._metrics_started, operation)
+        counter = _request_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+def observe_inference(model, seconds, rows):
+    MODEL_INFERENCE.observe(seconds, model)
+    MODEL_ROWS.inc(model, amount=rows)
+
+
+# Middleware ASGI : la route est le modèle de chemin (/vehicules/{vehicule_id}) pour borner le nombre de séries
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        queries = [0]
+        token = _request_queries.set(queries)
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            _request_queries.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(scope["method"], route, str(status[0]))
+            HTTP_LATENCY.observe(elapsed, scope["method"], route)
+            HTTP_DB_QUERIES.observe(queries[0], route)
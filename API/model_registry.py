@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+# Erreur levée lorsqu'un modèle n'est pas disponible (fichier absent ou chargement en échec)
+class ModelUnavailableError(RuntimeError):
+    pass
+
+
+# Empreinte SHA-256 d'un fichier, lue par blocs
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Modèle chargé et ses métadonnées de version
+class ModelArtifact:
+    def __init__(self, name, path, model, sha256, load_seconds):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.sha256 = sha256
+        self.version = sha256[:12]
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def info(self):
+        return {
+            "name": self.name,
+            "path": self.path,
+            "version": self.version,
+            "sha256": self.sha256,
+            "loaded_at": self.loaded_at.isoformat(),
+            "load_seconds": round(self.load_seconds, 4),
+        }
+
+
+# Registre des modèles : chargement paresseux (ou préchauffage en arrière-plan), suivi des versions
+# et remplacement atomique d'un artefact sans redémarrer les workers.
+# Avec `pointer_file`, chaque remplacement est publié dans ce fichier (artefact et empreinte par modèle) :
+# les autres workers le relisent au plus une fois par `pointer_check_interval` avant de servir un modèle
+# et chargent à leur tour l'artefact publié, le worker qui charge continuant de servir l'ancien entre-temps
+class ModelRegistry:
+    def __init__(self, models_dir, mmap_mode="r", pointer_file=None, pointer_check_interval=1.0):
+        self.models_dir = os.path.abspath(models_dir)
+        self.mmap_mode = mmap_mode or None
+        self.pointer_file = pointer_file
+        self.pointer_check_interval = float(pointer_check_interval)
+        self._pointer_signature = None
+        self._next_pointer_check = 0.0
+        self._pointer_lock = threading.Lock()
+        self._paths = {}
+        self._post_load = {}
+        self._loaders = {}
+        self._artifacts = {}
+        self._errors = {}
+        self._locks = {}
+        self._warmup_thread = None
+
+    # Déclarer un modèle ; `loader(path)` remplace joblib.load, `post_load` transforme l'objet chargé
+    def register(self, name, filename, post_load=None, loader=None):
+        self._paths[name] = self.resolve(filename)
+        self._post_load[name] = post_load
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    # Chemin absolu d'un artefact, limité au dossier des modèles
+    def resolve(self, filename):
+        path = os.path.abspath(os.path.join(self.models_dir, filename))
+        if os.path.commonpath([path, self.models_dir]) != self.models_dir:
+            raise ValueError(f"Chemin hors du dossier des modèles : {filename}")
+        return path
+
+    @property
+    def names(self):
+        return list(self._paths)
+
+    def _load_artifact(self, name, path):
+        if not os.path.exists(path):
+            raise ModelUnavailableError(f"Fichier de modèle introuvable : {path}")
+        start = time.perf_counter()
+        loader = self._loaders.get(name)
+        if loader is not None:
+            model = loader(path)
+        else:
+            import joblib  # Import différé : hors du chemin d'import de l'application
+            # Les tableaux numpy des fichiers joblib non compressés sont projetés en mémoire (pages partagées entre workers)
+            model = joblib.load(path, mmap_mode=self.mmap_mode)
+        post_load = self._post_load.get(name)
+        if post_load is not None:
+            model = post_load(model)
+        sha256 = file_sha256(path)
+        artifact = ModelArtifact(name, path, model, sha256, time.perf_counter() - start)
+        logging.info(f"Modèle '{name}' chargé (version {artifact.version}) en {artifact.load_seconds:.2f}s")
+        return artifact
+
+    # Artefact courant, chargé à la première demande
+    def artifact(self, name):
+        if self.pointer_due:
+            self.check_pointer()
+        artifact = self._artifacts.get(name)
+        if artifact is not None:
+            return artifact
+        if name not in self._paths:
+            raise ModelUnavailableError(f"Modèle inconnu : {name}")
+        with self._locks[name]:
+            artifact = self._artifacts.get(name)
+            if artifact is None:
+                try:
+                    artifact = self._load_artifact(name, self._paths[name])
+                except ModelUnavailableError as e:
+                    self._errors[name] = str(e)
+                    raise
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise ModelUnavailableError(f"Échec du chargement du modèle '{name}' : {e}") from e
+                self._errors.pop(name, None)
+                self._artifacts[name] = artifact
+        return artifact
+
+    def get(self, name):
+        return self.artifact(name).model
+
+    def is_loaded(self, name):
+        return name in self._artifacts
+
+    # Charger tous les modèles ; en arrière-plan si `background` est vrai, puis appeler `on_complete`
+    def warm_up(self, background=True, on_complete=None):
+        def load_all():
+            for name in self.names:
+                try:
+                    self.artifact(name)
+                except ModelUnavailableError as e:
+                    logging.error(str(e))
+            if on_complete is not None:
+                on_complete()
+
+        if not background:
+            load_all()
+            return None
+        if self._warmup_thread is None or not self._warmup_thread.is_alive():
+            self._warmup_thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    # Vrai si le fichier pointeur doit être relu (au plus une fois par intervalle)
+    @property
+    def pointer_due(self):
+        return self.pointer_file is not None and time.monotonic() >= self._next_pointer_check
+
+    # Appliquer les remplacements publiés par un autre worker (un seul thread recharge, les autres continuent)
+    def check_pointer(self):
+        if not self._pointer_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_pointer_check = time.monotonic() + self.pointer_check_interval
+            try:
+                stat = os.stat(self.pointer_file)
+            except FileNotFoundError:
+                return
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if signature == self._pointer_signature:
+                return
+            with open(self.pointer_file) as f:
+                pointer = json.load(f)
+            for name, entry in pointer.items():
+                if name not in self._paths:
+                    continue
+                path = self.resolve(entry["filename"])
+                artifact = self._artifacts.get(name)
+                if artifact is None:
+                    self._paths[name] = path
+                elif artifact.path != path or artifact.sha256 != entry["sha256"]:
+                    try:
+                        self.swap(name, entry["filename"], publish=False)
+                    except (ModelUnavailableError, OSError, ValueError) as e:
+                        logging.error(f"Modèle publié '{name}' non chargé : {e}")
+                        return
+            self._pointer_signature = signature
+        finally:
+            self._pointer_lock.release()
+
+    # Écriture atomique du pointeur (fichier temporaire puis os.replace)
+    def _publish(self, name, artifact):
+        try:
+            with open(self.pointer_file) as f:
+                pointer = json.load(f)
+        except FileNotFoundError:
+            pointer = {}
+        pointer[name] = {"filename": os.path.relpath(artifact.path, self.models_dir), "sha256": artifact.sha256}
+        tmp_path = f"{self.pointer_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(pointer, f, indent=2)
+        os.replace(tmp_path, self.pointer_file)
+
+    # Remplacer un modèle par un nouvel artefact : chargement complet puis bascule atomique de la référence,
+    # publiée aux autres workers si un fichier pointeur est configuré
+    def swap(self, name, filename=None, publish=True):
+        if name not in self._paths:
+            raise ModelUnavailableError(f"Modèle inconnu : {name}")
+        path = self.resolve(filename) if filename else self._paths[name]
+        artifact = self._load_artifact(name, path)
+        with self._locks[name]:
+            previous = self._artifacts.get(name)
+            self._paths[name] = path
+            self._artifacts[name] = artifact
+            self._errors.pop(name, None)
+        logging.info(f"Modèle '{name}' remplacé : {previous.version if previous else None} -> {artifact.version}")
+        if publish and self.pointer_file is not None:
+            self._publish(name, artifact)
+        return artifact
+
+    # Versions courantes, utilisées pour invalider les caches dépendant des modèles
+    def versions(self):
+        return tuple((name, artifact.sha256) for name, artifact in sorted(self._artifacts.items()))
+
+    def info(self):
+        models = {}
+        for name, path in self._paths.items():
+            artifact = self._artifacts.get(name)
+            if artifact is not None:
+                models[name] = {"loaded": True, **artifact.info()}
+            else:
+                models[name] = {"loaded": False, "path": path, "error": self._errors.get(name)}
+        return models
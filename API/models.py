@@ -1,24 +1,34 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from API.database import Base
 from sqlalchemy.orm import relationship
 
 class Vehicule(Base):
     __tablename__ = "Vehicule"
     id = Column("ID_Vehicule", Integer, primary_key=True, index=True)
-    marque_id = Column("Marque_ID", Integer, ForeignKey("Marque.ID_Marque"), index=True)
+    marque_id = Column("Marque_ID", Integer, ForeignKey("Marque.ID_Marque"))
     modele = Column("Modele", String)
     annee = Column("Annee", Integer)
     kilometrage = Column("Kilometrage", Float)
     prix = Column("Prix", Float)
     etat = Column("Etat", String)
-    carburant_id = Column("Carburant_ID", Integer, ForeignKey("Carburant.ID_Carburant"), index=True)
-    transmission_id = Column("Transmission_ID", Integer, ForeignKey("Transmission.ID_Transmission"), index=True)
+    carburant_id = Column("Carburant_ID", Integer, ForeignKey("Carburant.ID_Carburant"))
+    transmission_id = Column("Transmission_ID", Integer, ForeignKey("Transmission.ID_Transmission"))
 
     # Relations
     carburant = relationship("Carburant", lazy="joined")
     transmission = relationship("Transmission", lazy="joined")
     marque = relationship("Marque", lazy="joined")
 
+    # Index composites (filtre ou clé de tri, puis ID_Vehicule ; ils couvrent aussi les clés étrangères) pour la pagination par curseur de /vehicules/
+    __table_args__ = (
+        Index("ix_vehicule_marque_keyset", "Marque_ID", "ID_Vehicule"),
+        Index("ix_vehicule_carburant_keyset", "Carburant_ID", "ID_Vehicule"),
+        Index("ix_vehicule_transmission_keyset", "Transmission_ID", "ID_Vehicule"),
+        Index("ix_vehicule_annee_keyset", "Annee", "ID_Vehicule"),
+        Index("ix_vehicule_prix_keyset", "Prix", "ID_Vehicule"),
+        Index("ix_vehicule_kilometrage_keyset", "Kilometrage", "ID_Vehicule"),
+    )
+
 class Carburant(Base):
     __tablename__ = "Carburant"
     id_carburant = Column("ID_Carburant", Integer, primary_key=True, index=True)
@@ -34,6 +44,28 @@ class Marque(Base):
     id_marque = Column("ID_Marque", Integer, primary_key=True, index=True)
     nom = Column(String)
 
+# Agrégats matérialisés marque × année, tenus à jour par les fonctions CRUD des véhicules (voir aggregates.py)
+class VehiculeStats(Base):
+    __tablename__ = "Vehicule_Stats"
+    marque_id = Column("Marque_ID", Integer, ForeignKey("Marque.ID_Marque"), primary_key=True)
+    annee = Column("Annee", Integer, primary_key=True)
+    count = Column("Count", Integer, nullable=False, default=0)
+    sum_prix = Column("Sum_Prix", Float, nullable=False, default=0.0)
+    sum_kilometrage = Column("Sum_Kilometrage", Float, nullable=False, default=0.0)
+
+# Révision de chaque agrégat, incrémentée à chaque modification (sert d'ETag)
+class AggregateVersion(Base):
+    __tablename__ = "Aggregate_Version"
+    name = Column("Name", String, primary_key=True)
+    version = Column("Version", Integer, nullable=False, default=0)
+
+# Journal des écritures de véhicules : une ligne par révision du catalogue (voir aggregates.VEHICULES),
+# lu par les index en mémoire pour ne relire que les véhicules modifiés depuis leur dernière synchronisation
+class VehiculeChange(Base):
+    __tablename__ = "Vehicule_Change"
+    version = Column("Version", Integer, primary_key=True)
+    vehicule_id = Column("Vehicule_ID", Integer, nullable=False)
+
 class User(Base):
     __tablename__ = "Users"
 
@@ -41,3 +73,8 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
+
+# Créer les index manquants sur une base existante (create_all ignore les tables déjà présentes)
+def ensure_indexes(bind):
+    for index in Vehicule.__table__.indexes:
+        index.create(bind, checkfirst=True)
@@ -0,0 +1,46 @@
+import base64
+import json
+import math
+
+# Clés de tri acceptées pour /vehicules/ (préfixe "-" pour l'ordre décroissant)
+SORT_KEYS = ("id", "prix", "annee", "kilometrage")
+SORT_PATTERN = r"^-?(id|prix|annee|kilometrage)$"
+# Types acceptés pour la valeur d'un curseur, selon la colonne de tri
+SORT_VALUE_TYPES = {"id": (int,), "prix": (int, float), "annee": (int,), "kilometrage": (int, float)}
+
+
+# Erreur levée pour un curseur illisible ou incompatible avec le tri demandé
+class InvalidCursorError(ValueError):
+    pass
+
+
+# Décomposer "-prix" en ("prix", True)
+def parse_sort(sort):
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in SORT_KEYS:
+        raise ValueError(f"Clé de tri inconnue : {sort}")
+    return key, descending
+
+
+# Curseur opaque : dernière valeur de la clé de tri et dernier ID_Vehicule de la page
+def encode_cursor(sort, vehicule):
+    key, _ = parse_sort(sort)
+    payload = {"s": sort, "v": getattr(vehicule, key), "id": vehicule.id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = payload["v"], int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Curseur invalide") from e
+    if payload.get("s") != sort:
+        raise InvalidCursorError("Le curseur ne correspond pas au tri demandé")
+    # Valeur passée telle quelle à la requête SQL : un nombre fini du type de la colonne de tri (ni null, ni objet)
+    key, _ = parse_sort(sort)
+    if isinstance(value, bool) or not isinstance(value, SORT_VALUE_TYPES[key]) or not math.isfinite(value):
+        raise InvalidCursorError("Valeur de curseur invalide pour le tri demandé")
+    return value, last_id
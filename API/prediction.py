@@ -0,0 +1,178 @@
+import json
+import math
+import time
+import numpy as np
+from pydantic import ValidationError
+from . import metrics
+from .features import FEATURE_FIELDS, SharedEncoder
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Libellé renvoyé pour la classification de la transaction
+def deal_label(classification):
+    return "Bonne affaire" if classification == 1 else "Mauvaise affaire"
+
+# Inférence combinée des deux modèles : les requêtes sont encodées une seule fois (SharedEncoder) et la matrice
+# commune alimente les deux estimateurs (chaque modèle expose encoder et predict_encoded)
+class CombinedModel:
+    def __init__(self, price_model, deal_model):
+        self.price_model = price_model
+        self.deal_model = deal_model
+        self.encoder = SharedEncoder([price_model.encoder, deal_model.encoder])
+
+    # Renvoie (prix, classifications, détails). Avec `quantiles`, le prix est la moyenne des arbres de la forêt et
+    # details["intervals"] son intervalle (voir price_intervals) ; avec `explain`, details["contributions"]
+    # contient le biais et les contributions par champ (voir CompiledForest.contributions_encoded)
+    def predict_requests(self, requests, quantiles=None, explain=False):
+        shared = self.encoder.encode(requests)
+        price_encoded = self.encoder.project(shared, 0)
+        details = {}
+        start = time.perf_counter()
+        if quantiles is None:
+            predicted_prices = self.price_model.predict_encoded(price_encoded)
+        else:
+            details["intervals"] = price_intervals(self.price_model, price_encoded, quantiles)
+            predicted_prices = details["intervals"][0]
+        metrics.observe_inference("random_forest", time.perf_counter() - start, len(requests))
+        if explain:
+            start = time.perf_counter()
+            details["contributions"] = self.price_model.contributions_encoded(price_encoded)
+            metrics.observe_inference("random_forest_explain", time.perf_counter() - start, len(requests))
+        start = time.perf_counter()
+        deal_classifications = self.deal_model.predict_encoded(self.encoder.project(shared, 1))
+        metrics.observe_inference("gradient_boosting", time.perf_counter() - start, len(requests))
+        return predicted_prices, deal_classifications, details
+
+# Nombre de lignes évaluées à la fois pour les intervalles (borne la matrice arbres × lignes)
+INTERVAL_CHUNK_ROWS = 1024
+
+# Moyenne, écart-type et quantiles des prédictions de tous les arbres de la forêt de prix, calculés sur la
+# matrice (n_arbres, n_lignes) de chaque tranche ; la moyenne est identique à la prédiction de la forêt
+def price_intervals(price_model, encoded, quantiles):
+    means, stds, values = [], [], []
+    for start in range(0, len(encoded), INTERVAL_CHUNK_ROWS):
+        trees = price_model.predict_trees_encoded(encoded[start:start + INTERVAL_CHUNK_ROWS])
+        means.append(np.add.reduce(trees, axis=0) / trees.shape[0])
+        stds.append(trees.std(axis=0))
+        values.append(np.quantile(trees, quantiles, axis=0).reshape(len(quantiles), -1))
+    return np.concatenate(means), np.concatenate(stds), np.concatenate(values, axis=1)
+
+# Dernier modèle combiné construit, reconstruit lorsque le registre sert un autre artefact (remplacement à chaud)
+_combined = None
+
+def combined_model(price_model, deal_model):
+    global _combined
+    combined = _combined
+    if combined is None or combined.price_model is not price_model or combined.deal_model is not deal_model:
+        combined = _combined = CombinedModel(price_model, deal_model)
+    return combined
+
+# Exécuter chaque modèle une seule fois sur l'ensemble du lot, à partir d'un encodage commun des requêtes
+def predict_rows(price_model, deal_model, requests, quantiles=None, explain=False):
+    if not requests:
+        return []
+    predicted_prices, deal_classifications, details = combined_model(price_model, deal_model).predict_requests(
+        requests, quantiles, explain,
+    )
+    rows = [
+        {"predicted_price": float(price), "deal_classification": deal_label(classification)}
+        for price, classification in zip(predicted_prices, deal_classifications)
+    ]
+    if "intervals" in details:
+        means, stds, values = details["intervals"]
+        labels = [f"{quantile:g}" for quantile in quantiles]
+        for index, row in enumerate(rows):
+            row["price_interval"] = {
+                "mean": float(means[index]),
+                "std": float(stds[index]),
+                "quantiles": {label: float(value) for label, value in zip(labels, values[:, index])},
+            }
+    if "contributions" in details:
+        bias, contributions = details["contributions"]
+        for index, row in enumerate(rows):
+            row["price_explanation"] = {
+                "bias": float(bias[index]),
+                "contributions": dict(zip(FEATURE_FIELDS, contributions[index].tolist())),
+            }
+    return rows
+
+# Nombre de valeurs d'un balayage, bornes incluses (vérifié avant de générer la grille)
+def sweep_length(start, stop, step):
+    if step <= 0:
+        raise ValueError("Le pas doit être strictement positif")
+    if stop < start:
+        raise ValueError("La fin de la plage doit être supérieure ou égale au début")
+    # Quotient infini (pas minuscule devant la plage) : int() lèverait OverflowError
+    quotient = (stop - start) / step
+    if not math.isfinite(quotient):
+        raise ValueError("Le pas est trop petit pour la plage demandée")
+    # Tolérance pour inclure la borne malgré les arrondis des pas décimaux
+    return int(quotient + 1e-9) + 1
+
+def sweep_values(start, stop, step):
+    return start + step * np.arange(sweep_length(start, stop, step))
+
+# Grille de prix (une ligne par année, une colonne par kilométrage) pour un même profil de véhicule :
+# la requête est encodée une seule fois, la matrice est répétée pour chaque point de la grille avec les seules
+# colonnes numériques recalculées, puis prédite en un seul appel au modèle de prix
+def predict_price_grid(price_model, request, kilometrages, annees):
+    encoder = price_model.encoder
+    n_points = len(annees) * len(kilometrages)
+    encoded = np.repeat(encoder.encode([request]), n_points, axis=0)
+    values = {
+        "annee": np.repeat(np.asarray(annees, dtype=np.float64), len(kilometrages)),
+        "kilometrage": np.tile(np.asarray(kilometrages, dtype=np.float64), len(annees)),
+    }
+    for position, field in enumerate(encoder.numeric_fields):
+        encoded[:, position] = (values[field] - encoder.means[position]) / encoder.scales[position]
+    start = time.perf_counter()
+    prices = price_model.predict_encoded(encoded)
+    metrics.observe_inference("random_forest", time.perf_counter() - start, n_points)
+    return prices.reshape(len(annees), len(kilometrages))
+
+# Décoder le corps d'une requête batch (tableau JSON ou NDJSON)
+# Retourne une liste d'éléments : soit l'objet décodé, soit une exception de décodage pour la ligne
+def parse_batch_payload(body, content_type):
+    text = body.decode("utf-8")
+    if content_type.split(";")[0].strip().lower() in NDJSON_CONTENT_TYPES:
+        items = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                items.append(e)
+        return items
+
+    payload = json.loads(text)
+    if not isinstance(payload, list):
+        raise ValueError("Le corps de la requête doit être un tableau JSON")
+    return payload
+
+# Valider chaque élément séparément pour ne pas faire échouer tout le lot
+def validate_rows(items, model_class):
+    valid, errors = [], {}
+    for index, item in enumerate(items):
+        if isinstance(item, json.JSONDecodeError):
+            errors[index] = [{"type": "json_invalid", "msg": f"JSON invalide : {item.msg}"}]
+        elif not isinstance(item, dict):
+            errors[index] = [{"type": "dict_type", "msg": "Chaque élément doit être un objet JSON"}]
+        else:
+            try:
+                valid.append((index, model_class(**item)))
+            except ValidationError as e:
+                errors[index] = e.errors(include_url=False, include_context=False, include_input=False)
+    return valid, errors
+
+# Prédire un lot complet et renvoyer les résultats dans l'ordre d'origine
+def predict_batch(price_model, deal_model, items, model_class, quantiles=None, explain=False):
+    valid, errors = validate_rows(items, model_class)
+    predictions = predict_rows(price_model, deal_model, [req for _, req in valid], quantiles, explain)
+
+    results = [None] * len(items)
+    for (index, _), prediction in zip(valid, predictions):
+        results[index] = {"index": index, **prediction}
+    for index, error in errors.items():
+        results[index] = {"index": index, "error": error}
+    return results
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# Cache LRU borné des prédictions, indexé sur le tuple normalisé des caractéristiques du véhicule.
+# Le kilométrage peut être regroupé par tranches (`kilometrage_bucket`) ; la prédiction est alors
+# calculée sur le kilométrage arrondi pour que toutes les requêtes d'une même tranche partagent le résultat.
+class PredictionCache:
+    def __init__(self, maxsize=10000, ttl=3600.0, kilometrage_bucket=0.0, version_fn=None, version_check_interval=1.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.kilometrage_bucket = float(kilometrage_bucket)
+        self.version_fn = version_fn
+        self.version_check_interval = float(version_check_interval)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = version_fn() if version_fn else None
+        self._next_version_check = time.monotonic() + self.version_check_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    # Kilométrage arrondi à la tranche configurée
+    def bucket_kilometrage(self, kilometrage):
+        if self.kilometrage_bucket > 0:
+            return round(kilometrage / self.kilometrage_bucket) * self.kilometrage_bucket
+        return float(kilometrage)
+
+    # Requête avec le kilométrage ramené à sa tranche (identique si le regroupement est désactivé)
+    def normalize_request(self, request):
+        kilometrage = self.bucket_kilometrage(request.kilometrage)
+        if kilometrage == request.kilometrage:
+            return request
+        return request.copy(update={"kilometrage": kilometrage})
+
+    # Clé du cache : tuple des caractéristiques telles que vues par les modèles
+    def key(self, request):
+        return (
+            self.bucket_kilometrage(request.kilometrage),
+            int(request.annee),
+            request.marque,
+            request.carburant,
+            request.transmission,
+            request.modele,
+            request.etat,
+        )
+
+    # Vider le cache si les artefacts de modèles ont changé (vérification au plus une fois par intervalle)
+    def _check_version(self, now):
+        if self.version_fn is None or now < self._next_version_check:
+            return
+        self._next_version_check = now + self.version_check_interval
+        version = self.version_fn()
+        if version != self._version:
+            self._version = version
+            self._clear_locked()
+            self.invalidations += 1
+
+    # Version des modèles à relever avant un calcul, puis à passer à put()
+    def version(self):
+        return self.version_fn() if self.version_fn else None
+
+    def get(self, request):
+        if not self.enabled:
+            return None
+        key = self.key(request)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, version, value = entry
+            if expires_at <= now or version != self._version:
+                # Entrée expirée, ou calculée avec d'autres modèles que ceux vus à la dernière vérification
+                del self._entries[key]
+                self.expirations += expires_at <= now
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    # Un résultat calculé avec une version de modèles remplacée entre-temps (rechargement, swap) n'est pas conservé
+    def put(self, request, value, version=None):
+        if not self.enabled:
+            return
+        key = self.key(request)
+        with self._lock:
+            current = self.version()
+            if version is not None and version != current:
+                self.stale_puts += 1
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, current, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _clear_locked(self):
+        self._entries.clear()
+
+    # Invalidation explicite (par exemple après le remplacement d'un modèle)
+    def clear(self):
+        with self._lock:
+            self._clear_locked()
+            self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "kilometrage_bucket": self.kilometrage_bucket,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+        }
+
+
+# Cache des grilles de prix (courbes de dépréciation), indexé sur le profil du véhicule (kilométrage et année
+# exclus, ils sont balayés) et sur les plages demandées ; mêmes bornes, durée de vie et invalidation par version
+class GridCache(PredictionCache):
+    def key(self, request):
+        vehicule = request.vehicule
+        return (
+            vehicule.marque,
+            vehicule.carburant,
+            vehicule.transmission,
+            vehicule.modele,
+            vehicule.etat,
+            request.kilometrage_range(),
+            request.annee_range(),
+        )
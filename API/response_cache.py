@@ -0,0 +1,111 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle : sans elle, seules les variantes identity et gzip sont servies
+    brotli = None
+
+
+# Si If-None-Match contient l'ETag courant, le client a déjà la bonne version
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+# Encodage préféré parmi ceux acceptés par le client (br, puis gzip, sinon identity)
+def negotiate_encoding(accept_encoding, available):
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(coding.lower())
+    for coding in ("br", "gzip"):
+        if coding in available and (coding in accepted or "*" in accepted):
+            return coding
+    return "identity"
+
+
+# Réponse déjà encodée : corps JSON, variantes compressées et ETag calculé sur le contenu
+class EncodedResponse:
+    def __init__(self, version, payload, compress_min_size=1024):
+        self.version = version
+        self.bodies = {"identity": json.dumps(payload, ensure_ascii=False).encode("utf-8")}
+        if len(self.bodies["identity"]) >= compress_min_size:
+            self.bodies["gzip"] = gzip.compress(self.bodies["identity"], compresslevel=6, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(self.bodies["identity"], quality=5)
+        # Même contenu, même ETag, quel que soit le worker qui l'a calculé
+        self.etag = '"' + hashlib.sha256(self.bodies["identity"]).hexdigest()[:32] + '"'
+
+
+# Cache LRU des réponses des endpoints /data/*, indexé sur la route et la chaîne de requête normalisée.
+# Chaque entrée porte la version de sa source (révision de table, signature de fichier...) :
+# une version différente au moment de la requête reconstruit l'entrée
+class ResponseCache:
+    def __init__(self, maxsize=64, cache_control="no-cache", compress_min_size=1024):
+        self.maxsize = int(maxsize)
+        self.cache_control = cache_control
+        self.compress_min_size = int(compress_min_size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def key(request):
+        return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+    # Entrée à jour pour cette requête ; build() n'est appelé qu'en cas d'absence ou de version périmée
+    def entry(self, request, version, build):
+        key = self.key(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = EncodedResponse(version, build(), self.compress_min_size)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    # Réponse HTTP : 304 si l'ETag correspond, sinon la variante compressée négociée
+    def respond(self, request, version, build):
+        entry = self.entry(request, version, build)
+        headers = {"ETag": entry.etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), entry.bodies)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=entry.bodies[encoding], media_type="application/json", headers=headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "brotli": brotli is not None,
+            }
@@ -0,0 +1,78 @@
+import logging
+import os
+import shutil
+import tempfile
+from API.model_registry import file_sha256
+
+# Champs mémoire lus dans /proc (Linux), en kB
+PROC_STATUS_FIELDS = ("VmRSS", "RssAnon", "RssFile", "RssShmem")
+PROC_SMAPS_FIELDS = ("Pss", "Shared_Clean", "Private_Clean", "Private_Dirty")
+
+
+# Dossier d'export d'un artefact, nommé d'après son empreinte pour détecter les versions périmées
+def export_dir(shared_dir, path, sha256):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(shared_dir, f"{stem}-{sha256[:12]}")
+
+
+# Exporter la forêt de prix au format plat (.npy non compressés) une seule fois pour tous les workers
+def export_price_model(path, shared_dir):
+    target = export_dir(shared_dir, path, file_sha256(path))
+    if os.path.isdir(target):
+        return target
+
+    # Imports différés : process_memory() reste utilisable sans charger numpy ni scikit-learn
+    import joblib
+    from API.compiled_forest import compile_forest_pipeline
+
+    os.makedirs(shared_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".export-", dir=shared_dir)
+    try:
+        compile_forest_pipeline(joblib.load(path)).save(tmp_dir)
+        # Renommage atomique : si un autre worker a terminé l'export avant nous, on garde le sien
+        os.rename(tmp_dir, target)
+        logging.info(f"Modèle exporté en mémoire partagée : {target}")
+    except OSError:
+        if not os.path.isdir(target):
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return target
+
+
+# Chargeur pour le registre : tableaux projetés en lecture seule, pages partagées entre processus
+def load_shared_price_model(path, shared_dir):
+    from API.compiled_forest import CompiledForest
+    return CompiledForest.load(export_price_model(path, shared_dir), mmap_mode="r")
+
+
+def _read_proc_fields(path, fields):
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in fields:
+                    values[name] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+# Mémoire du processus courant en Mo ; la PSS répartit les pages partagées entre les processus qui les projettent
+def process_memory():
+    status = _read_proc_fields("/proc/self/status", PROC_STATUS_FIELDS)
+    smaps = _read_proc_fields("/proc/self/smaps_rollup", PROC_SMAPS_FIELDS)
+    report = {"pid": os.getpid()}
+    for name, value in {**status, **smaps}.items():
+        report[f"{name.lower()}_mb"] = round(value / 1024, 1)
+    return report
+
+
+# Export préalable (avant le démarrage des workers) : python -m API.shared_models [modele.pkl] [dossier]
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "./models/random_forest_improved.pkl"
+    target = sys.argv[2] if len(sys.argv) > 2 else "./models/shared"
+    print(export_price_model(source, target))
@@ -0,0 +1,225 @@
+import threading
+import numpy as np
+from sqlalchemy import bindparam, text
+from . import aggregates
+
+# Index des véhicules similaires : plus proches voisins sur (année, kilométrage, prix) standardisés, partitionnés
+# par marque × carburant × transmission (None si la référence est absente, par exemple carburant "Non spécifié").
+# La révision du catalogue (aggregates.VEHICULES) signale les changements : une écriture faite par ce worker est
+# appliquée en relisant la seule ligne concernée (refresh), celles d'un autre worker en relisant les véhicules
+# listés par le journal Vehicule_Change depuis la dernière révision appliquée. Seuls le premier chargement et un
+# journal incomplet (chargement en masse, worker trop en retard) imposent une relecture complète de la table
+SELECT_VEHICULES_SQL = """
+    SELECT v.ID_Vehicule, m.Nom, c.Type, t.Type, v.Modele, v.Etat, v.Annee, v.Kilometrage, v.Prix
+    FROM Vehicule v
+    LEFT JOIN Marque m ON v.Marque_ID = m.ID_Marque
+    LEFT JOIN Carburant c ON v.Carburant_ID = c.ID_Carburant
+    LEFT JOIN Transmission t ON v.Transmission_ID = t.ID_Transmission
+    WHERE v.Annee IS NOT NULL AND v.Kilometrage IS NOT NULL AND v.Prix IS NOT NULL
+"""
+SELECT_VEHICULE_SQL = SELECT_VEHICULES_SQL + " AND v.ID_Vehicule = :vehicule_id"
+SELECT_CHANGED_SQL = text(SELECT_VEHICULES_SQL + " AND v.ID_Vehicule IN :ids").bindparams(
+    bindparam("ids", expanding=True)
+)
+EXISTS_SQL = "SELECT 1 FROM Vehicule WHERE ID_Vehicule = :vehicule_id"
+RECORD_FIELDS = ("id", "marque", "carburant", "transmission", "modele", "etat", "annee", "kilometrage", "prix")
+
+
+# Un véhicule absent de l'index peut exister sans être indexable (année, kilométrage ou prix manquant)
+def vehicule_exists(conn, vehicule_id):
+    return conn.execute(text(EXISTS_SQL), {"vehicule_id": vehicule_id}).first() is not None
+
+
+# Points d'une partition dans des tableaux contigus (capacité doublée au besoin) :
+# ajout, modification et suppression (échange avec la dernière ligne) en temps constant
+class Partition:
+    def __init__(self, capacity=16):
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.points = np.empty((capacity, 3), dtype=np.float64)
+        self.size = 0
+        self.slots = {}
+
+    def upsert(self, vehicule_id, point):
+        slot = self.slots.get(vehicule_id)
+        if slot is None:
+            if self.size == len(self.ids):
+                self.ids = np.resize(self.ids, 2 * len(self.ids))
+                self.points = np.resize(self.points, (2 * len(self.points), 3))
+            slot = self.slots[vehicule_id] = self.size
+            self.ids[slot] = vehicule_id
+            self.size += 1
+        self.points[slot] = point
+
+    def remove(self, vehicule_id):
+        slot = self.slots.pop(vehicule_id)
+        last = self.size - 1
+        if slot != last:
+            self.ids[slot] = self.ids[last]
+            self.points[slot] = self.points[last]
+            self.slots[int(self.ids[slot])] = slot
+        self.size = last
+
+    # Identifiants et distances des k plus proches voisins ; les dimensions NaN de la requête sont ignorées
+    def nearest(self, query, scales, k, exclude=None):
+        dimensions = ~np.isnan(query)
+        differences = (self.points[:self.size, dimensions] - query[dimensions]) / scales[dimensions]
+        distances = np.sqrt(np.einsum("ij,ij->i", differences, differences))
+        if exclude is not None and exclude in self.slots:
+            distances[self.slots[exclude]] = np.inf
+        k = min(k, self.size - (exclude in self.slots))
+        if k <= 0:
+            return []
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.lexsort((self.ids[nearest], distances[nearest]))]
+        return list(zip(self.ids[nearest].tolist(), distances[nearest].tolist()))
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self.partitions = {}
+        self.records = {}
+        self.scales = np.ones(3)
+        # Sommes des points et de leurs carrés, tenues à jour à chaque ligne pour recalculer les échelles en O(1)
+        self._sums = np.zeros(3)
+        self._squares = np.zeros(3)
+        self.version = None
+        self.syncs = 0
+        self.full_syncs = 0
+        self.rows_applied = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.version is not None
+
+    # Vérifier la révision (une lecture par clé primaire) et n'appliquer que les lignes qui ont changé ;
+    # renvoie la révision appliquée
+    def sync(self, conn):
+        version = aggregates.get_version(conn, aggregates.VEHICULES)
+        with self._lock:
+            if version == self.version:
+                return self.version
+            changed = None if self.version is None else aggregates.changed_vehicules(conn, self.version, version)
+            if changed is None:
+                self._sync_all(conn)
+            elif changed:
+                rows = conn.execute(SELECT_CHANGED_SQL, {"ids": sorted(changed)}).all()
+                self._apply(changed, rows)
+            self._update_scales()
+            self.version = version
+            self.syncs += 1
+            return self.version
+
+    # Relecture complète : différences entre la table et l'index
+    def _sync_all(self, conn):
+        current = {row[0]: tuple(row) for row in conn.execute(text(SELECT_VEHICULES_SQL))}
+        for vehicule_id in self.records.keys() - current.keys():
+            self._remove(vehicule_id)
+        for vehicule_id, row in current.items():
+            if self.records.get(vehicule_id) != row:
+                self._upsert(row)
+        self.full_syncs += 1
+
+    # Véhicules relus : mis à jour s'ils sont indexables, retirés sinon (supprimés ou sans année, kilométrage, prix)
+    def _apply(self, vehicule_ids, rows):
+        found = set()
+        for row in rows:
+            found.add(row[0])
+            if self.records.get(row[0]) != tuple(row):
+                self._upsert(tuple(row))
+        for vehicule_id in vehicule_ids - found:
+            if vehicule_id in self.records:
+                self._remove(vehicule_id)
+
+    # Après une écriture de ce worker : si elle est la seule depuis la dernière synchronisation,
+    # relire uniquement ce véhicule ; sinon la prochaine synchronisation lira le journal
+    def refresh(self, conn, vehicule_id):
+        version = aggregates.get_version(conn, aggregates.VEHICULES)
+        with self._lock:
+            if self.version is None or version != self.version + 1:
+                return False
+            rows = conn.execute(text(SELECT_VEHICULE_SQL), {"vehicule_id": vehicule_id}).all()
+            self._apply({vehicule_id}, rows)
+            self._update_scales()
+            self.version = version
+            self.refreshes += 1
+            return True
+
+    # Échelles : écarts-types du catalogue indexé, à partir des sommes courantes
+    def _update_scales(self):
+        if not self.records:
+            return
+        means = self._sums / len(self.records)
+        scales = np.sqrt(np.maximum(self._squares / len(self.records) - means ** 2, 0.0))
+        self.scales = np.where(scales > 0, scales, 1.0)
+
+    def _upsert(self, row):
+        vehicule_id, key = row[0], row[1:4]
+        previous = self.records.get(vehicule_id)
+        if previous is not None and previous[1:4] != key:
+            self._remove(vehicule_id)
+            previous = None
+        partition = self.partitions.get(key)
+        if partition is None:
+            partition = self.partitions[key] = Partition()
+        partition.upsert(vehicule_id, row[6:])
+        if previous is not None:
+            self._add_moments(previous[6:], -1)
+        self._add_moments(row[6:], 1)
+        self.records[vehicule_id] = row
+        self.rows_applied += 1
+
+    def _remove(self, vehicule_id):
+        row = self.records.pop(vehicule_id)
+        self._add_moments(row[6:], -1)
+        key = row[1:4]
+        partition = self.partitions[key]
+        partition.remove(vehicule_id)
+        if partition.size == 0:
+            del self.partitions[key]
+        self.rows_applied += 1
+
+    def _add_moments(self, point, sign):
+        point = np.asarray(point, dtype=np.float64)
+        self._sums += sign * point
+        self._squares += sign * point * point
+
+    def _results(self, neighbours):
+        return [
+            {**dict(zip(RECORD_FIELDS, self.records[vehicule_id])), "distance": distance}
+            for vehicule_id, distance in neighbours
+        ]
+
+    # Véhicules similaires à un véhicule du catalogue (lui-même exclu) ; None s'il n'est pas indexé
+    def similar_to(self, vehicule_id, k):
+        with self._lock:
+            row = self.records.get(vehicule_id)
+            if row is None:
+                return None
+            partition = self.partitions[row[1:4]]
+            return self._results(partition.nearest(np.array(row[6:], dtype=np.float64), self.scales, k, vehicule_id))
+
+    # Véhicules similaires à une description (prix None : distance sur l'année et le kilométrage seulement)
+    def similar(self, marque, carburant, transmission, annee, kilometrage, prix, k):
+        query = np.array([annee, kilometrage, np.nan if prix is None else prix], dtype=np.float64)
+        with self._lock:
+            partition = self.partitions.get((marque, carburant, transmission))
+            if partition is None:
+                return []
+            return self._results(partition.nearest(query, self.scales, k))
+
+    def stats(self):
+        with self._lock:
+            sizes = [partition.size for partition in self.partitions.values()]
+            return {
+                "vehicules": len(self.records),
+                "partitions": len(sizes),
+                "largest_partition": max(sizes, default=0),
+                "version": self.version,
+                "scales": self.scales.tolist(),
+                "syncs": self.syncs,
+                "full_syncs": self.full_syncs,
+                "refreshes": self.refreshes,
+                "rows_applied": self.rows_applied,
+            }
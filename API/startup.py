@@ -0,0 +1,46 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Origine des mesures : import de ce module, c'est-à-dire le début de l'import de API.main
+PROCESS_STARTED = time.perf_counter()
+
+
+# Durées des phases de démarrage (import, préparation de la base, chargement de chaque modèle...).
+# STARTUP_PROFILE=1 journalise chaque phase et le rapport complet quand le worker est prêt
+class StartupProfile:
+    def __init__(self, enabled=False, started=PROCESS_STARTED):
+        self.enabled = enabled
+        self.started = started
+        self.phases = {}
+        self.ready_after = None
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases[name] = round(seconds, 4)
+        if self.enabled:
+            logging.info(f"Démarrage : {name} en {seconds * 1000:.1f} ms")
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    # Temps écoulé depuis le début de l'import jusqu'à maintenant, enregistré sous `name`
+    def mark(self, name):
+        self.record(name, time.perf_counter() - self.started)
+
+    def ready(self):
+        if self.ready_after is None:
+            self.ready_after = round(time.perf_counter() - self.started, 4)
+            if self.enabled:
+                logging.info(f"Démarrage : prêt après {self.ready_after * 1000:.1f} ms, phases {self.report()['phases']}")
+
+    def report(self):
+        with self._lock:
+            return {"phases": dict(self.phases), "ready_after_seconds": self.ready_after}
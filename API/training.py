@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from scipy.stats import loguniform, randint
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (active HalvingRandomSearchCV)
+from sklearn.metrics import accuracy_score, mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import HalvingRandomSearchCV, KFold, RandomizedSearchCV, StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from .features import EncodedPipeline, build_preprocessor, feature_frame, frame_requests, schema_dict
+from .prediction import CombinedModel
+
+# Entraînement des modèles servis par l'API (remplace les GridSearchCV exhaustifs des scripts de models/) :
+# recherche aléatoire par divisions successives (n_estimators comme ressource) sous un budget d'ajustements,
+# préprocesseur mis en cache par pli (mémoire du Pipeline), plis exécutés en parallèle dans des processus,
+# et scores de validation croisée du meilleur candidat repris des résultats de la recherche
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_CSV = os.path.join(ROOT_DIR, "data", "cleaned", "voitures_aramisauto_nettoye.csv")
+MODELS_DIR = os.path.join(ROOT_DIR, "models")
+TARGET = "Prix"
+RANDOM_STATE = 42
+HALVING_FACTOR = 3
+
+# Par modèle : étape finale du pipeline, estimateur, métrique, espace de recherche et ressource des divisions successives
+MODEL_SPECS = {
+    "random_forest": {
+        "filename": "random_forest_improved.pkl",
+        "step": "regressor",
+        "estimator": lambda: RandomForestRegressor(random_state=RANDOM_STATE),
+        "scoring": "r2",
+        "space": {
+            "max_depth": [10, 14, 18, 22, None],
+            "max_features": ["sqrt", "log2", None],
+            "min_samples_split": randint(2, 11),
+            "min_samples_leaf": randint(1, 5),
+        },
+        "n_estimators": (50, 450),
+    },
+    "gradient_boosting": {
+        "filename": "gradient_boosting_classifier.pkl",
+        "step": "classifier",
+        "estimator": lambda: GradientBoostingClassifier(random_state=RANDOM_STATE),
+        "scoring": "accuracy",
+        "space": {
+            "learning_rate": loguniform(0.01, 0.3),
+            "max_depth": [2, 3, 4, 5],
+            "min_samples_leaf": randint(1, 10),
+            "subsample": [0.8, 1.0],
+        },
+        "n_estimators": (30, 270),
+    },
+}
+
+
+# Jeu d'entraînement de chaque modèle, comme les scripts d'origine :
+# prix hors valeurs aberrantes (1,5 × écart interquartile) pour la régression, prix > médiane pour la classification
+def prepare_dataset(df, name):
+    if name == "random_forest":
+        q1, q3 = df[TARGET].quantile(0.25), df[TARGET].quantile(0.75)
+        iqr = q3 - q1
+        df = df[(df[TARGET] >= q1 - 1.5 * iqr) & (df[TARGET] <= q3 + 1.5 * iqr)]
+        y = df[TARGET]
+    else:
+        y = (df[TARGET] > df[TARGET].median()).astype(int)
+    return feature_frame(df), y
+
+
+# Nombre de candidats pour tenir dans le budget d'ajustements :
+# divisions successives ≈ n × (1 + 1/3 + 1/9 + ...) × plis, recherche aléatoire = n × plis
+def candidates_for_budget(budget, cv, search):
+    per_candidate = cv * (HALVING_FACTOR / (HALVING_FACTOR - 1) if search == "halving" else 1)
+    return max(HALVING_FACTOR if search == "halving" else 1, int(budget / per_candidate))
+
+
+def build_search(name, search, budget, cv, n_jobs, verbose, cache_dir):
+    spec = MODEL_SPECS[name]
+    step = spec["step"]
+    # Le préprocesseur ajusté sur un pli est réutilisé par tous les candidats évalués sur ce pli
+    pipeline = Pipeline(
+        steps=[("preprocessor", build_preprocessor()), (step, spec["estimator"]())],
+        memory=joblib.Memory(cache_dir, verbose=0),
+    )
+    space = {f"{step}__{param}": values for param, values in spec["space"].items()}
+    splitter = (KFold if spec["scoring"] == "r2" else StratifiedKFold)(cv, shuffle=True, random_state=RANDOM_STATE)
+    n_candidates = candidates_for_budget(budget, cv, search)
+    min_estimators, max_estimators = spec["n_estimators"]
+    if search == "halving":
+        return HalvingRandomSearchCV(
+            pipeline, space, n_candidates=n_candidates, factor=HALVING_FACTOR,
+            resource=f"{step}__n_estimators", min_resources=min_estimators, max_resources=max_estimators,
+            scoring=spec["scoring"], cv=splitter, n_jobs=n_jobs, verbose=verbose, random_state=RANDOM_STATE,
+        )
+    space[f"{step}__n_estimators"] = randint(min_estimators, max_estimators + 1)
+    return RandomizedSearchCV(
+        pipeline, space, n_iter=n_candidates, scoring=spec["scoring"], cv=splitter,
+        n_jobs=n_jobs, verbose=verbose, random_state=RANDOM_STATE,
+    )
+
+
+# Scores par pli du meilleur candidat, lus dans cv_results_ (pas de nouvelle validation croisée)
+def best_cv_scores(search):
+    results, index = search.cv_results_, search.best_index_
+    return [float(results[f"split{fold}_test_score"][index]) for fold in range(search.n_splits_)]
+
+
+def evaluate(name, model, X_test, y_test):
+    y_pred = model.predict(X_test)
+    if MODEL_SPECS[name]["scoring"] == "accuracy":
+        return {"accuracy": float(accuracy_score(y_test, y_pred))}
+    return {
+        "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "r2": float(r2_score(y_test, y_pred)),
+    }
+
+
+def train_model(name, df, search="halving", budget=300, cv=5, n_jobs=-1, verbose=1, cache_dir=None):
+    X, y = prepare_dataset(df, name)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        searcher = build_search(name, search, budget, cv, n_jobs, verbose, cache_dir or tmp_dir)
+        start = time.perf_counter()
+        searcher.fit(X_train, y_train)
+        elapsed = time.perf_counter() - start
+    model = searcher.best_estimator_
+    # Le cache ne sert qu'à la recherche : l'artefact sauvegardé n'y fait pas référence
+    model.set_params(memory=None)
+    # Schéma des caractéristiques enregistré dans l'artefact, vérifié au chargement par l'API
+    model.feature_schema = schema_dict()
+    cv_scores = best_cv_scores(searcher)
+    report = {
+        "model": name,
+        "search": search,
+        "candidates": len(searcher.cv_results_["params"]),
+        "fits": len(searcher.cv_results_["params"]) * searcher.n_splits_,
+        "seconds": round(elapsed, 2),
+        "best_params": {key: getattr(value, "item", lambda: value)() for key, value in searcher.best_params_.items()},
+        "cv_scores": cv_scores,
+        "cv_mean": float(np.mean(cv_scores)),
+        "test": evaluate(name, model, X_test, y_test),
+    }
+    return model, report
+
+
+# Inférence combinée (un seul encodage pour les deux modèles, voir API.prediction.CombinedModel) :
+# parité exacte avec les deux pipelines sur X, et temps d'encodage par requête seule et par lot
+def check_combined(price_pipeline, deal_pipeline, X, repeat=200):
+    combined = CombinedModel(EncodedPipeline(price_pipeline), EncodedPipeline(deal_pipeline))
+    requests = frame_requests(X)
+    prices, deals, _ = combined.predict_requests(requests)
+    if not (np.array_equal(prices, price_pipeline.predict(X)) and np.array_equal(deals, deal_pipeline.predict(X))):
+        raise ValueError("L'inférence combinée diffère des deux pipelines")
+
+    encoders = [combined.price_model.encoder, combined.deal_model.encoder]
+    shared = combined.encoder
+
+    def separate(rows):
+        for encoder in encoders:
+            encoder.encode(rows)
+
+    def combined_transform(rows):
+        matrix = shared.encode(rows)
+        for index in range(len(encoders)):
+            shared.project(matrix, index)
+
+    # Meilleur de plusieurs passages, pour limiter le bruit de la machine
+    def per_request_ms(transform, batches, rounds=5):
+        best = np.inf
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for rows in batches:
+                transform(rows)
+            best = min(best, time.perf_counter() - start)
+        return best * 1000.0 / sum(len(rows) for rows in batches)
+
+    singles = [[request] for request in requests[:repeat]]
+    timings = {}
+    for label, batches in (("single", singles), ("batch", [requests])):
+        timings[label] = {
+            "separate_ms": round(per_request_ms(separate, batches), 5),
+            "shared_ms": round(per_request_ms(combined_transform, batches), 5),
+        }
+    return {"rows": len(requests), "parity": True, "shared_categories": shared.n_codes,
+            "transform_per_request": timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entraîner les modèles de l'API (recherche d'hyperparamètres).")
+    parser.add_argument("models", nargs="*", help=f"modèles à entraîner parmi {', '.join(MODEL_SPECS)} (tous par défaut)")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--output-dir", default=MODELS_DIR)
+    parser.add_argument("--search", choices=["halving", "random"], default="halving")
+    parser.add_argument("--budget", type=int, default=300, help="nombre approximatif d'ajustements par modèle")
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1, help="processus parallèles (-1 : tous les cœurs)")
+    parser.add_argument("--cache-dir", help="cache du préprocesseur par pli (temporaire par défaut)")
+    parser.add_argument("--verbose", type=int, default=1)
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(MODEL_SPECS)
+    if unknown:
+        parser.error(f"modèles inconnus : {', '.join(sorted(unknown))}")
+
+    df = pd.read_csv(args.csv)
+    reports, models = {}, {}
+    for name in args.models or list(MODEL_SPECS):
+        model, report = train_model(
+            name, df, args.search, args.budget, args.cv, args.jobs, args.verbose, args.cache_dir,
+        )
+        models[name] = model
+        reports[name] = report
+        print(f"{name} : {report['fits']} ajustements en {report['seconds']:.1f} s, "
+              f"CV {report['cv_mean']:.4f}, test {report['test']}")
+        print(f"  Meilleurs paramètres : {report['best_params']}")
+
+    # Les modèles non réentraînés sont repris du dossier de sortie pour vérifier l'inférence combinée
+    # avant d'écrire les nouveaux artefacts
+    paths = {name: os.path.join(args.output_dir, spec["filename"]) for name, spec in MODEL_SPECS.items()}
+    if all(name in models or os.path.exists(path) for name, path in paths.items()):
+        pair = [models[name] if name in models else joblib.load(paths[name])
+                for name in ("random_forest", "gradient_boosting")]
+        reports["combined"] = check_combined(*pair, feature_frame(df))
+        timings = reports["combined"]["transform_per_request"]
+        print(f"Inférence combinée : parité vérifiée sur {reports['combined']['rows']} lignes, encodage par requête "
+              f"{timings['single']['separate_ms']:.4f} -> {timings['single']['shared_ms']:.4f} ms (seule), "
+              f"{timings['batch']['separate_ms']:.4f} -> {timings['batch']['shared_ms']:.4f} ms (lot)")
+
+    for name, model in models.items():
+        path = os.path.join(args.output_dir, MODEL_SPECS[name]["filename"])
+        joblib.dump(model, path)
+        print(f"{name} -> {path}")
+
+    report_path = os.path.join(args.output_dir, "training_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(reports, f, indent=2, ensure_ascii=False)
+    print(f"Rapport écrit dans {report_path}")
+
+
+if __name__ == "__main__":
+    main()
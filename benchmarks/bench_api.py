@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT_DIR)
+
+# Suite de benchmarks de l'API, exécutée dans le processus (application ASGI + client httpx) sur une copie
+# temporaire de voitures_aramisauto.db. Pour chaque scénario : débit, latences p50/p95/p99, erreurs et mémoire
+# du processus ; le rapport JSON peut être comparé à un rapport précédent (--compare)
+# Utilisation : python benchmarks/bench_api.py [--concurrency 20] [--duration 5] [--scenarios predict vehicules ...]
+#               [--output rapport.json] [--compare rapport_precedent.json]
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+USERNAME, PASSWORD = "bench_api", "bench_password"
+PREDICT_VEHICULES = [
+    ("Peugeot", "208", "Essence", "Manuelle"),
+    ("Renault", "Clio", "Diesel", "Manuelle"),
+    ("Citroen", "C3", "Essence", "Automatique"),
+    ("Volkswagen", "Golf", "Diesel", "Automatique"),
+    ("Toyota", "Yaris", "Hybride", "Automatique"),
+]
+
+
+# Requête aléatoire reproductible pour chaque scénario (le kilométrage varie pour limiter les succès du cache)
+def predict_payload(rng):
+    marque, modele, carburant, transmission = rng.choice(PREDICT_VEHICULES)
+    return {
+        "kilometrage": rng.randrange(5000, 200000, 500), "annee": rng.randint(2010, 2023), "marque": marque,
+        "carburant": carburant, "transmission": transmission, "modele": modele, "etat": "Occasion",
+    }
+
+
+def build_scenarios(headers):
+    return {
+        "predict_combined": lambda client, rng: client.post("/predict_combined", json=predict_payload(rng)),
+        "vehicules": lambda client, rng: client.get("/vehicules/", params={
+            "limit": 20, "sort": rng.choice(["id", "-prix", "annee", "kilometrage"]),
+        }),
+        "login": lambda client, rng: client.post("/login", json={"username": USERNAME, "password": PASSWORD}),
+        "users_me": lambda client, rng: client.get("/users/me/", headers=headers),
+        "data_year_brand": lambda client, rng: client.get("/data/data/year-brand-distribution"),
+        "data_clustering": lambda client, rng: client.get("/data/data/clustering", params={"max_points": 1000}),
+    }
+
+
+def percentile(latencies_ms, q):
+    return round(float(np.percentile(latencies_ms, q)), 3) if len(latencies_ms) else None
+
+
+# Chaque client virtuel enchaîne les requêtes du scénario jusqu'à la fin de la durée
+async def client_loop(send, client, rng, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await send(client, rng)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except Exception as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_scenario(send, client, concurrency, duration, seed, process_memory):
+    # Préchauffage hors mesure (imports différés, caches de requêtes SQLite...)
+    await send(client, random.Random(seed))
+    memory_before = process_memory()
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[
+        client_loop(send, client, random.Random(seed + index), deadline, latencies, errors)
+        for index in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+    memory_after = process_memory()
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "rss_mb": memory_after.get("vmrss_mb"),
+        "rss_delta_mb": round(memory_after.get("vmrss_mb", 0) - memory_before.get("vmrss_mb", 0), 1),
+    }
+
+
+async def run_suite(args):
+    import httpx
+    from API.main import app
+    from API.shared_models import process_memory
+
+    results = {}
+    # Démarrage complet (préparation de la base, chargement des modèles) comme sous uvicorn
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+            credentials = {"username": USERNAME, "password": PASSWORD}
+            await client.post("/register", json={**credentials, "email": f"{USERNAME}@example.com"})
+            token = (await client.post("/login", json=credentials)).json()["access_token"]
+            scenarios = build_scenarios({"Authorization": f"Bearer {token}"})
+            for name in args.scenarios:
+                results[name] = await run_scenario(
+                    scenarios[name], client, args.concurrency, args.duration, args.seed, process_memory,
+                )
+                print(format_result(name, results[name]), flush=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_result(name, result):
+    return (f"{name:>16} : {result['rps']:8.1f} req/s, p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+            f"p99 {result['p99_ms']} ms, {result['errors']} erreurs, RSS {result['rss_mb']} Mo")
+
+
+# Écart relatif avec un rapport précédent (débit et p95) pour repérer les régressions
+def compare(report, previous):
+    print(f"Comparaison avec {previous.get('revision')} ({previous.get('started_at')}) :")
+    for name, result in report["results"].items():
+        before = previous.get("results", {}).get(name)
+        if not before or not before["rps"] or not before["p95_ms"]:
+            continue
+        rps_change = (result["rps"] / before["rps"] - 1) * 100
+        p95_change = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        print(f"{name:>16} : débit {rps_change:+.1f} %, p95 {p95_change:+.1f} %")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark des endpoints de l'API (dans le processus).")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=5.0, help="durée de chaque scénario, en secondes")
+    parser.add_argument("--scenarios", nargs="+", default=list(build_scenarios({})), choices=list(build_scenarios({})))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", default=os.path.join(ROOT_DIR, "voitures_aramisauto.db"))
+    parser.add_argument("--output", help=f"rapport JSON (par défaut dans {RESULTS_DIR})")
+    parser.add_argument("--compare", help="rapport JSON précédent à comparer")
+    args = parser.parse_args(argv)
+
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_path = os.path.join(tmp_dir, "voitures_aramisauto.db")
+        shutil.copy(args.database, database_path)
+        # La configuration de l'application est lue à l'import : la fixer avant d'importer API.main
+        os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+        os.environ.setdefault("MODEL_WARMUP", "eager")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.chdir(ROOT_DIR)  # Chemins relatifs des modèles
+        results = asyncio.run(run_suite(args))
+
+    report = {
+        "started_at": started_at,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "concurrency": args.concurrency, "duration": args.duration, "seed": args.seed,
+            "environment": {
+                name: value for name, value in os.environ.items()
+                if name.startswith(("PREDICT_", "MODEL_", "DATABASE_", "SQLITE_", "AUTH_", "BCRYPT_", "DATA_"))
+                and name != "DATABASE_URL"
+            },
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_api-{started_at.replace(':', '')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Rapport écrit dans {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Test de charge : GET /vehicules/ avec accès base synchrone (pool de threads) contre asynchrone (AsyncSession)
+# Utilisation : python benchmarks/bench_async_db.py [clients] [durée_en_secondes]
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+PORT = 8765
+
+# Démarrer uvicorn sur une copie temporaire de la base
+def start_server(database_path, database_async):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database_path}",
+        "DATABASE_ASYNC": "1" if database_async else "0",
+        "MODEL_WARMUP": "lazy",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "API.main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(120):
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/", timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    process.kill()
+    raise RuntimeError("Le serveur n'a pas démarré")
+
+# Chaque client enchaîne les requêtes jusqu'à la fin de la durée
+async def client_loop(client, deadline, latencies, errors):
+    skip = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get("/vehicules/", params={"skip": skip % 2000, "limit": 10})
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+        skip += 10
+
+async def run_load():
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=CLIENTS, max_keepalive_connections=CLIENTS)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60.0) as client:
+        # Préchauffage
+        await asyncio.gather(*[client.get("/vehicules/") for _ in range(20)])
+        start = time.perf_counter()
+        deadline = start + DURATION
+        await asyncio.gather(*[client_loop(client, deadline, latencies, errors) for _ in range(CLIENTS)])
+        elapsed = time.perf_counter() - start
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "errors": len(errors),
+    }
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_path = os.path.join(tmp_dir, "voitures_aramisauto.db")
+        shutil.copy(os.path.join(ROOT_DIR, "voitures_aramisauto.db"), database_path)
+        for label, database_async in (("synchrone", False), ("asynchrone", True)):
+            server = start_server(database_path, database_async)
+            try:
+                result = asyncio.run(run_load())
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{label:>10} : {result['rps']:.0f} req/s, p50 {result['p50_ms']:.1f} ms, "
+                  f"p99 {result['p99_ms']:.1f} ms, {result['requests']} requêtes, {result['errors']} erreurs")
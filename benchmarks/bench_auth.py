@@ -0,0 +1,100 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Test de charge de l'authentification : connexions/s (bcrypt), requêtes authentifiées/s (/users/me/)
+# et latence de GET / pendant une vague de connexions, sans puis avec le pool bcrypt et le cache de tokens
+# Utilisation : python benchmarks/bench_auth.py [clients] [durée_en_secondes]
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+PORT = 8766
+USERNAME, PASSWORD = "bench_auth", "bench_password"
+
+CONFIGURATIONS = {
+    "pool de threads, sans cache": {"AUTH_HASH_WORKERS": "0", "AUTH_TOKEN_CACHE_SIZE": "0"},
+    "pool bcrypt + cache de tokens": {},
+}
+
+# Démarrer uvicorn sur une copie temporaire de la base
+def start_server(database_path, settings):
+    env = {
+        **os.environ,
+        **settings,
+        "DATABASE_URL": f"sqlite:///{database_path}",
+        "MODEL_WARMUP": "lazy",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "API.main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(120):
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/", timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    process.kill()
+    raise RuntimeError("Le serveur n'a pas démarré")
+
+# Chaque client enchaîne la même requête jusqu'à la fin de la durée
+async def client_loop(send, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await send()
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+async def measure(send, clients, duration, probe=None):
+    latencies, errors, probe_latencies = [], [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    loops = [client_loop(send, deadline, latencies, errors) for _ in range(clients)]
+    if probe is not None:
+        loops.append(client_loop(probe, deadline, probe_latencies, errors))
+    await asyncio.gather(*loops)
+    elapsed = time.perf_counter() - start
+    result = {"rps": len(latencies) / elapsed, "errors": len(errors)}
+    if probe_latencies:
+        result["probe_p50_ms"] = float(np.percentile(np.array(probe_latencies) * 1000.0, 50))
+    return result
+
+async def run_load():
+    limits = httpx.Limits(max_connections=CLIENTS + 1, max_keepalive_connections=CLIENTS + 1)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=120.0) as client:
+        credentials = {"username": USERNAME, "password": PASSWORD}
+        await client.post("/register", json={**credentials, "email": f"{USERNAME}@example.com"})
+        token = (await client.post("/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        logins = await measure(
+            lambda: client.post("/login", json=credentials), CLIENTS, DURATION, probe=lambda: client.get("/"),
+        )
+        authenticated = await measure(lambda: client.get("/users/me/", headers=headers), CLIENTS, DURATION)
+    return logins, authenticated
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, settings in CONFIGURATIONS.items():
+            database_path = os.path.join(tmp_dir, "voitures_aramisauto.db")
+            shutil.copy(os.path.join(ROOT_DIR, "voitures_aramisauto.db"), database_path)
+            server = start_server(database_path, settings)
+            try:
+                logins, authenticated = asyncio.run(run_load())
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{label:>30} : {logins['rps']:.1f} connexions/s (GET / p50 {logins['probe_p50_ms']:.1f} ms), "
+                  f"{authenticated['rps']:.0f} requêtes authentifiées/s, "
+                  f"{logins['errors'] + authenticated['errors']} erreurs")
@@ -0,0 +1,50 @@
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from API.bulk_load import DEFAULT_CSV, load_csv
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Chargement en masse d'un CSV synthétique (lignes du CSV nettoyé rééchantillonnées, kilométrage perturbé)
+# dans une base vide, puis second passage (upsert sans changement)
+# Utilisation : python benchmarks/bench_bulk_load.py [lignes] [lignes_par_paquet]
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+CHUNK_ROWS = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+
+def write_synthetic_csv(path):
+    source = pd.read_csv(DEFAULT_CSV)
+    rng = np.random.default_rng(0)
+    written = 0
+    while written < ROWS:
+        size = min(100000, ROWS - written)
+        chunk = source.sample(size, replace=True, random_state=int(rng.integers(1 << 31))).reset_index(drop=True)
+        chunk["Kilométrage"] = chunk["Kilométrage"] + np.arange(written, written + size)
+        chunk.to_csv(path, mode="a", header=written == 0, index=False)
+        written += size
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, "vehicules.csv")
+        database_path = os.path.join(tmp_dir, "voitures.db")
+        write_synthetic_csv(csv_path)
+        conn = sqlite3.connect(database_path)
+        with open(os.path.join(ROOT_DIR, "sql", "create_tables.sql"), encoding="utf-8") as f:
+            conn.executescript(f.read())
+        conn.close()
+
+        for label in ("premier chargement", "upsert à l'identique"):
+            start = time.perf_counter()
+            stats = load_csv(csv_path, database_path, CHUNK_ROWS)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>22} : {ROWS} lignes en {elapsed:.1f} s ({ROWS / elapsed:.0f} lignes/s), "
+                  f"{stats['inserted']} insérées, {stats['updated']} mises à jour, RSS max {peak_rss_mb():.0f} Mo")
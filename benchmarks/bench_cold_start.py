@@ -0,0 +1,59 @@
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Démarrage à froid : délai avant la première réponse HTTP, puis avant la première prédiction réussie
+# Utilisation : python benchmarks/bench_cold_start.py [essais] [dossier_du_dépôt]
+# (le second argument permet de mesurer une autre version du dépôt, par exemple un `git worktree`)
+TRIALS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+APP_DIR = os.path.abspath(sys.argv[2]) if len(sys.argv) > 2 else ROOT_DIR
+PORT = 8766
+PREDICT_PAYLOAD = {
+    "kilometrage": 15000, "annee": 2019, "marque": "Peugeot", "carburant": "Essence",
+    "transmission": "Manuelle", "modele": "208", "etat": "Occasion",
+}
+
+def wait_for(check, timeout=120.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if check():
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError("Délai dépassé")
+
+def trial(database_path):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}", "PREDICT_CACHE_SIZE": "0"}
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "API.main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{PORT}"
+        wait_for(lambda: httpx.get(f"{base_url}/", timeout=1.0).status_code == 200)
+        first_response = time.perf_counter() - start
+        wait_for(lambda: httpx.post(f"{base_url}/predict_combined", json=PREDICT_PAYLOAD, timeout=30.0).status_code == 200)
+        first_prediction = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+    return first_response, first_prediction
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_path = os.path.join(tmp_dir, "voitures_aramisauto.db")
+        shutil.copy(os.path.join(ROOT_DIR, "voitures_aramisauto.db"), database_path)
+        results = [trial(database_path) for _ in range(TRIALS)]
+    first_responses, first_predictions = zip(*results)
+    print(f"{APP_DIR} : première réponse {statistics.median(first_responses):.2f} s, "
+          f"première prédiction {statistics.median(first_predictions):.2f} s (médianes sur {TRIALS} essais)")
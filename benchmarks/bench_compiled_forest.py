@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from API.compiled_forest import compile_forest_pipeline
+
+# Benchmark : pipeline scikit-learn contre forêt compilée (latence par ligne et par lot)
+# Utilisation : python benchmarks/bench_compiled_forest.py [chemin_du_modele]
+MODEL_PATH = sys.argv[1] if len(sys.argv) > 1 else "./models/random_forest_improved.pkl"
+DATA_PATH = "./data/cleaned/voitures_aramisauto_nettoye.csv"
+BATCH_SIZES = [1, 8, 32, 64, 128, 512, 2048]
+REPEATS = 20
+
+# Temps médian d'un appel, en millisecondes
+def measure(fn, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000.0
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore")
+    pipeline = joblib.load(MODEL_PATH)
+
+    start = time.perf_counter()
+    compiled = compile_forest_pipeline(pipeline)
+    print(f"Compilation : {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({compiled.n_trees} arbres, {compiled.n_nodes} nœuds, profondeur max {compiled.max_depth})")
+
+    X = pd.read_csv(DATA_PATH).drop(columns=["Prix"])
+    assert np.array_equal(compiled.predict(X), pipeline.predict(X)), "Les prédictions compilées diffèrent"
+
+    print(f"{'lot':>6} | {'sklearn ms':>11} | {'compilé ms':>11} | {'sklearn ms/ligne':>16} | {'compilé ms/ligne':>16}")
+    for size in BATCH_SIZES:
+        batch = X.sample(n=size, replace=size > len(X), random_state=42)
+        repeats = REPEATS if size <= 128 else 3
+        sklearn_ms = measure(pipeline.predict, batch, repeats)
+        compiled_ms = measure(compiled.predict, batch, repeats)
+        print(f"{size:>6} | {sklearn_ms:>11.2f} | {compiled_ms:>11.2f} | {sklearn_ms / size:>16.3f} | {compiled_ms / size:>16.3f}")
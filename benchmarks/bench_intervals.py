@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from API.compiled_forest import FastPathForest
+from API.features import EncodedPipeline
+from API.prediction import price_intervals
+
+# Benchmark : surcoût de l'intervalle de prédiction (moyenne, écart-type et quantiles sur tous les arbres)
+# et des contributions par champ (mode explication) par rapport à la prédiction simple, avec le chemin rapide de l'API (forêt compilée pour les petits lots)
+# et avec scikit-learn seul (PRICE_MODEL_FAST_PATH=0)
+# Utilisation : python benchmarks/bench_intervals.py [chemin_du_modele]
+MODEL_PATH = sys.argv[1] if len(sys.argv) > 1 else "./models/random_forest_improved.pkl"
+DATA_PATH = "./data/cleaned/voitures_aramisauto_nettoye.csv"
+BATCH_SIZES = [1, 8, 32, 128, 512, 2048]
+QUANTILES = (0.05, 0.5, 0.95)
+REPEATS = 20
+
+# Temps médian d'un appel, en millisecondes
+def measure(fn, encoded, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(encoded)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000.0
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore")
+    pipeline = joblib.load(MODEL_PATH)
+    models = {"rapide": FastPathForest(pipeline), "sklearn": EncodedPipeline(pipeline)}
+    X = pd.read_csv(DATA_PATH).drop(columns=["Prix"])
+    encoded = models["rapide"].encoder.encode_frame(X)
+    for model in models.values():
+        means = price_intervals(model, encoded, QUANTILES)[0]
+        assert np.array_equal(means, pipeline.predict(X)), "La moyenne des arbres diffère de la prédiction"
+
+    print(f"{'lot':>6} | {'modèle':>8} | {'predict ms':>11} | {'intervalle ms':>13} | {'surcoût':>8} | "
+          f"{'explication ms':>14} | {'surcoût':>8}")
+    for size in BATCH_SIZES:
+        rows = np.resize(encoded, (size, encoded.shape[1]))
+        repeats = REPEATS if size <= 512 else 5
+        for label, model in models.items():
+            plain = measure(model.predict_encoded, rows, repeats)
+            interval = measure(lambda rows: price_intervals(model, rows, QUANTILES), rows, repeats)
+            explain = measure(model.contributions_encoded, rows, repeats)
+            print(f"{size:>6} | {label:>8} | {plain:>11.2f} | {interval:>13.2f} | {interval / plain:>7.2f}x | "
+                  f"{explain:>14.2f} | {explain / plain:>7.2f}x")
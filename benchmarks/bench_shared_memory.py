@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import sys
+import warnings
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Benchmark : mémoire par worker avec chargement par processus contre forêt partagée en mémoire
+# Utilisation : python benchmarks/bench_shared_memory.py [nombre_de_workers]
+N_WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+DATA_PATH = os.path.join(ROOT_DIR, "data/cleaned/voitures_aramisauto_nettoye.csv")
+
+# Worker simulé : charge les modèles comme API.main puis mesure sa mémoire pendant que les autres sont actifs
+def worker(mode, loaded, measured, results):
+    warnings.filterwarnings("ignore")
+    os.environ["MODEL_SERVING_MODE"] = mode
+    os.environ["MODEL_WARMUP"] = "lazy"
+    os.chdir(ROOT_DIR)
+    sys.path.insert(0, ROOT_DIR)
+    import pandas as pd
+    from API.main import model_registry, PRICE_MODEL, DEAL_MODEL
+    from API.shared_models import process_memory
+
+    if mode != "none":
+        model_registry.warm_up(background=False)
+        # Prédictions par petits lots (trafic interactif) sur tout le fichier : l'ensemble des nœuds est touché
+        X = pd.read_csv(DATA_PATH).drop(columns=["Prix"])
+        for start in range(0, len(X), 32):
+            model_registry.get(PRICE_MODEL).predict(X.iloc[start:start + 32])
+            model_registry.get(DEAL_MODEL).predict(X.iloc[start:start + 32])
+
+    loaded.wait()
+    results.put(process_memory())
+    measured.wait()
+
+def run(mode):
+    context = multiprocessing.get_context("spawn")
+    loaded, measured = context.Barrier(N_WORKERS), context.Barrier(N_WORKERS + 1)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, loaded, measured, results)) for _ in range(N_WORKERS)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    measured.wait()
+    for process in processes:
+        process.join()
+    return reports
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore")
+    sys.path.insert(0, ROOT_DIR)
+    from API.shared_models import export_price_model
+
+    # Export réalisé une seule fois avant le démarrage des workers, comme en déploiement
+    export_price_model(os.path.join(ROOT_DIR, "models/random_forest_improved.pkl"), os.path.join(ROOT_DIR, "models/shared"))
+
+    summary = {}
+    # "none" : worker sans modèle chargé, pour isoler la mémoire due aux modèles
+    for mode in ("none", "process", "shared"):
+        reports = run(mode)
+        rss = sum(report.get("vmrss_mb", 0) for report in reports)
+        pss = sum(report.get("pss_mb", 0) for report in reports)
+        summary[mode] = (rss, pss)
+        print(f"Mode {mode} : {N_WORKERS} workers")
+        for report in reports:
+            print(f"  pid {report['pid']} : RSS {report.get('vmrss_mb')} Mo, PSS {report.get('pss_mb')} Mo, "
+                  f"fichiers {report.get('rssfile_mb')} Mo, anonyme {report.get('rssanon_mb')} Mo")
+        print(f"  total : RSS {rss:.1f} Mo, PSS {pss:.1f} Mo (PSS moyenne par worker {pss / N_WORKERS:.1f} Mo)")
+
+    baseline = summary["none"][1]
+    for mode in ("process", "shared"):
+        print(f"PSS due aux modèles en mode {mode} : {summary[mode][1] - baseline:.1f} Mo pour {N_WORKERS} workers")
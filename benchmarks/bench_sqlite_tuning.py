@@ -0,0 +1,84 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from API import aggregates, crud, models, schemas
+from API.database import create_db_engine
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Benchmark lecture/écriture concurrentes : SQLite par défaut contre mode production (WAL + PRAGMA + pool)
+# Utilisation : python benchmarks/bench_sqlite_tuning.py [lecteurs] [écrivains] [durée_en_secondes]
+READERS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+WRITERS = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+DURATION = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+
+def reader(Session, deadline, stats):
+    skip = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        db = Session()
+        try:
+            crud.get_vehicules(db, skip=skip % 2000, limit=10)
+            db.execute(text("SELECT COUNT(*) FROM Vehicule WHERE Annee >= 2020")).scalar()
+            stats["read_latencies"].append(time.perf_counter() - start)
+        except Exception:
+            stats["read_errors"] += 1
+        finally:
+            db.close()
+        skip += 10
+
+def writer(Session, deadline, stats):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        db = Session()
+        try:
+            vehicule = crud.create_vehicule(db, schemas.VehiculeCreate(
+                marque_id=1, modele="Benchmark", annee=2020, kilometrage=1000, prix=20000,
+                etat="Occasion", carburant_id=1, transmission_id=1,
+            ))
+            crud.update_vehicule(db, vehicule.id, schemas.VehiculeUpdate(prix=21000))
+            stats["write_latencies"].append(time.perf_counter() - start)
+        except Exception:
+            db.rollback()
+            stats["write_errors"] += 1
+        finally:
+            db.close()
+
+def run(tuning):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_path = os.path.join(tmp_dir, "voitures_aramisauto.db")
+        shutil.copy(os.path.join(ROOT_DIR, "voitures_aramisauto.db"), database_path)
+        engine = create_db_engine(f"sqlite:///{database_path}", tuning=tuning)
+        models.Base.metadata.create_all(bind=engine)
+        aggregates.ensure_built(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        stats = {"read_latencies": [], "write_latencies": [], "read_errors": 0, "write_errors": 0}
+
+        deadline = time.perf_counter() + DURATION
+        threads = [threading.Thread(target=reader, args=(Session, deadline, stats)) for _ in range(READERS)]
+        threads += [threading.Thread(target=writer, args=(Session, deadline, stats)) for _ in range(WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+    return stats
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(np.array(latencies) * 1000.0, q)) if latencies else float("nan")
+
+if __name__ == "__main__":
+    for label, tuning in (("par défaut", False), ("production", True)):
+        stats = run(tuning)
+        reads, writes = len(stats["read_latencies"]), len(stats["write_latencies"])
+        print(f"{label:>10} : {reads / DURATION:.0f} lectures/s (p99 {percentile_ms(stats['read_latencies'], 99):.1f} ms, "
+              f"{stats['read_errors']} erreurs), {writes / DURATION:.0f} écritures/s "
+              f"(p99 {percentile_ms(stats['write_latencies'], 99):.1f} ms, {stats['write_errors']} erreurs)")
@@ -1,12 +1,15 @@
+import os
+import sys
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from sklearn.model_selection import learning_curve
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.pipeline import Pipeline
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from API.features import build_preprocessor, feature_frame
+
 # Charger les données
 df = pd.read_csv('../data/cleaned/voitures_aramisauto_nettoye.csv')
 
@@ -15,21 +18,12 @@ if 'Prix_binaire' not in df.columns:
     threshold = df['Prix'].median()
     df['Prix_binaire'] = (df['Prix'] > threshold).astype(int)
 
-# Définir les caractéristiques et la cible
-X = df.drop(columns=['Prix', 'Prix_binaire'])  # Supprimer la cible et la colonne binaire si existante
+# Définir les caractéristiques (schéma commun d'API.features) et la cible
+X = feature_frame(df)
 y = df['Prix']
 
-# Définir les colonnes catégorielles et numériques
-categorical_cols = X.select_dtypes(include=['object']).columns
-numeric_cols = X.select_dtypes(include=['int64', 'float64']).columns
-
 # Préprocesseur pour le prétraitement des données
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numeric_cols),
-        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_cols)
-    ]
-)
+preprocessor = build_preprocessor()
 
 # Pipeline pour le modèle Random Forest
 model_pipeline = Pipeline(steps=[
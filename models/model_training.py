@@ -1,3 +1,5 @@
+import os
+import sys
 import pandas as pd
 import joblib  # Importer Joblib pour sauvegarder les modèles
 from sklearn.model_selection import train_test_split
@@ -6,11 +8,14 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, classification_report, mean_squared_error, r2_score
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from API.features import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS
+
 # Charger les données
 df = pd.read_csv('../data/cleaned/voitures_aramisauto_nettoye.csv')
 
-# Encodage One-Hot des colonnes catégorielles
-categorical_cols = df.select_dtypes(include=['object']).columns
+# Encodage One-Hot des colonnes catégorielles (schéma commun d'API.features)
+categorical_cols = list(CATEGORICAL_COLUMNS)
 df_encoded = pd.get_dummies(df, columns=categorical_cols, drop_first=True)
 
 # Ajouter la variable binaire 'Prix_binaire'
@@ -19,7 +24,7 @@ df_encoded['Prix_binaire'] = (df['Prix'] > threshold).astype(int)
 
 # Standardiser les données numériques
 scaler = StandardScaler()
-numeric_cols = df_encoded.select_dtypes(include=['int64', 'float64']).columns.drop('Prix_binaire')
+numeric_cols = list(NUMERIC_COLUMNS) + ['Prix']
 df_encoded[numeric_cols] = scaler.fit_transform(df_encoded[numeric_cols])
 
 # **Régression Logistique**
@@ -0,0 +1,11 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from API.training import main
+
+# Entraîner les modèles de l'API (recherche par divisions successives, budget d'ajustements, plis en parallèle)
+# Utilisation : python models/train.py [random_forest] [gradient_boosting] [--search halving|random] [--budget N]
+#               [--cv K] [--jobs N] [--cache-dir dossier] [--output-dir dossier]
+if __name__ == "__main__":
+    main()
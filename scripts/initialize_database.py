@@ -1,7 +1,9 @@
 from API.database import engine
-from API import models
+from API import models, aggregates
 
 # Créer les tables dans la base de données
 models.Base.metadata.create_all(bind=engine)
+models.ensure_indexes(engine)
+aggregates.ensure_built(engine)
 
 print("Tables créées avec succès")
\ No newline at end of file
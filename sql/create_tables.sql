@@ -26,4 +26,35 @@ CREATE TABLE Vehicule (
     FOREIGN KEY (Marque_ID) REFERENCES Marque(ID_Marque),
     FOREIGN KEY (Carburant_ID) REFERENCES Carburant(ID_Carburant),
     FOREIGN KEY (Transmission_ID) REFERENCES Transmission(ID_Transmission)
-);
\ No newline at end of file
+);
+
+-- Agrégats marque × année maintenus par l'API (sommes : les moyennes restent exactes après suppression)
+CREATE TABLE Vehicule_Stats (
+    Marque_ID INTEGER NOT NULL,
+    Annee INTEGER NOT NULL,
+    Count INTEGER NOT NULL,
+    Sum_Prix REAL NOT NULL,
+    Sum_Kilometrage REAL NOT NULL,
+    PRIMARY KEY (Marque_ID, Annee),
+    FOREIGN KEY (Marque_ID) REFERENCES Marque(ID_Marque)
+);
+
+CREATE TABLE Aggregate_Version (
+    Name TEXT PRIMARY KEY,
+    Version INTEGER NOT NULL
+);
+
+-- Journal des écritures de véhicules, une ligne par révision du catalogue (les index en mémoire de l'API
+-- relisent les véhicules modifiés depuis leur dernière révision ; lecture par plage sur la clé primaire)
+CREATE TABLE Vehicule_Change (
+    Version INTEGER PRIMARY KEY,
+    Vehicule_ID INTEGER NOT NULL
+);
+
+-- Index composites pour la pagination par curseur et les filtres de /vehicules/
+CREATE INDEX ix_vehicule_marque_keyset ON Vehicule (Marque_ID, ID_Vehicule);
+CREATE INDEX ix_vehicule_carburant_keyset ON Vehicule (Carburant_ID, ID_Vehicule);
+CREATE INDEX ix_vehicule_transmission_keyset ON Vehicule (Transmission_ID, ID_Vehicule);
+CREATE INDEX ix_vehicule_annee_keyset ON Vehicule (Annee, ID_Vehicule);
+CREATE INDEX ix_vehicule_prix_keyset ON Vehicule (Prix, ID_Vehicule);
+CREATE INDEX ix_vehicule_kilometrage_keyset ON Vehicule (Kilometrage, ID_Vehicule);
@@ -0,0 +1,13 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from API import models
+
+# Base SQLite en mémoire avec toutes les tables de l'API, sur une connexion unique (StaticPool) partagée par
+# les sessions CRUD et les lectures du test ; chaque module y ajoute ses données dans sa fixture engine
+@pytest.fixture
+def memory_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
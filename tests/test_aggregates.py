@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from API import aggregates, crud, schemas
+
+# Agrégat recalculé directement sur Vehicule, pour comparaison
+FULL_GROUP_BY = """
+    SELECT m.Nom, v.Annee, COUNT(*), AVG(v.Prix), AVG(v.Kilometrage)
+    FROM Vehicule v JOIN Marque m ON v.Marque_ID = m.ID_Marque
+    GROUP BY m.Nom, v.Annee ORDER BY v.Annee, m.Nom
+"""
+
+@pytest.fixture
+def engine(memory_engine):
+    with memory_engine.begin() as conn:
+        conn.execute(text("INSERT INTO Marque (ID_Marque, nom) VALUES (1, 'Peugeot'), (2, 'Renault')"))
+    aggregates.ensure_built(memory_engine)
+    return memory_engine
+
+def vehicule(marque_id, annee, prix, kilometrage):
+    return schemas.VehiculeCreate(marque_id=marque_id, modele="Test", annee=annee, kilometrage=kilometrage, prix=prix,
+                                  etat="Occasion", carburant_id=1, transmission_id=1)
+
+def read_both(engine):
+    with engine.connect() as conn:
+        incremental = [tuple(row.values()) for row in aggregates.read_year_brand(conn)]
+        full = [tuple(row) for row in conn.execute(text(FULL_GROUP_BY))]
+        return incremental, full, aggregates.get_version(conn)
+
+# Test de la mise à jour incrémentale par les fonctions CRUD
+def test_crud_maintains_aggregate(engine):
+    db = sessionmaker(bind=engine, autoflush=False)()
+    first = crud.create_vehicule(db, vehicule(1, 2020, 10000, 50000))
+    second = crud.create_vehicule(db, vehicule(1, 2020, 14000, 30000))
+    crud.create_vehicule(db, vehicule(2, 2021, 20000, 10000))
+    incremental, full, version = read_both(engine)
+    assert incremental == full and len(incremental) == 2
+
+    # Changement d'année : le véhicule passe d'un groupe à l'autre
+    crud.update_vehicule(db, second.id, schemas.VehiculeUpdate(annee=2021, marque_id=2))
+    crud.delete_vehicule(db, first.id)
+    incremental, full, new_version = read_both(engine)
+    assert incremental == full == [("Renault", 2021, 2, 17000.0, 20000.0)]
+    assert new_version > version
+
+    # Une modification sans effet sur l'agrégat ne change pas la révision
+    crud.update_vehicule(db, second.id, schemas.VehiculeUpdate(etat="Neuf"))
+    assert read_both(engine)[2] == new_version
+    db.close()
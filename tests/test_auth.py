@@ -0,0 +1,42 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from API.auth import PasswordHasher, TokenCache, hash_password, hash_rounds, needs_rehash, verify_password
+
+# Test du coût lu dans le hachage et de la détection des hachages à refaire
+def test_needs_rehash():
+    hashed = hash_password("secret", rounds=4)
+    assert hash_rounds(hashed) == 4
+    assert needs_rehash(hashed, rounds=5) and not needs_rehash(hashed, rounds=4)
+    assert verify_password("secret", hashed) and not verify_password("autre", hashed)
+    assert not verify_password("secret", "pas un hachage")
+
+# Test du cache de tokens : expiration à l'exp du token et invalidation par utilisateur
+def test_token_cache():
+    cache = TokenCache(maxsize=2, ttl=60)
+    alice, bob = SimpleNamespace(id=1), SimpleNamespace(id=2)
+    cache.put("token-a", alice, time.time() + 30)
+    cache.put("token-b", bob, time.time() - 1)
+    assert cache.get("token-a") is alice
+    assert cache.get("token-b") is None
+
+    cache.put("token-c", bob, time.time() + 30)
+    cache.invalidate_user(2)
+    assert cache.get("token-c") is None and cache.get("token-a") is alice
+    assert cache.stats()["invalidations"] == 1
+
+# Test du hachage dans le pool de processus
+def test_password_hasher_process_pool():
+    hasher = PasswordHasher(workers=1, max_pending=2, rounds=4)
+
+    async def run():
+        hashed = await hasher.hash("secret")
+        results = await asyncio.gather(*(hasher.verify(password, hashed) for password in ("secret", "autre", "secret")))
+        return hashed, results
+
+    try:
+        hashed, results = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert hash_rounds(hashed) == 4 and not hasher.needs_rehash(hashed)
+    assert results == [True, False, True]
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import pandas as pd
+import pytest
+from API.bulk_load import load_csv
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+ROWS = [
+    {"Marque": "Peugeot", "Modèle": "208", "Année": 2021, "Kilométrage": 15000.0, "Etat": "Occasion", "Prix": 17000.0,
+     "Type de Carburant": "Essence", "Transmission": "Manuelle"},
+    {"Marque": "Renault", "Modèle": "Clio", "Année": 2020, "Kilométrage": 30000.0, "Etat": "Occasion", "Prix": 13000.0,
+     "Type de Carburant": "Non spécifié", "Transmission": "Auto."},
+    # Doublon de la première ligne : la dernière ligne l'emporte
+    {"Marque": "Peugeot", "Modèle": "208", "Année": 2021, "Kilométrage": 15000.0, "Etat": "Occasion", "Prix": 16500.0,
+     "Type de Carburant": "Essence", "Transmission": "Manuelle"},
+]
+
+# Base vide créée à partir du schéma SQL
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "voitures.db"
+    conn = sqlite3.connect(path)
+    with open(os.path.join(ROOT_DIR, "sql", "create_tables.sql"), encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.close()
+    return str(path)
+
+def write_csv(tmp_path, rows):
+    path = tmp_path / "vehicules.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+# Test du premier chargement puis d'un upsert (prix modifié, nouvelle ligne)
+def test_load_then_upsert(database, tmp_path):
+    stats = load_csv(write_csv(tmp_path, ROWS), database, chunk_rows=2)
+    assert stats["inserted"] == 2 and stats["updated"] == 1
+
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT Prix FROM Vehicule WHERE Modele = 'Peugeot'").fetchall() == [(16500.0,)]
+    assert conn.execute("SELECT Carburant_ID FROM Vehicule WHERE Modele = 'Renault'").fetchone() == (None,)
+    assert conn.execute("SELECT COUNT(*) FROM Marque").fetchone() == (2,)
+    # Les index différés pendant le chargement initial sont reconstruits
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Vehicule'").fetchone()[0] == 6
+    conn.close()
+
+    rows = [ROWS[2], {**ROWS[0], "Marque": "Toyota", "Prix": 21000.0}, {**ROWS[1], "Prix": 12500.0}]
+    stats = load_csv(write_csv(tmp_path, rows), database)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (1, 1, 1)
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT COUNT(*) FROM Vehicule").fetchone() == (3,)
+    # Agrégat marque × année recalculé après le chargement
+    assert conn.execute("SELECT SUM(Count), SUM(Sum_Prix) FROM Vehicule_Stats").fetchone() == (3, 16500.0 + 21000.0 + 12500.0)
+    conn.close()
+
+# Test des identifiants relus après insertion et du journal des écritures (une révision par véhicule écrit)
+def test_inserted_ids_and_change_log(database, tmp_path):
+    conn = sqlite3.connect(database)
+    with conn:
+        conn.execute("INSERT INTO Marque (ID_Marque, Nom) VALUES (1, 'Peugeot')")
+        conn.execute(
+            "INSERT INTO Vehicule (ID_Vehicule, Modele, Annee, Kilometrage, Prix, Etat, Marque_ID) "
+            "VALUES (1000, 'Existant', 2015, 90000, 8000, 'Occasion', 1)"
+        )
+        conn.execute("INSERT INTO Aggregate_Version (Name, Version) VALUES ('vehicules', 7)")
+    conn.close()
+
+    stats = load_csv(write_csv(tmp_path, ROWS), database, chunk_rows=2)
+    assert stats["inserted"] == 2 and stats["updated"] == 1
+    conn = sqlite3.connect(database)
+    ids = dict(conn.execute("SELECT Modele, ID_Vehicule FROM Vehicule").fetchall())
+    changes = conn.execute("SELECT Version, Vehicule_ID FROM Vehicule_Change ORDER BY Version").fetchall()
+    # Peugeot inséré puis mis à jour par le second paquet, sous le bon identifiant
+    assert changes == [(8, ids["Peugeot"]), (9, ids["Renault"]), (10, ids["Peugeot"])]
+    assert conn.execute("SELECT Version FROM Aggregate_Version WHERE Name = 'vehicules'").fetchone() == (10,)
+    assert min(ids["Peugeot"], ids["Renault"]) > 1000
+    conn.close()
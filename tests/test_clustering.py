@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from API import aggregates, crud, schemas
+from API.clustering import ClusteringService
+
+# Base en mémoire avec trois groupes de véhicules bien séparés
+@pytest.fixture
+def engine(memory_engine):
+    rng = np.random.default_rng(0)
+    rows = [
+        {"km": km, "prix": prix}
+        for center in ((10000, 30000), (80000, 15000), (150000, 6000))
+        for km, prix in rng.normal(center, (3000, 1000), size=(100, 2)).tolist()
+    ]
+    with memory_engine.begin() as conn:
+        conn.execute(text("INSERT INTO Marque (ID_Marque, nom) VALUES (1, 'Peugeot')"))
+        conn.execute(text(
+            "INSERT INTO Vehicule (Marque_ID, Modele, Annee, Kilometrage, Prix, Etat) VALUES (1, 'Test', 2020, :km, :prix, 'Occasion')"
+        ), rows)
+    aggregates.ensure_built(memory_engine)
+    return memory_engine
+
+def sync(service, engine):
+    with engine.connect() as conn:
+        service.sync(conn)
+
+# Test de l'ajustement initial et du sous-échantillonnage
+def test_fit_and_records(engine):
+    service = ClusteringService(n_clusters=3)
+    sync(service, engine)
+    records = service.records()
+    assert len(records) == 300 and len({r["Cluster"] for r in records}) == 3
+    sample = service.records(max_points=50)
+    assert len(sample) == 50 and set(sample[0]) == {"Kilométrage", "Prix", "Cluster"}
+    assert sample == service.records(max_points=50)
+
+# Test des mises à jour incrémentales après création et suppression via le CRUD
+def test_incremental_updates(engine):
+    service = ClusteringService(n_clusters=3, refit_fraction=0.2)
+    sync(service, engine)
+    records = service.records()
+    db = sessionmaker(bind=engine, autoflush=False)()
+    vehicule = crud.create_vehicule(db, schemas.VehiculeCreate(
+        marque_id=1, modele="Test", annee=2021, kilometrage=12000, prix=29000, etat="Occasion", carburant_id=1, transmission_id=1,
+    ))
+    sync(service, engine)
+    assert service.stats()["points"] == 301 and service.partial_fits == 1 and service.full_fits == 1
+    assert service.records() != records
+
+    crud.delete_vehicule(db, vehicule.id)
+    db.close()
+    sync(service, engine)
+    assert service.stats()["points"] == 300 and service.full_fits == 1
+
+# Test d'une modification du prix seul : relue par refresh (ce worker) ou par le journal (autre worker)
+def test_price_update(engine):
+    service = ClusteringService(n_clusters=3)
+    sync(service, engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    crud.update_vehicule(db, 1, schemas.VehiculeUpdate(prix=12345))
+    with engine.connect() as conn:
+        assert service.refresh(conn, 1)
+    assert service.points[1] == (service.points[1][0], 12345.0)
+    assert 12345.0 in [record["Prix"] for record in service.records()]
+
+    crud.update_vehicule(db, 2, schemas.VehiculeUpdate(kilometrage=54321))
+    crud.update_vehicule(db, 2, schemas.VehiculeUpdate(prix=23456))
+    db.close()
+    with engine.connect() as conn:
+        assert not service.refresh(conn, 2)
+        version = service.sync(conn)
+    assert service.points[2] == (54321.0, 23456.0) and service.full_syncs == 1
+    snapshot_version, X, labels = service.snapshot()
+    assert snapshot_version == version and len(X) == len(labels) == 300
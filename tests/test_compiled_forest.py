@@ -0,0 +1,135 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from API.compiled_forest import CompiledForest, FastPathForest, compile_forest_pipeline
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DATA_PATH = os.path.join(ROOT_DIR, "data/cleaned/voitures_aramisauto_nettoye.csv")
+MODEL_PATH = os.path.join(ROOT_DIR, "models/random_forest_improved.pkl")
+
+# Données nettoyées sans la cible
+@pytest.fixture(scope="module")
+def features():
+    return pd.read_csv(DATA_PATH).drop(columns=["Prix"])
+
+# Pipeline entraîné comme dans models/random_forest_improved.py (forêt réduite pour les tests)
+@pytest.fixture(scope="module")
+def forest_pipeline():
+    df = pd.read_csv(DATA_PATH)
+    X = df.drop(columns=["Prix"])
+    categorical_cols = X.select_dtypes(include=["object"]).columns
+    numeric_cols = X.select_dtypes(include=["int64", "float64"]).columns
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), numeric_cols),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical_cols)
+        ]
+    )
+    pipeline = Pipeline(steps=[
+        ("preprocessor", preprocessor),
+        ("regressor", RandomForestRegressor(n_estimators=25, max_features="sqrt", random_state=42))
+    ])
+    return pipeline.fit(X, df["Prix"])
+
+# Test de parité sur l'ensemble du fichier nettoyé
+def test_compiled_forest_parity(forest_pipeline, features):
+    compiled = compile_forest_pipeline(forest_pipeline)
+    np.testing.assert_array_equal(compiled.predict(features), forest_pipeline.predict(features))
+
+# Test de parité ligne par ligne et avec des catégories inconnues
+def test_compiled_forest_single_row_and_unknown_categories(forest_pipeline, features):
+    compiled = compile_forest_pipeline(forest_pipeline)
+    row = features.iloc[[0]]
+    assert compiled.predict(row)[0] == forest_pipeline.predict(row)[0]
+
+    unknown = row.assign(Marque="Marque Inconnue", Modèle="Modèle Inconnu")
+    assert compiled.predict(unknown)[0] == forest_pipeline.predict(unknown)[0]
+
+# Test de la sauvegarde et du rechargement au format .npz
+def test_compiled_forest_save_load(forest_pipeline, features, tmp_path):
+    compiled = compile_forest_pipeline(forest_pipeline)
+    path = tmp_path / "forest.npz"
+    compiled.save(path)
+    reloaded = CompiledForest.load(path)
+    np.testing.assert_array_equal(reloaded.predict(features), forest_pipeline.predict(features))
+
+# Test du chemin rapide : mêmes résultats sous et au-dessus du seuil
+def test_fast_path_forest(forest_pipeline, features):
+    fast_path = FastPathForest(forest_pipeline, max_rows=10)
+    np.testing.assert_array_equal(fast_path.predict(features.iloc[:5]), forest_pipeline.predict(features.iloc[:5]))
+    np.testing.assert_array_equal(fast_path.predict(features), forest_pipeline.predict(features))
+
+# Test de parité sur le modèle de production s'il est disponible
+@pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="models/random_forest_improved.pkl absent")
+def test_compiled_forest_parity_production_model(features):
+    pipeline = joblib.load(MODEL_PATH)
+    compiled = compile_forest_pipeline(pipeline)
+    np.testing.assert_array_equal(compiled.predict(features), pipeline.predict(features))
+
+# Test des requêtes encodées sans DataFrame (chemin utilisé par l'API), sous et au-dessus du seuil
+def test_fast_path_forest_requests(forest_pipeline, features):
+    from types import SimpleNamespace
+    from API.features import COLUMN_TO_FIELD
+
+    requests = [SimpleNamespace(**{COLUMN_TO_FIELD[column]: value for column, value in row.items()})
+                for row in features.to_dict(orient="records")]
+    fast_path = FastPathForest(forest_pipeline, max_rows=10)
+    np.testing.assert_array_equal(fast_path.predict_requests(requests[:5]), forest_pipeline.predict(features.iloc[:5]))
+    np.testing.assert_array_equal(fast_path.predict_requests(requests), forest_pipeline.predict(features))
+    # Matrice déjà encodée (inférence combinée), sous et au-dessus du seuil
+    encoded = fast_path.encoder.encode(requests)
+    np.testing.assert_array_equal(fast_path.predict_encoded(encoded[:5]), forest_pipeline.predict(features.iloc[:5]))
+    np.testing.assert_array_equal(fast_path.predict_encoded(encoded), forest_pipeline.predict(features))
+    np.testing.assert_array_equal(fast_path.compiled.predict_encoded(encoded), forest_pipeline.predict(features))
+
+# Test des prédictions par arbre (intervalles de prédiction) : forêt compilée et scikit-learn identiques,
+# moyenne des arbres égale à la prédiction de la forêt
+def test_predict_trees_encoded(forest_pipeline, features):
+    from API.features import EncodedPipeline
+    from API.prediction import price_intervals
+
+    fast_path = FastPathForest(forest_pipeline, max_rows=10)
+    encoded = fast_path.encoder.encode_frame(features)
+    trees = fast_path.predict_trees_encoded(encoded)
+    assert trees.shape == (25, len(features))
+    np.testing.assert_array_equal(trees, EncodedPipeline(forest_pipeline).predict_trees_encoded(encoded))
+    np.testing.assert_array_equal(trees, fast_path.compiled.predict_trees_encoded(encoded))
+    np.testing.assert_array_equal(fast_path.predict_trees_encoded(encoded[:5]), trees[:, :5])
+
+    means, stds, quantiles = price_intervals(fast_path, encoded, (0.05, 0.5, 0.95))
+    np.testing.assert_array_equal(means, forest_pipeline.predict(features))
+    np.testing.assert_allclose(stds, trees.std(axis=0))
+    assert quantiles.shape == (3, len(features))
+    assert np.all(quantiles[0] <= quantiles[1]) and np.all(quantiles[1] <= quantiles[2])
+
+# Test des contributions par champ : référence naïve (chemin de chaque arbre, scikit-learn), regroupement des colonnes
+# one-hot sur leur champ, et biais + somme des contributions égal à la prédiction
+def test_contributions_encoded(forest_pipeline, features):
+    from API.features import FEATURE_FIELDS, EncodedPipeline
+
+    fast_path = FastPathForest(forest_pipeline)
+    encoded = fast_path.encoder.encode_frame(features)
+    bias, contributions = fast_path.contributions_encoded(encoded)
+    assert contributions.shape == (len(features), len(FEATURE_FIELDS))
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), forest_pipeline.predict(features), rtol=1e-9)
+
+    forest = forest_pipeline.named_steps["regressor"]
+    rows = encoded[:5].astype(np.float32)
+    expected = np.zeros((len(rows), len(FEATURE_FIELDS)))
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        for row, path in enumerate(estimator.decision_path(rows).tolil().rows):
+            for parent, child in zip(path[:-1], path[1:]):
+                field = fast_path.encoder.column_fields[tree.feature[parent]]
+                expected[row, field] += tree.value[child, 0, 0] - tree.value[parent, 0, 0]
+    np.testing.assert_allclose(contributions[:5], expected / len(forest.estimators_), atol=1e-6)
+
+    # Pipeline servi sans chemin rapide : forêt compilée au premier appel
+    _, lazy = EncodedPipeline(forest_pipeline).contributions_encoded(encoded[:5])
+    np.testing.assert_array_equal(lazy, contributions[:5])
@@ -1,9 +1,22 @@
+import base64
 import pytest
 import requests
 import os
+import json
+import time
 
 BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:8000")
 
+# Configuration du serveur testé (mêmes variables d'environnement que l'API) : un test d'une fonction désactivée
+# est ignoré explicitement au lieu de passer sans rien vérifier
+PREDICT_CACHE_ENABLED = int(os.getenv("PREDICT_CACHE_SIZE", "10000")) > 0
+GRID_CACHE_ENABLED = int(os.getenv("PREDICT_GRID_CACHE_SIZE", "1000")) > 0
+MICRO_BATCHING_ENABLED = os.getenv("PREDICT_MICRO_BATCHING", "1") == "1"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Les caches et compteurs sont propres à chaque worker : une requête répétée plus de fois qu'il n'y a de workers
+# atteint au moins deux fois le même worker, quelle que soit la répartition
+REPEATS = 8
+
 # Helper Function: Créer un véhicule pour les tests
 def create_test_vehicule():
     payload = {
@@ -71,4 +84,315 @@ def test_create_vehicule_missing_fields():
         # Manque d'autres champs obligatoires
     }
     response = requests.post(endpoint, json=payload)
-    assert response.status_code == 422, "L'API n'a pas retourné le code 422 pour les champs obligatoires manquants"
\ No newline at end of file
+    assert response.status_code == 422, "L'API n'a pas retourné le code 422 pour les champs obligatoires manquants"
+
+# Données de prédiction valides pour les tests
+PREDICT_PAYLOAD = {
+    "kilometrage": 15000,
+    "annee": 2019,
+    "marque": "Peugeot",
+    "carburant": "Essence",
+    "transmission": "Manuelle",
+    "modele": "208",
+    "etat": "Occasion"
+}
+
+# Test de la prédiction batch (tableau JSON) avec une ligne invalide
+def test_predict_combined_batch():
+    endpoint = f"{BASE_URL}/predict_combined/batch"
+    payload = [PREDICT_PAYLOAD, {"annee": 2020}, {**PREDICT_PAYLOAD, "kilometrage": 80000}]
+    response = requests.post(endpoint, json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 3
+    assert data["errors"] == 1
+    assert [result["index"] for result in data["results"]] == [0, 1, 2]
+    assert "error" in data["results"][1]
+
+    # Les résultats batch doivent correspondre à la prédiction unitaire
+    single = requests.post(f"{BASE_URL}/predict_combined", json=PREDICT_PAYLOAD).json()
+    assert data["results"][0]["predicted_price"] == pytest.approx(single["predicted_price"])
+    assert data["results"][0]["deal_classification"] == single["deal_classification"]
+
+# Test de la prédiction batch au format NDJSON
+def test_predict_combined_batch_ndjson():
+    endpoint = f"{BASE_URL}/predict_combined/batch"
+    body = "\n".join([json.dumps(PREDICT_PAYLOAD), "{pas du json", json.dumps(PREDICT_PAYLOAD)])
+    response = requests.post(endpoint, data=body.encode("utf-8"), headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 3
+    assert data["errors"] == 1
+    assert data["results"][1]["error"][0]["type"] == "json_invalid"
+
+# Test d'une ligne avec un kilométrage non fini : erreur sur la ligne seulement
+def test_predict_combined_batch_non_finite():
+    payload = [PREDICT_PAYLOAD, {**PREDICT_PAYLOAD, "kilometrage": float("nan")}, {**PREDICT_PAYLOAD, "kilometrage": float("inf")}]
+    # json.dumps écrit NaN et Infinity, que requests refuse d'envoyer avec json=
+    response = requests.post(
+        f"{BASE_URL}/predict_combined/batch", data=json.dumps(payload), headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["errors"] == 2 and "predicted_price" in data["results"][0]
+    assert data["results"][1]["error"][0]["type"] == "finite_number"
+    assert data["results"][2]["error"][0]["loc"] == ["kilometrage"]
+
+# Test des statistiques de l'ordonnanceur de micro-lots
+def test_predict_scheduler_stats():
+    response = requests.get(f"{BASE_URL}/predict_combined/scheduler")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["enabled"] == MICRO_BATCHING_ENABLED
+    assert {"queue_depth", "batch_size_histogram"} <= set(data)
+
+# Test du cache de prédictions : une requête répétée est servie depuis le cache (en-tête X-Cache)
+@pytest.mark.skipif(not PREDICT_CACHE_ENABLED, reason="PREDICT_CACHE_SIZE=0 : cache de prédictions désactivé")
+def test_prediction_cache():
+    # Kilométrage propre à cet appel : la combinaison n'est encore en cache sur aucun worker
+    payload = {**PREDICT_PAYLOAD, "kilometrage": 100000 + time.time_ns() % 100000}
+    responses = [requests.post(f"{BASE_URL}/predict_combined", json=payload) for _ in range(REPEATS)]
+    assert all(response.json() == responses[0].json() for response in responses)
+    assert responses[0].headers["X-Cache"] == "miss"
+    assert "hit" in [response.headers["X-Cache"] for response in responses]
+
+# Test de l'intervalle de prédiction (arbres de la forêt), unitaire et batch
+def test_predict_combined_interval():
+    plain = requests.post(f"{BASE_URL}/predict_combined", json=PREDICT_PAYLOAD).json()
+    response = requests.post(f"{BASE_URL}/predict_combined", params={"quantiles": [0.1, 0.9]}, json=PREDICT_PAYLOAD)
+    assert response.status_code == 200
+    data = response.json()
+    interval = data["price_interval"]
+    assert data["predicted_price"] == pytest.approx(plain["predicted_price"])
+    assert interval["mean"] == pytest.approx(plain["predicted_price"])
+    assert interval["std"] >= 0
+    assert interval["quantiles"]["0.1"] <= interval["quantiles"]["0.9"]
+
+    batch = requests.post(
+        f"{BASE_URL}/predict_combined/batch", params={"interval": "true"}, json=[PREDICT_PAYLOAD, {"annee": 2020}],
+    ).json()
+    assert batch["results"][0]["price_interval"]["mean"] == pytest.approx(interval["mean"])
+    assert set(batch["results"][0]["price_interval"]["quantiles"]) == {"0.05", "0.95"}
+    assert "error" in batch["results"][1]
+
+    invalid = requests.post(f"{BASE_URL}/predict_combined", params={"quantiles": [1.5]}, json=PREDICT_PAYLOAD)
+    assert invalid.status_code == 400
+
+# Test du mode explication : contributions par champ, dont la somme avec le biais redonne le prix prédit
+def test_predict_combined_explain():
+    response = requests.post(f"{BASE_URL}/predict_combined", params={"explain": "true"}, json=PREDICT_PAYLOAD)
+    assert response.status_code == 200
+    data = response.json()
+    explanation = data["price_explanation"]
+    assert set(explanation["contributions"]) == {
+        "kilometrage", "annee", "marque", "modele", "carburant", "transmission", "etat",
+    }
+    total = explanation["bias"] + sum(explanation["contributions"].values())
+    assert total == pytest.approx(data["predicted_price"])
+
+    batch = requests.post(
+        f"{BASE_URL}/predict_combined/batch", params={"explain": "true"}, json=[PREDICT_PAYLOAD],
+    ).json()
+    assert batch["results"][0]["price_explanation"]["contributions"] == pytest.approx(explanation["contributions"])
+
+# Test de la courbe de dépréciation : grille complète, cohérente avec la prédiction unitaire et mise en cache
+def test_predict_depreciation():
+    endpoint = f"{BASE_URL}/predict_combined/depreciation"
+    payload = {
+        "vehicule": PREDICT_PAYLOAD,
+        "kilometrage": {"start": 10000, "stop": 50000, "step": 20000},
+        "annee": {"start": 2016, "stop": 2020, "step": 2},
+    }
+    response = requests.post(endpoint, json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["kilometrage"] == [10000, 30000, 50000]
+    assert data["annee"] == [2016, 2018, 2020]
+    assert data["points"] == 9
+    assert len(data["predicted_prices"]) == 3 and all(len(row) == 3 for row in data["predicted_prices"])
+
+    single = requests.post(
+        f"{BASE_URL}/predict_combined", json={**PREDICT_PAYLOAD, "kilometrage": 30000, "annee": 2018},
+    ).json()
+    assert data["predicted_prices"][1][1] == pytest.approx(single["predicted_price"])
+
+    too_large = {**payload, "kilometrage": {"start": 0, "stop": 1000000, "step": 1}}
+    assert requests.post(endpoint, json=too_large).status_code == 413
+    invalid = {**payload, "annee": {"start": 2020, "stop": 2010}}
+    assert requests.post(endpoint, json=invalid).status_code == 400
+    # Pas minuscule : quotient infini refusé (400) plutôt qu'une erreur serveur ; bornes hors limites refusées (422)
+    tiny_step = {**payload, "kilometrage": {"start": 0, "stop": 10000000, "step": 1e-320}}
+    assert requests.post(endpoint, json=tiny_step).status_code == 400
+    out_of_range = {**payload, "kilometrage": {"start": 0, "stop": 1e308, "step": 1e-300}}
+    assert requests.post(endpoint, json=out_of_range).status_code == 422
+
+# Test du cache des grilles de prix : une grille répétée est servie depuis le cache (en-tête X-Cache)
+@pytest.mark.skipif(not GRID_CACHE_ENABLED, reason="PREDICT_GRID_CACHE_SIZE=0 : cache des grilles désactivé")
+def test_depreciation_cache():
+    # Plage propre à cet appel : la grille n'est encore en cache sur aucun worker
+    payload = {
+        "vehicule": PREDICT_PAYLOAD,
+        "kilometrage": {"start": time.time_ns() % 100000, "stop": 200000, "step": 50000},
+    }
+    responses = [requests.post(f"{BASE_URL}/predict_combined/depreciation", json=payload) for _ in range(REPEATS)]
+    assert all(response.json() == responses[0].json() for response in responses)
+    assert responses[0].headers["X-Cache"] == "miss"
+    assert "hit" in [response.headers["X-Cache"] for response in responses]
+
+# Test des véhicules similaires : par véhicule du catalogue et par description, index tenu à jour à la création
+def test_similar_vehicules():
+    vehicule_id = create_test_vehicule()
+    response = requests.get(f"{BASE_URL}/vehicules/{vehicule_id}/similar", params={"k": 3})
+    assert response.status_code == 200
+    similar = response.json()
+    assert len(similar) <= 3 and vehicule_id not in [item["id"] for item in similar]
+    assert [item["distance"] for item in similar] == sorted(item["distance"] for item in similar)
+
+    created = requests.get(f"{BASE_URL}/vehicules/", params={"limit": 1, "sort": "-id"}).json()[0]
+    query = {
+        **PREDICT_PAYLOAD, "marque": created["marque"]["nom"], "carburant": created["carburant"]["type"],
+        "transmission": created["transmission"]["type"], "annee": created["annee"],
+        "kilometrage": created["kilometrage"],
+    }
+    response = requests.post(f"{BASE_URL}/similar", params={"k": 1, "prix": created["prix"]}, json=query)
+    assert response.status_code == 200
+    assert response.json()[0]["distance"] == 0
+
+    assert requests.get(f"{BASE_URL}/vehicules/999999999/similar").status_code == 404
+    assert requests.get(f"{BASE_URL}/similar/stats").json()["vehicules"] > 0
+    requests.delete(f"{BASE_URL}/vehicules/{vehicule_id}")
+
+# Test des endpoints d'administration des modèles sans jeton
+def test_admin_models_requires_token():
+    response = requests.get(f"{BASE_URL}/admin/models")
+    assert response.status_code == 403
+    response = requests.post(f"{BASE_URL}/admin/models/random_forest/reload")
+    assert response.status_code == 403
+
+# Test de la distribution année/marque (agrégat matérialisé, ETag)
+def test_year_brand_distribution():
+    response = requests.get(f"{BASE_URL}/data/data/year-brand-distribution")
+    assert response.status_code == 200
+    data = response.json()
+    assert isinstance(data, list) and data
+    assert {"Marque", "Annee", "Count", "Prix_Moyen", "Kilometrage_Moyen"} <= set(data[0])
+
+    # Révision inchangée : 304 sans corps
+    etag = response.headers["etag"]
+    response = requests.get(f"{BASE_URL}/data/data/year-brand-distribution", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # La création d'un véhicule met à jour l'agrégat et son ETag
+    create_test_vehicule()
+    response = requests.get(f"{BASE_URL}/data/data/year-brand-distribution", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert sum(row["Count"] for row in response.json()) == sum(row["Count"] for row in data) + 1
+
+# Test de la pagination par curseur et des filtres de /vehicules/
+def test_read_vehicules_cursor_pagination():
+    endpoint = f"{BASE_URL}/vehicules/"
+    params = {"marque": "peugeot", "carburant": "Diesel", "sort": "-prix", "limit": 5}
+    full = requests.get(endpoint, params={**params, "limit": 15})
+    assert full.status_code == 200
+
+    pages, cursor = [], None
+    for _ in range(3):
+        response = requests.get(endpoint, params={**params, "cursor": cursor} if cursor else params)
+        assert response.status_code == 200
+        pages.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        assert cursor is not None
+    assert [v["id"] for v in pages] == [v["id"] for v in full.json()]
+    assert all(v["marque"]["nom"] == "Peugeot" and v["carburant"]["type"] == "Diesel" for v in pages)
+    assert [v["prix"] for v in pages] == sorted((v["prix"] for v in pages), reverse=True)
+
+    # Un curseur émis pour un autre tri est refusé
+    response = requests.get(endpoint, params={**params, "sort": "annee", "cursor": cursor})
+    assert response.status_code == 400
+
+    # Curseurs fabriqués dont la valeur n'est pas un nombre : refusés (400) plutôt qu'une page vide ou une erreur 500
+    for value in ({"a": 1}, [1, 2], None, "cher", True):
+        payload = json.dumps({"s": "-prix", "v": value, "id": 1}).encode()
+        crafted = base64.urlsafe_b64encode(payload).decode().rstrip("=")
+        response = requests.get(endpoint, params={**params, "cursor": crafted})
+        assert response.status_code == 400
+
+# Test de l'export en flux du catalogue
+def test_export_vehicules():
+    response = requests.get(f"{BASE_URL}/vehicules/export", stream=True)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    first = json.loads(next(response.iter_lines()))
+    assert set(first) == {"id", "marque", "modele", "annee", "kilometrage", "prix", "etat", "carburant", "transmission"}
+    response.close()
+
+    # CSV compressé : requests décompresse automatiquement (Content-Encoding: gzip)
+    response = requests.get(f"{BASE_URL}/vehicules/export", params={"format": "csv", "compress": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    lines = response.text.splitlines()
+    assert lines[0] == "id,marque,modele,annee,kilometrage,prix,etat,carburant,transmission"
+    assert len(lines) > 1
+
+# Test du clustering calculé sur la base, avec sous-échantillonnage
+def test_clustering_max_points():
+    response = requests.get(f"{BASE_URL}/data/data/clustering", params={"max_points": 100})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 100
+    assert set(data[0]) == {"Kilométrage", "Prix", "Cluster"}
+
+    # Réponse pré-encodée : variante gzip et revalidation par ETag
+    assert response.headers["content-encoding"] == "gzip"
+    response = requests.get(f"{BASE_URL}/data/data/clustering", params={"max_points": 100},
+                            headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+# Test de l'endpoint de disponibilité (503 tant que les modèles se chargent, puis 200)
+def test_ready():
+    response = requests.get(f"{BASE_URL}/ready")
+    assert response.status_code in (200, 503)
+    data = response.json()
+    assert {"ready", "models", "startup"} <= set(data)
+    assert data["ready"] == (response.status_code == 200)
+    assert "import" in data["startup"]["phases"]
+
+# Test de l'authentification : inscription, connexion, puis appels protégés servis par le cache de tokens
+def test_login_and_users_me():
+    username = f"test_auth_{os.getpid()}"
+    response = requests.post(f"{BASE_URL}/register",
+                             json={"username": username, "email": f"{username}@example.com", "password": "secret"})
+    assert response.status_code == 201
+    user_id = response.json()["id"]
+
+    response = requests.post(f"{BASE_URL}/login", json={"username": username, "password": "secret"})
+    assert response.status_code == 200
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    # Appels répétés : servis par le cache de tokens du worker à partir du deuxième, même réponse attendue
+    for _ in range(REPEATS):
+        response = requests.get(f"{BASE_URL}/users/me/", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["username"] == username
+
+    assert requests.post(f"{BASE_URL}/login", json={"username": username, "password": "faux"}).status_code == 400
+    assert requests.get(f"{BASE_URL}/users/me/", headers={"Authorization": "Bearer invalide"}).status_code == 401
+    # Utilisateur supprimé : plus de connexion possible (les tokens déjà en cache d'un autre worker
+    # restent valides au plus AUTH_TOKEN_CACHE_TTL secondes, voir test_auth.py pour l'invalidation)
+    assert requests.delete(f"{BASE_URL}/users/{user_id}").status_code == 200
+    assert requests.post(f"{BASE_URL}/login", json={"username": username, "password": "secret"}).status_code == 400
+
+# Test de l'endpoint /metrics (latence par route, requêtes SQL, inférence par modèle)
+@pytest.mark.skipif(not METRICS_ENABLED, reason="METRICS_ENABLED=0 : métriques désactivées")
+def test_metrics():
+    response = requests.get(f"{BASE_URL}/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    # Familles déclarées par tout worker, même sans échantillon (les valeurs sont propres au worker)
+    for family in ("http_requests_total counter", "http_request_duration_seconds histogram",
+                   "db_queries_total counter", "model_inference_seconds histogram"):
+        assert f"# TYPE {family}" in text
+    # La requête /metrics elle-même est en cours
+    in_flight = [line for line in text.splitlines() if line.startswith("http_requests_in_flight ")]
+    assert int(in_flight[0].split()[1]) >= 1
@@ -0,0 +1,71 @@
+import os
+from types import SimpleNamespace
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from API.features import (
+    SCHEMA_VERSION, SMALL_BATCH_ROWS, EncodedPipeline, FeatureEncoder, SharedEncoder, build_preprocessor, check_schema,
+    frame_requests,
+)
+from API.prediction import CombinedModel
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DATA_PATH = os.path.join(ROOT_DIR, "data/cleaned/voitures_aramisauto_nettoye.csv")
+MODEL_PATHS = [os.path.join(ROOT_DIR, "models", name)
+               for name in ("random_forest_improved.pkl", "gradient_boosting_classifier.pkl")]
+
+@pytest.fixture(scope="module")
+def features():
+    return pd.read_csv(DATA_PATH).drop(columns=["Prix"])
+
+# Test de parité de l'encodage avec le ColumnTransformer, y compris l'ordre des colonnes du DataFrame
+def test_encoder_matches_column_transformer(features):
+    preprocessor = build_preprocessor().fit(features)
+    encoder = FeatureEncoder.from_preprocessor(preprocessor)
+    expected = preprocessor.transform(features).toarray()
+    np.testing.assert_array_equal(encoder.encode(frame_requests(features)), expected)
+    np.testing.assert_array_equal(encoder.encode_frame(features[features.columns[::-1]]), expected)
+
+    unknown = frame_requests(features.head(1).assign(Marque="Marque Inconnue"))
+    assert encoder.encode(unknown)[0, list(encoder.category_columns[0].values())].sum() == 0
+
+# Test du refus d'un artefact entraîné avec un autre schéma
+def test_check_schema():
+    check_schema(SimpleNamespace(feature_schema={"version": SCHEMA_VERSION}))
+    check_schema(object())
+    with pytest.raises(ValueError):
+        check_schema(SimpleNamespace(feature_schema={"version": "autre"}))
+
+# Test de parité des modèles de production servis sans DataFrame
+@pytest.mark.parametrize("path", MODEL_PATHS)
+def test_encoded_pipeline_parity(path, features):
+    if not os.path.exists(path):
+        pytest.skip(f"{path} absent")
+    pipeline = joblib.load(path)
+    encoded = EncodedPipeline(pipeline)
+    np.testing.assert_array_equal(encoded.predict_requests(frame_requests(features)), pipeline.predict(features))
+
+# Test de l'encodage partagé : préprocesseurs ajustés sur des lignes différentes (moyennes et catégories différentes),
+# petits et grands lots, catégories inconnues d'un seul ou de tous les modèles
+def test_shared_encoder_matches_each_encoder(features):
+    half = len(features) // 2
+    encoders = [FeatureEncoder.from_preprocessor(build_preprocessor().fit(rows))
+                for rows in (features.iloc[:half], features.iloc[half:])]
+    shared = SharedEncoder(encoders)
+    unknown = features.head(SMALL_BATCH_ROWS + 5).assign(Marque="Marque Inconnue")
+    for rows in (features, features.head(3), unknown, unknown.head(2)):
+        requests = frame_requests(rows)
+        encoded = shared.encode(requests)
+        for index, encoder in enumerate(encoders):
+            np.testing.assert_array_equal(shared.project(encoded, index), encoder.encode(requests))
+
+# Test de parité de l'inférence combinée (un seul encodage) avec les deux pipelines de production
+def test_combined_model_parity(features):
+    if not all(os.path.exists(path) for path in MODEL_PATHS):
+        pytest.skip("modèles absents")
+    price_pipeline, deal_pipeline = (joblib.load(path) for path in MODEL_PATHS)
+    combined = CombinedModel(EncodedPipeline(price_pipeline), EncodedPipeline(deal_pipeline))
+    prices, deals, _ = combined.predict_requests(frame_requests(features))
+    np.testing.assert_array_equal(prices, price_pipeline.predict(features))
+    np.testing.assert_array_equal(deals, deal_pipeline.predict(features))
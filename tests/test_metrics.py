@@ -0,0 +1,25 @@
+from API.metrics import Counter, Histogram, MetricsRegistry, sql_operation
+
+# Test du rendu Prometheus d'un histogramme (bornes cumulées, somme, nombre) et d'un compteur
+def test_render():
+    registry = MetricsRegistry()
+    latency = registry.register(Histogram("latency_seconds", "Latence", ("route",), buckets=(0.1, 1.0)))
+    requests = registry.register(Counter("requests_total", "Requêtes", ("route",)))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, "/vehicules/")
+    requests.inc('/a"b')
+
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/vehicules/",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/vehicules/",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="/vehicules/",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/vehicules/"} 3' in lines
+    assert 'latency_seconds_sum{route="/vehicules/"} 5.55' in lines
+    assert 'requests_total{route="/a\\"b"} 1' in lines
+
+# Test de la classification des requêtes SQL
+def test_sql_operation():
+    assert sql_operation("  SELECT 1") == "select"
+    assert sql_operation("INSERT INTO Vehicule ...") == "insert"
+    assert sql_operation("PRAGMA journal_mode=WAL") == "other"
@@ -0,0 +1,82 @@
+import joblib
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from API.model_registry import ModelRegistry, ModelUnavailableError
+from API.prediction_cache import PredictionCache
+
+# Registre de test avec deux versions d'un artefact
+@pytest.fixture
+def registry(tmp_path):
+    joblib.dump({"weights": np.arange(10)}, tmp_path / "model_v1.pkl")
+    joblib.dump({"weights": np.arange(20)}, tmp_path / "model_v2.pkl")
+    registry = ModelRegistry(tmp_path)
+    registry.register("demo", "model_v1.pkl")
+    return registry
+
+# Test du chargement paresseux et des métadonnées de version
+def test_lazy_load(registry):
+    assert not registry.is_loaded("demo")
+    model = registry.get("demo")
+    assert len(model["weights"]) == 10
+    info = registry.info()["demo"]
+    assert info["loaded"] and len(info["version"]) == 12
+
+# Test du remplacement atomique d'un artefact
+def test_swap(registry):
+    version_before = registry.versions()
+    registry.get("demo")
+    artifact = registry.swap("demo", "model_v2.pkl")
+    assert len(registry.get("demo")["weights"]) == 20
+    assert registry.versions() != version_before
+    assert artifact.path.endswith("model_v2.pkl")
+
+# Test des artefacts absents ou hors du dossier des modèles
+def test_missing_and_outside_artifacts(registry, tmp_path):
+    registry.register("absent", "absent.pkl")
+    with pytest.raises(ModelUnavailableError):
+        registry.get("absent")
+    assert registry.info()["absent"]["error"]
+    with pytest.raises(ValueError):
+        registry.swap("demo", "../outside.pkl")
+
+# Test d'une prédiction terminée après le remplacement du modèle : résultat non mis en cache
+def test_swap_during_prediction(registry):
+    registry.get("demo")
+    cache = PredictionCache(version_fn=registry.versions, version_check_interval=0)
+    request = SimpleNamespace(
+        kilometrage=50000, annee=2018, marque="Peugeot", carburant="Essence", transmission="Manuelle",
+        modele="208", etat="Occasion",
+    )
+    version = cache.version()
+    assert cache.get(request) is None
+    stale = {"predicted_price": float(registry.get("demo")["weights"].sum())}
+
+    # Remplacement et vidage du cache (comme /admin/models/{name}/reload) pendant le calcul
+    registry.swap("demo", "model_v2.pkl")
+    cache.clear()
+    cache.put(request, stale, version)
+    assert cache.get(request) is None and cache.stats()["stale_puts"] == 1
+
+    version = cache.version()
+    fresh = {"predicted_price": float(registry.get("demo")["weights"].sum())}
+    cache.put(request, fresh, version)
+    assert cache.get(request) == fresh
+
+# Test de deux workers partageant le fichier pointeur : le remplacement fait par l'un est suivi par l'autre
+def test_swap_published_to_other_workers(tmp_path):
+    joblib.dump({"weights": np.arange(10)}, tmp_path / "model_v1.pkl")
+    joblib.dump({"weights": np.arange(20)}, tmp_path / "model_v2.pkl")
+    workers = []
+    for _ in range(3):
+        registry = ModelRegistry(tmp_path, pointer_file=str(tmp_path / "active_models.json"), pointer_check_interval=0)
+        registry.register("demo", "model_v1.pkl")
+        workers.append(registry)
+    first, second, starting = workers
+    assert len(first.get("demo")["weights"]) == len(second.get("demo")["weights"]) == 10
+
+    first.swap("demo", "model_v2.pkl")
+    assert len(second.get("demo")["weights"]) == 20
+    assert second.versions() == first.versions()
+    # Un worker démarré après le remplacement charge directement l'artefact publié
+    assert len(starting.get("demo")["weights"]) == 20
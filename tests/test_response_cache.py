@@ -0,0 +1,18 @@
+from API.response_cache import EncodedResponse, etag_matches, negotiate_encoding
+
+# Test de la négociation de l'encodage
+def test_negotiate_encoding():
+    available = {"identity": b"", "gzip": b"", "br": b""}
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("gzip, br;q=0", available) == "gzip"
+    assert negotiate_encoding(None, available) == "identity"
+    assert negotiate_encoding("br", {"identity": b"", "gzip": b""}) == "identity"
+
+# Test de l'ETag calculé sur le contenu
+def test_etag():
+    payload = [{"Marque": "Peugeot", "Count": index} for index in range(200)]
+    first, second = EncodedResponse(1, payload), EncodedResponse(2, payload)
+    assert first.etag == second.etag and "gzip" in first.bodies
+    assert etag_matches(f'W/{first.etag}, "autre"', first.etag)
+    assert not etag_matches('"autre"', first.etag)
+    assert EncodedResponse(1, payload[:10]).etag != first.etag
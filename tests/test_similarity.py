@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from API import aggregates, crud, schemas
+from API.similarity import SimilarityIndex, vehicule_exists
+
+# Base en mémoire : deux marques, deux carburants, une transmission
+@pytest.fixture
+def engine(memory_engine):
+    rng = np.random.default_rng(0)
+    rows = [
+        {"marque": int(marque), "carburant": int(carburant), "annee": int(annee), "km": float(km), "prix": float(prix)}
+        for marque, carburant, annee, km, prix in zip(
+            rng.integers(1, 3, 400), rng.integers(1, 3, 400), rng.integers(2010, 2024, 400),
+            rng.uniform(0, 200000, 400), rng.uniform(5000, 40000, 400),
+        )
+    ]
+    with memory_engine.begin() as conn:
+        conn.execute(text("INSERT INTO Marque (ID_Marque, nom) VALUES (1, 'Peugeot'), (2, 'Renault')"))
+        conn.execute(text("INSERT INTO Carburant (ID_Carburant, type) VALUES (1, 'Essence'), (2, 'Diesel')"))
+        conn.execute(text("INSERT INTO Transmission (ID_Transmission, type) VALUES (1, 'Manuelle')"))
+        conn.execute(text(
+            "INSERT INTO Vehicule (Marque_ID, Modele, Annee, Kilometrage, Prix, Etat, Carburant_ID, Transmission_ID) "
+            "VALUES (:marque, 'Test', :annee, :km, :prix, 'Occasion', :carburant, 1)"
+        ), rows)
+    aggregates.ensure_built(memory_engine)
+    return memory_engine
+
+def sync(index, engine):
+    with engine.connect() as conn:
+        index.sync(conn)
+
+def refresh(index, engine, vehicule_id):
+    with engine.connect() as conn:
+        return index.refresh(conn, vehicule_id)
+
+# Test des plus proches voisins contre une recherche exhaustive sur la partition
+def test_similar_matches_brute_force(engine):
+    index = SimilarityIndex()
+    sync(index, engine)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT ID_Vehicule, Annee, Kilometrage, Prix FROM Vehicule WHERE Marque_ID = 1 AND Carburant_ID = 2"
+        )).all()
+    ids = np.array([row[0] for row in rows])
+    points = np.array([row[1:] for row in rows], dtype=np.float64)
+
+    query = np.array([2018, 60000, 15000], dtype=np.float64)
+    distances = np.sqrt((((points - query) / index.scales) ** 2).sum(axis=1))
+    results = index.similar("Peugeot", "Diesel", "Manuelle", 2018, 60000, 15000, k=5)
+    assert [result["id"] for result in results] == ids[np.argsort(distances, kind="stable")[:5]].tolist()
+    assert results[0]["marque"] == "Peugeot" and results[0]["carburant"] == "Diesel"
+
+    # Sans prix : distance sur l'année et le kilométrage seulement
+    distances = np.sqrt((((points[:, :2] - query[:2]) / index.scales[:2]) ** 2).sum(axis=1))
+    results = index.similar("Peugeot", "Diesel", "Manuelle", 2018, 60000, None, k=5)
+    assert [result["id"] for result in results] == ids[np.argsort(distances, kind="stable")[:5]].tolist()
+
+    neighbours = index.similar_to(int(ids[0]), k=3)
+    assert len(neighbours) == 3 and int(ids[0]) not in [result["id"] for result in neighbours]
+    assert index.similar("Peugeot", "Électrique", "Manuelle", 2018, 60000, None, k=5) == []
+    assert index.similar_to(10 ** 6, k=3) is None
+
+# Test des mises à jour incrémentales après création, modification et suppression via le CRUD
+def test_incremental_updates(engine):
+    index = SimilarityIndex()
+    sync(index, engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    vehicule = crud.create_vehicule(db, schemas.VehiculeCreate(
+        marque_id=1, modele="Nouveau", annee=2021, kilometrage=12000, prix=29000, etat="Occasion",
+        carburant_id=1, transmission_id=1,
+    ))
+    assert refresh(index, engine, vehicule.id)
+    nearest = index.similar("Peugeot", "Essence", "Manuelle", 2021, 12000, 29000, k=1)
+    assert nearest[0]["id"] == vehicule.id and nearest[0]["distance"] == 0
+
+    # Changement de carburant seul : le véhicule change de partition
+    crud.update_vehicule(db, vehicule.id, schemas.VehiculeUpdate(carburant_id=2))
+    assert refresh(index, engine, vehicule.id)
+    assert index.similar("Peugeot", "Diesel", "Manuelle", 2021, 12000, 29000, k=1)[0]["id"] == vehicule.id
+    assert index.similar("Peugeot", "Essence", "Manuelle", 2021, 12000, 29000, k=1)[0]["id"] != vehicule.id
+
+    crud.delete_vehicule(db, vehicule.id)
+    assert refresh(index, engine, vehicule.id)
+    assert index.similar_to(vehicule.id, k=1) is None
+    assert index.stats()["vehicules"] == 400 and index.syncs == 1 and index.refreshes == 3
+
+    # Deux écritures depuis la dernière mise à jour (autre worker) : seuls les véhicules journalisés sont relus
+    other = crud.create_vehicule(db, schemas.VehiculeCreate(
+        marque_id=2, modele="Autre", annee=2015, kilometrage=90000, prix=9000, etat="Occasion",
+        carburant_id=1, transmission_id=1,
+    ))
+    other_id = other.id
+    crud.update_vehicule(db, other_id, schemas.VehiculeUpdate(prix=8500))
+    crud.delete_vehicule(db, int(next(iter(index.records))))
+    db.close()
+    assert not refresh(index, engine, other_id)
+    rows_applied = index.rows_applied
+    sync(index, engine)
+    assert index.similar_to(other_id, k=1) is not None and index.records[other_id][-1] == 8500
+    assert index.stats()["vehicules"] == 400 and index.syncs == 2 and index.full_syncs == 1
+    assert index.rows_applied == rows_applied + 2
+
+    # Échelles tenues à jour par les sommes courantes : identiques à un calcul sur tous les points
+    points = np.array([row[6:] for row in index.records.values()], dtype=np.float64)
+    np.testing.assert_allclose(index.scales, points.std(axis=0))
+
+    # Révision incrémentée sans journal (chargement en masse) : relecture complète
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE Vehicule SET Prix = 1000 WHERE ID_Vehicule = :id"), {"id": other_id})
+        conn.execute(text(aggregates.BUMP_VERSION_SQL), {"name": aggregates.VEHICULES})
+    sync(index, engine)
+    assert index.records[other_id][-1] == 1000 and index.full_syncs == 2
+
+# Test des véhicules sans carburant ni transmission (référence NULL) : indexés dans leur propre partition
+def test_missing_references(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO Vehicule (ID_Vehicule, Marque_ID, Modele, Annee, Kilometrage, Prix, Etat, Carburant_ID, Transmission_ID) "
+            "VALUES (1001, 1, 'Sans carburant', 2019, 50000, 15000, 'Occasion', NULL, 1), "
+            "(1002, 1, 'Sans carburant', 2020, 40000, 17000, 'Occasion', NULL, 1), "
+            "(1003, 1, 'Sans transmission', 2018, 70000, 12000, 'Occasion', 1, NULL), "
+            "(1004, 1, 'Sans prix', 2018, 70000, NULL, 'Occasion', 1, 1)"
+        ))
+    index = SimilarityIndex()
+    sync(index, engine)
+    assert index.records[1001][1:4] == ("Peugeot", None, "Manuelle")
+    assert [result["id"] for result in index.similar_to(1001, k=5)] == [1002]
+    assert index.similar_to(1003, k=5) == []
+    assert index.similar_to(1004, k=5) is None
+    with engine.connect() as conn:
+        assert vehicule_exists(conn, 1004) and not vehicule_exists(conn, 10 ** 6)
+
+    # Écriture sur un véhicule sans carburant : relu par le chemin incrémental
+    db = sessionmaker(bind=engine, autoflush=False)()
+    crud.update_vehicule(db, 1002, schemas.VehiculeUpdate(prix=16000))
+    db.close()
+    assert refresh(index, engine, 1002) and index.records[1002][-1] == 16000
@@ -0,0 +1,18 @@
+import pandas as pd
+from API.training import DEFAULT_CSV, candidates_for_budget, train_model
+
+# Test du nombre de candidats déduit du budget d'ajustements
+def test_candidates_for_budget():
+    assert candidates_for_budget(300, 5, "halving") == 40
+    assert candidates_for_budget(300, 5, "random") == 60
+    assert candidates_for_budget(1, 5, "halving") == 3
+
+# Test d'une recherche réduite : scores de validation croisée repris de la recherche, modèle sans cache
+def test_train_model_small_budget():
+    df = pd.read_csv(DEFAULT_CSV).sample(400, random_state=0)
+    model, report = train_model("random_forest", df, budget=20, cv=2, n_jobs=1, verbose=0)
+    assert model.memory is None
+    assert report["candidates"] >= 3 and report["fits"] == 2 * report["candidates"]
+    assert len(report["cv_scores"]) == 2
+    assert -1.0 < report["test"]["r2"] <= 1.0
+    assert model.predict(df.drop(columns=["Prix"]).head(3)).shape == (3,)